@@ -5,6 +5,7 @@ from datetime import datetime, timedelta, UTC
 import jwt
 
 from users.models import User
+from communications.inbox import is_user_active
 
 class JWTAuth(HttpBearer):
     def authenticate(self, request, token):
@@ -18,6 +19,22 @@ class JWTAuth(HttpBearer):
             pass
         return None
 
+class JWTClaimsAuth(HttpBearer):
+    """Validates the token without loading the user; request.auth is the user id
+
+    Whether the user is still active and verified is read from the flag
+    cached in Redis next to their inbox state.
+    """
+    def authenticate(self, request, token):
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            user_id = payload.get('user_id')
+            if user_id and payload.get('type') != 'refresh' and is_user_active(user_id):
+                return user_id
+        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
+            pass
+        return None
+
 def create_jwt_token(user):
     """Create JWT token for user"""
     payload = {
@@ -40,3 +57,4 @@ def create_refresh_token(user):
 
 # Create auth instance
 jwt_auth = JWTAuth()
+jwt_claims_auth = JWTClaimsAuth()
@@ -7,6 +7,7 @@ from api.schemas.communications import *
 # Response Schemas
 class MessageSchema(Schema):
     message: str
+    tracking_id: Optional[str] = None
 
 
 class ErrorSchema(Schema):
@@ -3,6 +3,7 @@ from typing import Optional, List
 from datetime import datetime
 
 from blog.models import Category, Tag, Comment
+from gallery.resize import build_resize_url
 
 
 # Blog Schemas
@@ -22,6 +23,7 @@ class AuthorSchema(Schema):
     first_name: str
     last_name: str
     profile_picture: Optional[str] = None
+    avatar_url: Optional[str] = None
 
     @staticmethod
     def resolve_profile_picture(obj, context):
@@ -30,6 +32,10 @@ class AuthorSchema(Schema):
             return request.build_absolute_uri(obj.profile_picture.url)
         return None
 
+    @staticmethod
+    def resolve_avatar_url(obj):
+        return build_resize_url('avatar', obj, 96, 96)
+
 class PostListSchema(Schema):
     id: int
     title: str
@@ -37,6 +43,9 @@ class PostListSchema(Schema):
     excerpt: str
     author: AuthorSchema
     featured_image: Optional[str] = None
+    card_image_url: Optional[str] = None
+    featured_image_placeholder: str = ""
+    featured_image_aspect_ratio: Optional[float] = None
     status: str
     published_at: Optional[datetime] = None
     category: Optional[CategorySchema] = None
@@ -45,9 +54,20 @@ class PostListSchema(Schema):
     created_at: datetime
     reading_time: int
 
+    @staticmethod
+    def resolve_card_image_url(obj):
+        return build_resize_url('post', obj, 640, 360)
+
 class PostDetailSchema(PostListSchema):
     content: str
     content_html: str
+    share_image_url: Optional[str] = None
+
+    @staticmethod
+    def resolve_share_image_url(obj, context):
+        if obj.share_image:
+            return context['request'].build_absolute_uri(obj.share_image_url)
+        return None
 
 class PostCreateSchema(Schema):
     title: str
@@ -21,7 +21,8 @@ class AnnouncementSchema(ModelSchema):
         model_fields = [
             'id', 'title', 'content', 'announcement_type', 'priority',
             'is_published', 'publish_date', 'send_email', 'send_push',
-            'target_audience', 'email_sent', 'push_sent', 'created_at', 'updated_at'
+            'target_audience', 'email_sent', 'push_sent', 'delivery_task_id',
+            'created_at', 'updated_at'
         ]
 
     @staticmethod
@@ -105,6 +106,34 @@ class PushNotificationSchema(Schema):
 class MessageResponseSchema(Schema):
     message: str
     success: bool = True
+    tracking_id: Optional[str] = None
+
+class DeliveryStatusSchema(Schema):
+    tracking_id: str
+    status: str
+
+class ReadReceiptStatsSchema(Schema):
+    announcement_id: int
+    read_count: int
+    audience_count: int
+
+class ReadStatusSchema(Schema):
+    announcement_id: int
+    is_read: bool
+
+# Inbox Schemas
+class InboxEntrySchema(Schema):
+    kind: str
+    id: int
+    title: str
+    summary: str
+    link: str
+    priority: Optional[str] = None
+    created_at: datetime
+    is_read: bool
+
+class UnreadCountSchema(Schema):
+    unread: int
 
 class AnnouncementStatsSchema(Schema):
     total_announcements: int
@@ -113,6 +142,7 @@ class AnnouncementStatsSchema(Schema):
     urgent_announcements: int
     email_sent_count: int
     push_sent_count: int
+    total_reads: int
 
 class NewsletterStatsSchema(Schema):
     total_subscriptions: int
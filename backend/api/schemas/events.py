@@ -1,10 +1,12 @@
 from ninja import ModelSchema, Schema
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
+from uuid import UUID
 
 from api.schemas.blog import AuthorSchema
 from events.models import Event, Registration
 from gallery.models import Gallery
+from gallery.resize import build_resize_url
 
 
 # Gallery Schemas
@@ -12,18 +14,26 @@ class EventGallerySchema(ModelSchema):
     uploaded_by: AuthorSchema
     file_size_mb: float
     markdown_url: str
+    thumbnail_url: Optional[str] = None
+    webp_url: Optional[str] = None
+    srcset: str
+    aspect_ratio: Optional[float] = None
     absolute_image_url: Optional[str] = None
 
     class Config:
         model = Gallery
         model_fields = ['id', 'title', 'description', 'image', 'alt_text',
-                       'width', 'height', 'is_public', 'created_at']
+                       'width', 'height', 'placeholder', 'is_public', 'processed_at', 'created_at']
+
+    @staticmethod
+    def resolve_image(obj):
+        return obj.image_url
 
     @staticmethod
     def resolve_absolute_image_url(obj, context):
         request = context['request']
         if obj.image and hasattr(obj.image, 'url'):
-            return request.build_absolute_uri(obj.image.url)
+            return request.build_absolute_uri(obj.image_url)
         return None
 
 # Events Schemas
@@ -32,11 +42,14 @@ class EventSchema(ModelSchema):
     description_html: str
     registration_count: int
     absolute_featured_image_url: Optional[str] = None
+    card_image_url: Optional[str] = None
+    share_image_url: Optional[str] = None
 
     class Config:
         model = Event
         model_fields = [
-            'id', 'title', 'slug', 'description', 'featured_image', 'event_type',
+            'id', 'title', 'slug', 'description', 'featured_image',
+            'featured_image_placeholder', 'featured_image_aspect_ratio', 'event_type',
             'address', 'location', 'online_link', 'start_time', 'end_time',
             'registration_start_date', 'registration_end_date',
             'capacity', 'price', 'status', 'created_at', 'updated_at'
@@ -49,6 +62,21 @@ class EventSchema(ModelSchema):
             return request.build_absolute_uri(obj.featured_image.url)
         return None
 
+    @staticmethod
+    def resolve_card_image_url(obj):
+        return build_resize_url('event', obj, 640, 360)
+
+    @staticmethod
+    def resolve_share_image_url(obj, context):
+        if obj.share_image:
+            return context['request'].build_absolute_uri(obj.share_image_url)
+        return None
+
+    @staticmethod
+    def resolve_gallery_images(obj):
+        # Private images are listed to committee members through the gallery API only
+        return [image for image in obj.gallery_images.all() if image.is_public]
+
     @staticmethod
     def resolve_registration_count(obj):
         return obj.registrations.filter(status='confirmed').count()
@@ -65,6 +93,9 @@ class EventListSchema(Schema):
     description: str
     featured_image: Optional[str] = None
     absolute_featured_image_url: Optional[str] = None
+    card_image_url: Optional[str] = None
+    featured_image_placeholder: str = ""
+    featured_image_aspect_ratio: Optional[float] = None
     event_type: str
     address: Optional[str] = None
     location: Optional[str] = None
@@ -86,6 +117,10 @@ class EventListSchema(Schema):
             return request.build_absolute_uri(obj.featured_image.url)
         return None
 
+    @staticmethod
+    def resolve_card_image_url(obj):
+        return build_resize_url('event', obj, 640, 360)
+
     @staticmethod
     def resolve_registration_count(obj):
         return obj.registrations.filter(status='confirmed').count()
@@ -134,4 +169,58 @@ class RegistrationSchema(ModelSchema):
         ]
 
 class RegistrationStatusUpdateSchema(Schema):
-    status: str
\ No newline at end of file
+    status: str
+
+class RosterEventSchema(Schema):
+    id: int
+    title: str
+    slug: str
+    start_time: datetime
+    end_time: datetime
+    capacity: Optional[int] = None
+    status: str
+
+class RosterEntrySchema(Schema):
+    id: int
+    ticket_id: UUID
+    status: str
+    registered_at: datetime
+    checked_in_at: Optional[datetime] = None
+    user_id: int
+    username: str
+    first_name: str
+    last_name: str
+    email: str
+
+class RosterSchema(Schema):
+    event: RosterEventSchema
+    count: int
+    registrations: List[RosterEntrySchema]
+
+class TicketSchema(Schema):
+    ticket_id: UUID
+    status: str
+    image_url: Optional[str] = None
+    pdf_url: Optional[str] = None
+
+class CheckInSchema(Schema):
+    ticket_id: UUID
+
+class CheckInScanSchema(Schema):
+    ticket_id: UUID
+    scanned_at: Optional[datetime] = None
+
+class CheckInBatchSchema(Schema):
+    scans: List[CheckInScanSchema]
+
+class CheckInResultSchema(Schema):
+    ticket_id: UUID
+    result: str
+    name: Optional[str] = None
+    checked_in_at: Optional[datetime] = None
+
+class RosterSnapshotSchema(Schema):
+    event_id: int
+    generated_at: datetime
+    tickets: Dict[str, str]
+    checked_in: List[str]
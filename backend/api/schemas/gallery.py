@@ -1,8 +1,12 @@
+from django.conf import settings
+
 from ninja import Schema, ModelSchema
-from typing import Optional
+from typing import Optional, List, Dict
+from uuid import UUID
 
 from api.schemas.blog import AuthorSchema
-from gallery.models import Gallery
+from gallery.models import Gallery, ChunkedUpload, DirectUpload, GalleryImport
+from gallery.resize import build_resize_url
 
 
 # Gallery Schemas
@@ -10,11 +14,27 @@ class GallerySchema(ModelSchema):
     uploaded_by: AuthorSchema
     file_size_mb: float
     markdown_url: str
+    thumbnail_url: Optional[str] = None
+    webp_url: Optional[str] = None
+    srcset: str
+    grid_url: Optional[str] = None
+    aspect_ratio: Optional[float] = None
+    # Only set on upload: ids of gallery images with the same or a near-identical picture
+    similar_images: List[int] = []
 
     class Config:
         model = Gallery
         model_fields = ['id', 'title', 'description', 'image', 'alt_text',
-                        'width', 'height', 'is_public', 'created_at']
+                        'width', 'height', 'placeholder', 'is_public', 'processed_at', 'created_at']
+
+    @staticmethod
+    def resolve_image(obj):
+        return obj.image_url
+
+    @staticmethod
+    def resolve_grid_url(obj):
+        # The resize endpoint only serves public images
+        return build_resize_url('gallery', obj, 400, 400) if obj.is_public else None
 
 
 class GalleryCreateSchema(Schema):
@@ -22,3 +42,55 @@ class GalleryCreateSchema(Schema):
     description: Optional[str] = None
     alt_text: Optional[str] = None
     is_public: bool = True
+
+
+# Chunked Upload Schemas
+class ChunkedUploadStartSchema(Schema):
+    purpose: str = "gallery"
+    filename: str
+    content_type: str
+    total_size: int
+    sha256: str
+
+
+class ChunkedUploadSchema(ModelSchema):
+    chunk_size: int
+    is_complete: bool
+
+    class Config:
+        model = ChunkedUpload
+        model_fields = ['id', 'purpose', 'filename', 'total_size', 'received_size', 'created_at']
+
+    @staticmethod
+    def resolve_chunk_size(obj):
+        return settings.UPLOAD_CHUNK_SIZE
+
+
+# Direct Upload Schemas
+class DirectUploadSchema(ModelSchema):
+    # The request that sends the file to storage: PUT the raw bytes to url with headers
+    url: str
+    method: str
+    headers: Dict[str, str]
+    expires_in: int
+
+    class Config:
+        model = DirectUpload
+        model_fields = ['id', 'purpose', 'filename', 'total_size', 'created_at']
+
+
+# Gallery Import Schemas
+class GalleryImportStartSchema(Schema):
+    event_id: int
+    upload_id: UUID
+    is_public: bool = True
+
+
+class GalleryImportSchema(ModelSchema):
+    event_id: int
+    progress: int
+
+    class Config:
+        model = GalleryImport
+        model_fields = ['id', 'status', 'is_public', 'total_files', 'processed_files', 'failed_files',
+                        'created_images', 'error', 'created_at', 'finished_at']
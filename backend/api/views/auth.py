@@ -2,16 +2,20 @@ from typing import List
 
 from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 
 import uuid
 from ninja import Router
 
 from users.models import User
+from gallery.models import ChunkedUpload, DirectUpload
+from gallery.blobs import blob_sha
+from gallery.uploads import UploadError, assemble_upload, discard_upload, complete_direct_upload
 from users.tasks import send_verification_email, send_password_reset_email
+from utils.dispatch import enqueue_on_commit, track_delivery
 from api.authentication import create_jwt_token, create_refresh_token, jwt_auth
 from api.schemas import (
     UserRegistrationSchema, UserLoginSchema, UserProfileSchema,
@@ -32,8 +36,8 @@ def register(request, data: UserRegistrationSchema):
         if User.objects.filter(student_id=data.student_id).exists():
             return 400, {"error": "User with this student ID already exists"}
         
-        # Create user
-        User.objects.create_user(
+        # Create user (the verification email is queued by the post_save signal)
+        user = User.objects.create_user(
             username=data.username,
             email=data.email,
             password=data.password,
@@ -44,7 +48,10 @@ def register(request, data: UserRegistrationSchema):
             major=data.major or "",
         )
         
-        return 201, {"message": "User registered successfully. Please check your email for verification."}
+        return 201, {
+            "message": "User registered successfully. Please check your email for verification.",
+            "tracking_id": getattr(user, 'verification_task_id', None),
+        }
         
     except Exception as e:
         return 400, {"error": "Registration failed", "details": str(e)}
@@ -105,9 +112,9 @@ def resend_verification(request, email: str):
         
         # Send verification email
         verification_url = f"http://localhost:3000/verify-email/{user.email_verification_token}"
-        send_verification_email.delay(user.id, verification_url)
+        tracking_id = track_delivery(enqueue_on_commit(send_verification_email, user.id, verification_url), user.id)
         
-        return 200, {"message": "Verification email sent"}
+        return 200, {"message": "Verification email sent", "tracking_id": tracking_id}
         
     except User.DoesNotExist:
         return 400, {"error": "User not found"}
@@ -146,23 +153,86 @@ def upload_profile_picture(request):
     
     user = request.auth
     
-    # Delete old profile picture if exists
-    if user.profile_picture:
+    # Delete old profile picture if it predates blob storage; blobs are
+    # reference counted and removed once nothing uses them
+    if user.profile_picture and not blob_sha(user.profile_picture.name):
         default_storage.delete(user.profile_picture.name)
     
-    # Save new profile picture
-    filename = f"profile_pictures/{user.id}_{uuid.uuid4().hex}.{file.name.split('.')[-1]}"
-    user.profile_picture.save(filename, ContentFile(file.read()))
+    # Save new profile picture; stored once per distinct content
+    user.profile_picture = file
+    user.save(update_fields=['profile_picture'])
     
     return 200, {"message": "Profile picture updated successfully"}
 
+@auth_router.post(
+    "/profile/picture/uploads/{uuid:upload_id}",
+    response={200: MessageSchema, 400: ErrorSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def finalize_profile_picture_upload(request, upload_id: uuid.UUID):
+    """Set the profile picture from a finished chunked upload (see /gallery/uploads)"""
+    user = request.auth
+
+    with transaction.atomic():
+        upload = get_object_or_404(
+            ChunkedUpload.objects.select_for_update(),
+            id=upload_id,
+            user=user,
+            purpose=ChunkedUpload.PurposeChoices.PROFILE_PICTURE
+        )
+        try:
+            assembled = assemble_upload(upload)
+        except UploadError as e:
+            return e.status, {"error": str(e)}
+
+        if user.profile_picture and not blob_sha(user.profile_picture.name):
+            default_storage.delete(user.profile_picture.name)
+
+        with assembled:
+            user.profile_picture = assembled
+            user.save(update_fields=['profile_picture'])
+        discard_upload(upload)
+
+    return 200, {"message": "Profile picture updated successfully"}
+
+@auth_router.post(
+    "/profile/picture/direct-uploads/{uuid:upload_id}",
+    response={200: MessageSchema, 400: ErrorSchema, 404: ErrorSchema, 409: ErrorSchema},
+    auth=jwt_auth
+)
+def complete_profile_picture_direct_upload(request, upload_id: uuid.UUID):
+    """Set the profile picture from a file uploaded to object storage (see /gallery/direct-uploads)"""
+    user = request.auth
+
+    with transaction.atomic():
+        upload = get_object_or_404(
+            DirectUpload.objects.select_for_update(),
+            id=upload_id,
+            user=user,
+            purpose=ChunkedUpload.PurposeChoices.PROFILE_PICTURE
+        )
+        try:
+            name = complete_direct_upload(upload)
+        except UploadError as e:
+            return e.status, {"error": str(e)}
+
+        if user.profile_picture and not blob_sha(user.profile_picture.name):
+            default_storage.delete(user.profile_picture.name)
+
+        user.profile_picture = name
+        user.save(update_fields=['profile_picture'])
+        upload.hard_delete()
+
+    return 200, {"message": "Profile picture updated successfully"}
+
 @auth_router.delete("/profile/picture", response={200: MessageSchema}, auth=jwt_auth)
 def delete_profile_picture(request):
     """Delete current user's profile picture"""
     user = request.auth
     
     if user.profile_picture:
-        default_storage.delete(user.profile_picture.name)
+        if not blob_sha(user.profile_picture.name):
+            default_storage.delete(user.profile_picture.name)
         user.profile_picture = None
         user.save(update_fields=['profile_picture'])
     
@@ -176,7 +246,8 @@ def request_password_reset(request, data: PasswordResetRequestSchema):
         user.set_password_reset_token()
 
         reset_url = f"{settings.FRONTEND_PASSWORD_RESET_PAGE}/{user.password_reset_token}"
-        send_password_reset_email.delay(user.id, reset_url)
+        # No tracking id here: it would reveal whether the account exists
+        enqueue_on_commit(send_password_reset_email, user.id, reset_url)
 
         return 200, {"message": "If an account with that email exists, a password reset email has been sent."}
 
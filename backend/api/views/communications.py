@@ -1,8 +1,9 @@
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import Q, Count
-from ninja import Router
+from django.db.models import Q, Count, Sum
+from django.db.models.functions import Coalesce
+from ninja import Router, Query
 from ninja.pagination import paginate
 from typing import List
 import logging
@@ -11,19 +12,21 @@ from communications.models import (
     Announcement, NewsletterSubscription, PushNotificationDevice,
     AnnouncementType, AnnouncementPriority
 )
-from communications.utils import (
-    send_announcement_email, send_newsletter_confirmation,
-    get_announcement_recipients
-)
-from communications.push_notifications import push_service
+from communications.tasks import send_newsletter_confirmation_task, send_push_broadcast
+from celery.result import AsyncResult
+from communications.inbox import get_inbox, get_unread_count, mark_inbox_read
+from communications.receipts import mark_announcement_read, has_read_announcement, get_read_count
+from communications.utils import get_audience_queryset
+from utils.dispatch import enqueue_on_commit, track_delivery, get_delivery_owner
 from api.schemas import (
     AnnouncementSchema, AnnouncementListSchema, AnnouncementCreateSchema, AnnouncementUpdateSchema,
     NewsletterSubscriptionSchema, NewsletterSubscribeSchema, NewsletterUnsubscribeSchema,
     PushDeviceSchema, PushDeviceCreateSchema, PushDeviceUpdateSchema,
-    PushNotificationSchema, MessageResponseSchema,
-    AnnouncementStatsSchema, NewsletterStatsSchema
+    PushNotificationSchema, MessageResponseSchema, DeliveryStatusSchema, InboxEntrySchema, UnreadCountSchema,
+    ReadReceiptStatsSchema, ReadStatusSchema,
+    AnnouncementStatsSchema, NewsletterStatsSchema, ErrorSchema
 )
-from api.authentication import jwt_auth
+from api.authentication import jwt_auth, jwt_claims_auth
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -42,7 +45,7 @@ def list_announcements(request, published_only: bool = True):
     
     return queryset.order_by('-created_at')
 
-@communications_router.get("/announcements/{announcement_id}/", response=AnnouncementSchema)
+@communications_router.get("/announcements/{int:announcement_id}/", response=AnnouncementSchema)
 def get_announcement(request, announcement_id: int):
     """Get single announcement"""
     announcement = get_object_or_404(
@@ -74,23 +77,10 @@ def create_announcement(request, payload: AnnouncementCreateSchema):
         **payload.dict()
     )
     
-    # Send notifications if requested and published
-    if announcement.is_published and announcement.publish_date <= timezone.now():
-        if announcement.send_email:
-            recipients = get_announcement_recipients(announcement)
-            if recipients:
-                send_announcement_email(announcement, recipients)
-                announcement.email_sent = True
-        
-        if announcement.send_push:
-            push_service.send_announcement_notification(announcement)
-            announcement.push_sent = True
-        
-        announcement.save()
-    
+    # Notifications are scheduled for the publish date by the post_save signal
     return announcement
 
-@communications_router.put("/announcements/{announcement_id}/", response=AnnouncementSchema, auth=jwt_auth)
+@communications_router.put("/announcements/{int:announcement_id}/", response=AnnouncementSchema, auth=jwt_auth)
 def update_announcement(request, announcement_id: int, payload: AnnouncementUpdateSchema):
     """Update announcement (author/committee/staff only)"""
     user = request.auth
@@ -104,26 +94,12 @@ def update_announcement(request, announcement_id: int, payload: AnnouncementUpda
     for field, value in payload.dict(exclude_unset=True).items():
         setattr(announcement, field, value)
     
+    # Saving revokes the queued delivery and reschedules it (post_save signal)
     announcement.save()
     
-    # Send notifications if newly published
-    if (announcement.is_published and announcement.publish_date <= timezone.now() and
-        not announcement.email_sent and announcement.send_email):
-        recipients = get_announcement_recipients(announcement)
-        if recipients:
-            send_announcement_email(announcement, recipients)
-            announcement.email_sent = True
-            announcement.save()
-    
-    if (announcement.is_published and announcement.publish_date <= timezone.now() and
-        not announcement.push_sent and announcement.send_push):
-        push_service.send_announcement_notification(announcement)
-        announcement.push_sent = True
-        announcement.save()
-    
     return announcement
 
-@communications_router.delete("/announcements/{announcement_id}/", response=MessageResponseSchema, auth=jwt_auth)
+@communications_router.delete("/announcements/{int:announcement_id}/", response=MessageResponseSchema, auth=jwt_auth)
 def delete_announcement(request, announcement_id: int):
     """Delete announcement (author/committee/staff only)"""
     user = request.auth
@@ -133,7 +109,8 @@ def delete_announcement(request, announcement_id: int):
     if not (user.is_staff or user.is_committee or announcement.author == user):
         return {"error": "Permission denied"}, 403
     
-    announcement.soft_delete()
+    # Soft delete; the post_save signal revokes any queued delivery
+    announcement.delete()
     return {"message": "Announcement deleted successfully"}
 
 @communications_router.get("/announcements/stats/", response=AnnouncementStatsSchema, auth=jwt_auth)
@@ -149,11 +126,48 @@ def get_announcement_stats(request):
         draft_announcements=Count('id', filter=Q(is_published=False)),
         urgent_announcements=Count('id', filter=Q(priority='urgent')),
         email_sent_count=Count('id', filter=Q(email_sent=True)),
-        push_sent_count=Count('id', filter=Q(push_sent=True))
+        push_sent_count=Count('id', filter=Q(push_sent=True)),
+        # Compacted receipts; reads of the last few minutes are still in Redis
+        total_reads=Coalesce(Sum('read_count'), 0)
     )
     
     return stats
 
+# Read receipt endpoints
+@communications_router.post("/announcements/{int:announcement_id}/read/", response=MessageResponseSchema, auth=jwt_claims_auth)
+def mark_announcement_as_read(request, announcement_id: int):
+    """Record that the user has read a published announcement"""
+    announcement = get_object_or_404(
+        Announcement.objects.only('id').filter(
+            Q(publish_date__isnull=True) | Q(publish_date__lte=timezone.now()),
+            is_published=True, is_deleted=False
+        ),
+        id=announcement_id
+    )
+    mark_announcement_read(announcement.id, request.auth)
+    return {"message": "Announcement marked as read"}
+
+@communications_router.get("/announcements/{int:announcement_id}/read/", response=ReadStatusSchema, auth=jwt_auth)
+def get_announcement_read_status(request, announcement_id: int):
+    """Check whether the user has read an announcement"""
+    announcement = get_object_or_404(Announcement.objects.only('id'), id=announcement_id, is_deleted=False)
+    return {"announcement_id": announcement.id, "is_read": has_read_announcement(announcement.id, request.auth.id)}
+
+@communications_router.get("/announcements/{int:announcement_id}/reads/", response=ReadReceiptStatsSchema, auth=jwt_auth)
+def get_announcement_reads(request, announcement_id: int):
+    """Get how many users of the target audience read an announcement (committee/staff only)"""
+    user = request.auth
+    if not (user.is_staff or user.is_committee):
+        return {"error": "Permission denied"}, 403
+    
+    announcement = get_object_or_404(Announcement.objects.defer('read_bitmap'), id=announcement_id, is_deleted=False)
+    
+    return {
+        "announcement_id": announcement.id,
+        "read_count": get_read_count(announcement),
+        "audience_count": get_audience_queryset(announcement.target_audience).count(),
+    }
+
 # Newsletter endpoints
 @communications_router.post("/newsletter/subscribe/", response=MessageResponseSchema)
 def subscribe_newsletter(request, payload: NewsletterSubscribeSchema):
@@ -172,11 +186,13 @@ def subscribe_newsletter(request, payload: NewsletterSubscribeSchema):
             subscription.subscribed_categories = payload.subscribed_categories
             subscription.save()
         
-        # Send confirmation email
-        send_newsletter_confirmation(subscription)
+        # Queue confirmation email
+        tracking_id = track_delivery(
+            enqueue_on_commit(send_newsletter_confirmation_task, subscription.id), subscription.user_id
+        )
         
         message = "Subscription successful! Please check your email to confirm." if created else "Subscription updated!"
-        return {"message": message}
+        return {"message": message, "tracking_id": tracking_id}
         
     except Exception as e:
         logger.error(f"Newsletter subscription failed: {str(e)}")
@@ -297,21 +313,29 @@ def send_push_notification(request, payload: PushNotificationSchema):
     if not (user.is_staff or user.is_committee):
         return {"error": "Permission denied"}, 403
     
-    # Get target users
-    users = []
-    if payload.target_audience == 'all':
-        users = User.objects.filter(is_active=True)
-    elif payload.target_audience == 'members':
-        users = User.objects.filter(is_member=True, is_active=True)
-    elif payload.target_audience == 'committee':
-        users = User.objects.filter(is_committee=True, is_active=True)
+    # Queue notifications for the target audience
+    tracking_id = track_delivery(enqueue_on_commit(
+        send_push_broadcast, payload.title, payload.body, payload.data, payload.target_audience
+    ), user.id)
     
-    # Send notifications
-    total_sent = push_service.send_to_multiple_users(
-        users, payload.title, payload.body, payload.data
-    )
-    
-    return {"message": f"Push notification sent to {total_sent} devices"}
+    return {"message": "Push notification queued", "tracking_id": tracking_id}
+
+# Inbox endpoints
+@communications_router.get("/inbox/", response=List[InboxEntrySchema], auth=jwt_auth)
+def list_inbox(request, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
+    """List the user's announcements and personal notifications, newest first"""
+    return get_inbox(request.auth, limit=limit, offset=offset)
+
+@communications_router.get("/inbox/unread-count/", response=UnreadCountSchema, auth=jwt_claims_auth)
+def get_inbox_unread_count(request):
+    """Get the unread badge count (served from Redis)"""
+    return {"unread": get_unread_count(request.auth)}
+
+@communications_router.post("/inbox/read/", response=UnreadCountSchema, auth=jwt_auth)
+def mark_inbox_as_read(request):
+    """Mark everything in the user's inbox as read"""
+    mark_inbox_read(request.auth)
+    return {"unread": 0}
 
 # Utility endpoints
 @communications_router.get("/announcement-types/", response=List[dict])
@@ -323,3 +347,10 @@ def get_announcement_types(request):
 def get_announcement_priorities(request):
     """Get available announcement priorities"""
     return [{"value": choice[0], "label": choice[1]} for choice in AnnouncementPriority.choices]
+
+@communications_router.get("/deliveries/{tracking_id}/", response={200: DeliveryStatusSchema, 404: ErrorSchema}, auth=jwt_auth)
+def get_delivery_status(request, tracking_id: str):
+    """Get the status of a notification delivery the user queued"""
+    if get_delivery_owner(tracking_id) != request.auth.id:
+        return 404, {"error": "Delivery not found"}
+    return 200, {"tracking_id": tracking_id, "status": AsyncResult(tracking_id).status}
@@ -4,10 +4,17 @@ from django.utils.text import slugify
 
 from ninja import Router
 from ninja.errors import HttpError
-from typing import List, Optional
+from typing import List, Optional, Literal
 
 from api.authentication import jwt_auth
 from events.models import Event, Registration
+from events.tasks import render_ticket, regenerate_event_tickets
+from events.checkin import MAX_BATCH_SCANS, check_in, check_in_batch, merge_scans, roster_snapshot
+from events.roster import roster_entries, roster_response
+from events.tickets import ticket_file_name
+from gallery.albums import Album, album_response, ensure_checksums
+from gallery.protected import build_protected_url
+from utils.dispatch import enqueue_on_commit
 from api.schemas import (
     EventSchema,
     EventCreateSchema,
@@ -16,6 +23,12 @@ from api.schemas import (
 
     RegistrationSchema,
     RegistrationStatusUpdateSchema,
+    RosterSchema,
+    TicketSchema,
+    CheckInSchema,
+    CheckInBatchSchema,
+    CheckInResultSchema,
+    RosterSnapshotSchema,
 
     MessageSchema,
     ErrorSchema,
@@ -58,6 +71,21 @@ def get_event(request, event_id: int):
     )
     return event
 
+@events_router.get("/{int:event_id}/photos.zip")
+def download_event_photos(request, event_id: int):
+    """Download the event's public photos as a ZIP; supports Range requests to resume"""
+    event = get_object_or_404(Event, id=event_id, is_deleted=False)
+    images = list(
+        event.gallery_images.filter(is_deleted=False, is_public=True)
+        .exclude(image='')
+        .order_by('created_at', 'id')
+    )
+    if not images:
+        raise HttpError(404, "This event has no photos")
+
+    ensure_checksums(images)
+    return album_response(request, Album(images), f"{event.slug or event.pk}-photos.zip")
+
 @events_router.get("/slug/{str:slug}", response=EventSchema)
 def get_event_by_slug(request, slug: str):
     """Get event details by slug"""
@@ -112,11 +140,33 @@ def delete_event(request, event_id: int):
 def list_event_registrations(request, event_id: int, limit: int = 20, offset: int = 0):
     """List registrations for a specific event"""
     event = get_object_or_404(Event, id=event_id, is_deleted=False)
-    queryset = event.registrations.filter(is_deleted=False).select_related('user')
+    queryset = event.registrations.filter(is_deleted=False).select_related('user', 'event')
 
     registrations = queryset[offset:offset + limit]
     return registrations
 
+@events_router.get("/{int:event_id}/roster", response={200: RosterSchema, 403: ErrorSchema, 404: ErrorSchema}, auth=jwt_auth)
+def get_event_roster(
+    request,
+    event_id: int,
+    status: Optional[str] = None,
+    format: Literal['json', 'csv', 'jsonl'] = 'json'
+):
+    """Roster of an event: its metadata once, then one flat row per registration (committee members only)
+
+    Large events can be downloaded as streamed CSV or JSON lines.
+    """
+    user = request.auth
+    if not (user.is_staff or user.is_committee):
+        return 403, {"error": "Permission denied"}
+
+    event = get_object_or_404(Event, id=event_id, is_deleted=False)
+    if format != 'json':
+        return roster_response(event, format, status)
+
+    registrations = list(roster_entries(event, status))
+    return 200, {"event": event, "count": len(registrations), "registrations": registrations}
+
 @events_router.post("/{int:event_id}/register", response=RegistrationSchema, auth=jwt_auth)
 def register_for_event(request, event_id: int):
     """Register current user for an event"""
@@ -171,3 +221,98 @@ def cancel_registration(request, registration_id: int):
     registration = get_object_or_404(Registration, id=registration_id, user=user, is_deleted=False)
     registration.delete()
     return {"message": "Registration cancelled successfully"}
+
+# Ticket endpoints
+@events_router.get(
+    "/registrations/{int:registration_id}/ticket",
+    response={200: TicketSchema, 202: TicketSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def get_registration_ticket(request, registration_id: int):
+    """Get signed URLs of the QR ticket (PNG and PDF) of a confirmed registration
+
+    Tickets are rendered in the background once a registration is confirmed;
+    until then, and after the event changes, the response is 202 and the
+    ticket is queued for rendering.
+    """
+    user = request.auth
+    queryset = Registration.objects.select_related('event', 'user')
+    if not (user.is_superuser or user.is_staff):
+        queryset = queryset.filter(user=user)
+    registration = get_object_or_404(queryset, id=registration_id)
+
+    if registration.status != Registration.StatusChoices.CONFIRMED:
+        return 404, {"error": "Only confirmed registrations have a ticket"}
+
+    if registration.ticket_file != ticket_file_name(registration):
+        enqueue_on_commit(render_ticket, registration.id)
+        return 202, {"ticket_id": registration.ticket_id, "status": "pending"}
+
+    filename = f"ticket-{registration.event.slug or registration.event_id}"
+    return 200, {
+        "ticket_id": registration.ticket_id,
+        "status": "ready",
+        "image_url": build_protected_url(registration, 'png', f"{filename}.png"),
+        "pdf_url": build_protected_url(registration, 'pdf', f"{filename}.pdf"),
+    }
+
+@events_router.post(
+    "/{int:event_id}/tickets/regenerate",
+    response={202: MessageSchema, 403: ErrorSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def regenerate_tickets(request, event_id: int, force: bool = False):
+    """Re-render the tickets of every confirmed registration of an event (committee members only)"""
+    user = request.auth
+    if not (user.is_staff or user.is_committee):
+        return 403, {"error": "Permission denied"}
+
+    event = get_object_or_404(Event, id=event_id, is_deleted=False)
+    enqueue_on_commit(regenerate_event_tickets, event.id, force=force)
+    return 202, {"message": f"Regenerating the tickets of {event.title}"}
+
+# Check-in endpoints (committee members scanning tickets at the door)
+@events_router.post(
+    "/{int:event_id}/check-in",
+    response={200: CheckInResultSchema, 403: ErrorSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def check_in_ticket(request, event_id: int, payload: CheckInSchema):
+    """Check in a scanned ticket; scanning it again reports when it was checked in"""
+    user = request.auth
+    if not (user.is_staff or user.is_committee):
+        return 403, {"error": "Permission denied"}
+
+    event = get_object_or_404(Event, id=event_id, is_deleted=False)
+    return 200, check_in(event, payload.ticket_id)
+
+@events_router.post(
+    "/{int:event_id}/check-in/batch",
+    response={200: List[CheckInResultSchema], 400: ErrorSchema, 403: ErrorSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def check_in_tickets(request, event_id: int, payload: CheckInBatchSchema):
+    """Check in the tickets a scanner collected while offline, at the time they were scanned"""
+    user = request.auth
+    if not (user.is_staff or user.is_committee):
+        return 403, {"error": "Permission denied"}
+    if len(payload.scans) > MAX_BATCH_SCANS:
+        return 400, {"error": f"At most {MAX_BATCH_SCANS} scans can be sent at once"}
+
+    event = get_object_or_404(Event, id=event_id, is_deleted=False)
+    scans = merge_scans((scan.ticket_id, scan.scanned_at) for scan in payload.scans)
+    return 200, check_in_batch(event, scans)
+
+@events_router.get(
+    "/{int:event_id}/check-in/roster",
+    response={200: RosterSnapshotSchema, 403: ErrorSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def get_check_in_roster(request, event_id: int):
+    """Download the event's tickets, to check them in offline when the venue network drops"""
+    user = request.auth
+    if not (user.is_staff or user.is_committee):
+        return 403, {"error": "Permission denied"}
+
+    event = get_object_or_404(Event, id=event_id, is_deleted=False)
+    return 200, roster_snapshot(event)
@@ -1,14 +1,24 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
 
-from ninja import Router, Query, File, UploadedFile
+from ninja import Router, Query, File, Form, UploadedFile
 from typing import List
 import uuid
 
-from gallery.models import Gallery
-from gallery.tasks import process_uploaded_image
+from events.models import Event
+from gallery.models import Gallery, ChunkedUpload, DirectUpload, GalleryImport
+from gallery.blobs import find_similar_images
+from gallery.tasks import import_gallery_archive
+from gallery.uploads import (
+    UploadError, start_upload, write_chunk, assemble_upload, discard_upload,
+    start_direct_upload, complete_direct_upload
+)
+from utils.dispatch import enqueue_on_commit
 from api.authentication import jwt_auth
-from api.schemas import GallerySchema, GalleryCreateSchema, MessageSchema, ErrorSchema
+from api.schemas import (
+    GallerySchema, GalleryCreateSchema, MessageSchema, ErrorSchema,
+    ChunkedUploadStartSchema, ChunkedUploadSchema, DirectUploadSchema, GalleryImportStartSchema, GalleryImportSchema
+)
 
 gallery_router = Router()
 
@@ -19,10 +29,11 @@ def list_gallery_images(
     limit: int = Query(20, ge=1, le=50),
     public_only: bool = Query(True)
 ):
-    """List gallery images"""
+    """List gallery images; private ones are included for committee members only"""
     queryset = Gallery.objects.select_related('uploaded_by')
-    
-    if public_only:
+
+    user = jwt_auth(request)
+    if public_only or not (user and (user.is_superuser or user.is_staff)):
         queryset = queryset.filter(is_public=True)
     
     # Pagination
@@ -54,21 +65,18 @@ def upload_image(request, file: UploadedFile = File(...), data: GalleryCreateSch
         return 400, {"error": "File size must be less than 10MB"}
     
     try:
-        # Create gallery item
+        # Save the original as uploaded, once per distinct content; renditions
+        # are generated by a worker. The upload is handed over as is, so large
+        # files are moved from their temporary file rather than read into memory
         gallery_item = Gallery.objects.create(
             title=data.title if data else file.name,
             description=data.description if data else "",
             uploaded_by=user,
             alt_text=data.alt_text if data else "",
-            is_public=data.is_public if data else True
+            is_public=data.is_public if data else True,
+            image=file
         )
-        
-        # Save image
-        filename = f"gallery/{uuid.uuid4().hex}.{file.name.split('.')[-1]}"
-        gallery_item.image.save(filename, ContentFile(file.read()))
-        
-        # Process image asynchronously
-        process_uploaded_image.delay(gallery_item.id)
+        gallery_item.similar_images = find_similar_images(gallery_item)
         
         return 201, gallery_item
         
@@ -106,6 +114,170 @@ def delete_image(request, image_id: int):
     image.delete()  # This will soft delete
     return 200, {"message": "Image deleted successfully"}
 
+# --- Chunked Uploads ---
+
+@gallery_router.post("/uploads", response={201: ChunkedUploadSchema, 400: ErrorSchema}, auth=jwt_auth)
+def start_chunked_upload(request, data: ChunkedUploadStartSchema):
+    """Start a resumable upload; send the file in chunks, then finalize it"""
+    user = request.auth
+
+    if data.purpose != ChunkedUpload.PurposeChoices.PROFILE_PICTURE and not (user.is_superuser or user.is_staff):
+        return 400, {"error": "Only committee members can upload images"}
+
+    try:
+        upload = start_upload(user, data.purpose, data.filename, data.content_type, data.total_size, data.sha256)
+    except UploadError as e:
+        return 400, {"error": str(e)}
+    return 201, upload
+
+@gallery_router.get("/uploads/{uuid:upload_id}", response=ChunkedUploadSchema, auth=jwt_auth)
+def get_chunked_upload(request, upload_id: uuid.UUID):
+    """Get upload progress; resume by sending the chunk at received_size"""
+    return get_object_or_404(ChunkedUpload, id=upload_id, user=request.auth)
+
+@gallery_router.post(
+    "/uploads/{uuid:upload_id}/chunks",
+    response={200: ChunkedUploadSchema, 400: ErrorSchema, 404: ErrorSchema, 409: ErrorSchema},
+    auth=jwt_auth
+)
+def upload_chunk(request, upload_id: uuid.UUID, offset: int = Form(...), file: UploadedFile = File(...)):
+    """Append a chunk to an upload"""
+    with transaction.atomic():
+        upload = get_object_or_404(ChunkedUpload.objects.select_for_update(), id=upload_id, user=request.auth)
+        try:
+            write_chunk(upload, offset, file)
+        except UploadError as e:
+            return e.status, {"error": str(e), "details": f"received_size={upload.received_size}"}
+    return 200, upload
+
+@gallery_router.post(
+    "/uploads/{uuid:upload_id}/finalize",
+    response={201: GallerySchema, 400: ErrorSchema, 404: ErrorSchema},
+    auth=jwt_auth
+)
+def finalize_chunked_upload(request, upload_id: uuid.UUID, data: GalleryCreateSchema = None):
+    """Verify a finished upload and add it to the gallery"""
+    with transaction.atomic():
+        upload = get_object_or_404(
+            ChunkedUpload.objects.select_for_update(),
+            id=upload_id,
+            user=request.auth,
+            purpose=ChunkedUpload.PurposeChoices.GALLERY
+        )
+        try:
+            assembled = assemble_upload(upload)
+        except UploadError as e:
+            return e.status, {"error": str(e)}
+
+        with assembled:
+            gallery_item = Gallery.objects.create(
+                title=data.title if data else upload.filename,
+                description=data.description or "" if data else "",
+                uploaded_by=request.auth,
+                alt_text=data.alt_text or "" if data else "",
+                is_public=data.is_public if data else True,
+                image=assembled
+            )
+        discard_upload(upload)
+        gallery_item.similar_images = find_similar_images(gallery_item)
+
+    return 201, gallery_item
+
+# --- Direct Uploads ---
+
+@gallery_router.post("/direct-uploads", response={201: DirectUploadSchema, 400: ErrorSchema}, auth=jwt_auth)
+def presign_direct_upload(request, data: ChunkedUploadStartSchema):
+    """Get a presigned URL to PUT a file straight to object storage, then complete the upload"""
+    user = request.auth
+
+    if data.purpose != ChunkedUpload.PurposeChoices.PROFILE_PICTURE and not (user.is_superuser or user.is_staff):
+        return 400, {"error": "Only committee members can upload images"}
+
+    try:
+        upload, put_request = start_direct_upload(
+            user, data.purpose, data.filename, data.content_type, data.total_size, data.sha256
+        )
+    except UploadError as e:
+        return 400, {"error": str(e)}
+
+    for name, value in put_request.items():
+        setattr(upload, name, value)
+    return 201, upload
+
+@gallery_router.post(
+    "/direct-uploads/{uuid:upload_id}/complete",
+    response={201: GallerySchema, 400: ErrorSchema, 404: ErrorSchema, 409: ErrorSchema},
+    auth=jwt_auth
+)
+def complete_gallery_direct_upload(request, upload_id: uuid.UUID, data: GalleryCreateSchema = None):
+    """Add a file uploaded to object storage to the gallery and start its processing"""
+    with transaction.atomic():
+        upload = get_object_or_404(
+            DirectUpload.objects.select_for_update(),
+            id=upload_id,
+            user=request.auth,
+            purpose=ChunkedUpload.PurposeChoices.GALLERY
+        )
+        try:
+            name = complete_direct_upload(upload)
+        except UploadError as e:
+            return e.status, {"error": str(e)}
+
+        gallery_item = Gallery(
+            title=data.title if data else upload.filename,
+            description=data.description or "" if data else "",
+            uploaded_by=request.auth,
+            alt_text=data.alt_text or "" if data else "",
+            is_public=data.is_public if data else True
+        )
+        # Assigned after init: a name passed to the constructor counts as already stored
+        gallery_item.image = name
+        gallery_item.save()
+        upload.hard_delete()
+        gallery_item.similar_images = find_similar_images(gallery_item)
+
+    return 201, gallery_item
+
+# --- Bulk Imports ---
+
+@gallery_router.post("/imports", response={202: GalleryImportSchema, 400: ErrorSchema, 404: ErrorSchema}, auth=jwt_auth)
+def start_gallery_import(request, data: GalleryImportStartSchema):
+    """Import every image of a ZIP archive, sent as a chunked upload, into an event's gallery"""
+    user = request.auth
+
+    if not (user.is_superuser or user.is_staff):
+        return 400, {"error": "Only committee members can import images"}
+
+    event = get_object_or_404(Event, id=data.event_id)
+
+    with transaction.atomic():
+        upload = get_object_or_404(
+            ChunkedUpload.objects.select_for_update(),
+            id=data.upload_id,
+            user=user,
+            purpose=ChunkedUpload.PurposeChoices.GALLERY_IMPORT
+        )
+        try:
+            assembled = assemble_upload(upload)
+        except UploadError as e:
+            return e.status, {"error": str(e)}
+
+        gallery_import = GalleryImport(event=event, uploaded_by=user, is_public=data.is_public)
+        with assembled:
+            gallery_import.archive.save(f"{uuid.uuid4().hex}.zip", assembled)
+        discard_upload(upload)
+
+        enqueue_on_commit(import_gallery_archive, gallery_import.id)
+
+    return 202, gallery_import
+
+@gallery_router.get("/imports/{int:import_id}", response=GalleryImportSchema, auth=jwt_auth)
+def get_gallery_import(request, import_id: int):
+    """Get the progress of a bulk import"""
+    user = request.auth
+    queryset = GalleryImport.objects.all() if user.is_superuser else GalleryImport.objects.filter(uploaded_by=user)
+    return get_object_or_404(queryset, id=import_id)
+
 # --- Soft Delete API Endpoints for Gallery ---
 
 @gallery_router.get("/deleted/images", response=List[GallerySchema], auth=jwt_auth)
@@ -7,7 +7,7 @@ from simplemde.widgets import SimpleMDEEditor
 
 from blog.models import Category, Tag, Post, Comment, Like
 from blog.resources import PostResource, CategoryResource
-from utils.admin import SoftDeleteListFilter
+from utils.admin import SoftDeleteListFilter, BackgroundImportMixin
 
 @admin.register(Category)
 class CategoryAdmin(ModelAdmin, ImportExportModelAdmin):
@@ -71,7 +71,7 @@ class PostAdminForm(forms.ModelForm):
 
 
 @admin.register(Post)
-class PostAdmin(ModelAdmin, ImportExportModelAdmin):
+class PostAdmin(BackgroundImportMixin, ModelAdmin, ImportExportModelAdmin):
     form = PostAdminForm
     resource_class = PostResource
     list_display = ('title', 'author', 'status', 'category', 'is_featured', 'published_at', 'created_at')
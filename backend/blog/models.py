@@ -6,6 +6,7 @@ from django.utils import timezone
 import markdown
 
 from utils.models import BaseModel
+from gallery.models import FeaturedImageMixin, ShareImageMixin
 
 class Category(BaseModel):
     name = models.CharField(max_length=100, unique=True)
@@ -39,7 +40,7 @@ class Tag(BaseModel):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
-class Post(BaseModel):
+class Post(ShareImageMixin, FeaturedImageMixin, BaseModel):
     class StatusChoices(models.TextChoices):
         DRAFT = 'draft', 'Draft'
         PUBLISHED = 'published', 'Published'
@@ -67,6 +68,11 @@ class Post(BaseModel):
         return self.title
 
     def save(self, *args, **kwargs):
+        self.fill_derived_fields()
+        super().save(*args, **kwargs)
+
+    def fill_derived_fields(self):
+        """Slug, excerpt and publish date left blank; bulk imports call this instead of save()"""
         if not self.slug:
             self.slug = slugify(self.title)
         
@@ -82,7 +88,9 @@ class Post(BaseModel):
         if self.status == Post.StatusChoices.PUBLISHED and not self.published_at:
             self.published_at = timezone.now()
 
-        super().save(*args, **kwargs)
+    def share_image_text(self):
+        published_at = timezone.localtime(self.published_at).strftime('%Y-%m-%d') if self.published_at else ''
+        return self.title, published_at
 
     @property
     def content_html(self):
@@ -1,32 +1,38 @@
 from import_export import resources, fields
-from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
 
 from users.models import User
 from blog.models import Post, Category, Tag
+from gallery.resources import FeaturedImageImportMixin
+from utils.imports import BulkImportMixin, CachedForeignKeyWidget, CachedManyToManyWidget
 
 class CategoryResource(resources.ModelResource):
     class Meta:
         model = Category
         fields = ('id', 'name', 'slug', 'description', 'created_at')
 
-class PostResource(resources.ModelResource):
+class PostResource(FeaturedImageImportMixin, BulkImportMixin, resources.ModelResource):
     author = fields.Field(
         column_name='author',
         attribute='author',
-        widget=ForeignKeyWidget(User, 'username')
+        widget=CachedForeignKeyWidget(User, 'username')
     )
     category = fields.Field(
         column_name='category',
         attribute='category',
-        widget=ForeignKeyWidget(Category, 'name')
+        widget=CachedForeignKeyWidget(Category, 'name')
     )
     tags = fields.Field(
         column_name='tags',
         attribute='tags',
-        widget=ManyToManyWidget(Tag, field='name', separator='|')
+        widget=CachedManyToManyWidget(Tag, field='name', separator='|')
     )
 
+    # Filled in by fill_derived_fields() when left blank
+    bulk_update_extra_fields = FeaturedImageImportMixin.bulk_update_extra_fields + ('slug', 'excerpt', 'published_at')
+
     class Meta:
         model = Post
         fields = ('id', 'title', 'slug', 'content', 'excerpt', 'author', 
                  'category', 'tags', 'status', 'is_featured', 'published_at', 'created_at')
+        use_bulk = True
+        batch_size = 1000
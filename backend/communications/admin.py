@@ -6,8 +6,12 @@ from unfold.admin import ModelAdmin
 from simplemde.widgets import SimpleMDEEditor
 from import_export.admin import ImportExportModelAdmin
 
-from utils.admin import SoftDeleteListFilter
+from utils.admin import SoftDeleteListFilter, StreamingExportMixin
 from communications.models import Announcement, NewsletterSubscription, PushNotificationDevice
+from communications.resources import AnnouncementResource
+from communications.tasks import schedule_announcement_delivery
+from communications.inbox import sync_announcement
+from communications.live import publish_announcement
 
 
 class AnnouncementAdminForm(forms.ModelForm):
@@ -22,8 +26,9 @@ class AnnouncementAdminForm(forms.ModelForm):
 
 
 @admin.register(Announcement)
-class AnnouncementAdmin(ModelAdmin, ImportExportModelAdmin):
+class AnnouncementAdmin(StreamingExportMixin, ModelAdmin, ImportExportModelAdmin):
     form = AnnouncementAdminForm
+    resource_class = AnnouncementResource
     list_display = [
         'title', 'announcement_type', 'priority', 'author', 
         'is_published', 'publish_date', 'email_sent', 'push_sent', 'created_at'
@@ -34,7 +39,7 @@ class AnnouncementAdmin(ModelAdmin, ImportExportModelAdmin):
         SoftDeleteListFilter, 'created_at'
     ]
     search_fields = ['title', 'content', 'author__username']
-    readonly_fields = ['email_sent', 'push_sent', 'created_at', 'updated_at']
+    readonly_fields = ['email_sent', 'push_sent', 'delivery_task_id', 'dispatch_claimed_at', 'read_count', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Content', {
@@ -44,7 +49,7 @@ class AnnouncementAdmin(ModelAdmin, ImportExportModelAdmin):
             'fields': ('announcement_type', 'priority', 'target_audience', 'is_published', 'publish_date')
         }),
         ('Notifications', {
-            'fields': ('send_email', 'send_push', 'email_sent', 'push_sent')
+            'fields': ('send_email', 'send_push', 'email_sent', 'push_sent', 'delivery_task_id', 'dispatch_claimed_at', 'read_count')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -55,20 +60,21 @@ class AnnouncementAdmin(ModelAdmin, ImportExportModelAdmin):
     actions = ['publish_announcements', 'send_notifications']
 
     def publish_announcements(self, request, queryset):
-        queryset.update(is_published=True, publish_date=timezone.now())
-        self.message_user(request, f"{queryset.count()} announcements published.")
+        count = queryset.update(is_published=True, publish_date=timezone.now())
+        # Bulk updates bypass the save signal, so schedule delivery explicitly
+        for announcement in queryset:
+            schedule_announcement_delivery(announcement)
+            sync_announcement(announcement)
+            publish_announcement(announcement)
+        self.message_user(request, f"{count} announcements published.")
     publish_announcements.short_description = "Publish selected announcements"
 
     def send_notifications(self, request, queryset):
-        # This will be implemented with Celery tasks
+        scheduled = 0
         for announcement in queryset:
-            if announcement.send_email and not announcement.email_sent:
-                # Trigger email task
-                pass
-            if announcement.send_push and not announcement.push_sent:
-                # Trigger push notification task
-                pass
-        self.message_user(request, f"Notifications queued for {queryset.count()} announcements.")
+            if schedule_announcement_delivery(announcement):
+                scheduled += 1
+        self.message_user(request, f"Notifications scheduled for {scheduled} announcements.")
     send_notifications.short_description = "Send notifications for selected announcements"
 
 
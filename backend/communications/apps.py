@@ -5,3 +5,6 @@ class CommunicationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'communications'
     verbose_name = 'Communications'
+
+    def ready(self):
+        import communications.signals
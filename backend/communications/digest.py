@@ -0,0 +1,43 @@
+from django.conf import settings
+
+from communications.models import AnnouncementPriority
+from utils.redis import get_redis
+
+# Announcements waiting for their digest, one set per audience and priority;
+# the flush key marks that a flush task is already scheduled for the bucket.
+BUCKET_KEY = 'digest:{audience}:{priority}'
+FLUSH_KEY = 'digest:{audience}:{priority}:flush'
+
+
+def should_coalesce(announcement):
+    """Whether an announcement waits for the digest window instead of going out on its own"""
+    return (
+        settings.ANNOUNCEMENT_DIGEST_WINDOW > 0
+        and announcement.priority != AnnouncementPriority.URGENT
+        and announcement.priority in settings.ANNOUNCEMENT_DIGEST_PRIORITIES
+    )
+
+
+def add_to_digest(announcement):
+    """Add an announcement to its bucket; True when the caller must schedule the flush"""
+    keys = {'audience': announcement.target_audience, 'priority': announcement.priority}
+    window = settings.ANNOUNCEMENT_DIGEST_WINDOW
+
+    pipe = get_redis().pipeline()
+    pipe.sadd(BUCKET_KEY.format(**keys), announcement.id)
+    # Outlives the window so a delayed flush cannot be scheduled twice
+    pipe.set(FLUSH_KEY.format(**keys), 1, nx=True, ex=window * 2)
+    _, first = pipe.execute()
+    return bool(first)
+
+
+def pop_digest(audience, priority):
+    """Atomically take the announcement ids of a bucket and reopen it"""
+    keys = {'audience': audience, 'priority': priority}
+
+    pipe = get_redis().pipeline()
+    pipe.smembers(BUCKET_KEY.format(**keys))
+    pipe.delete(BUCKET_KEY.format(**keys))
+    pipe.delete(FLUSH_KEY.format(**keys))
+    announcement_ids, _, _ = pipe.execute()
+    return sorted(int(announcement_id) for announcement_id in announcement_ids)
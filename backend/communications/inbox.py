@@ -0,0 +1,288 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import Coalesce, Left
+from django.utils import timezone
+
+import time
+import heapq
+import logging
+from itertools import islice
+from redis import RedisError
+
+from communications.models import Announcement, InboxItem, InboxState, NewsletterSubscription
+from utils.redis import get_redis
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# Broadcast announcements are stored once and indexed per audience in a sorted
+# set scored by their visible time; a user's unread broadcasts are the members
+# newer than their read watermark. Per-user items only bump a counter kept in
+# the same hash as the watermark, so a hash without a watermark means the
+# state was lost and must be rebuilt from the database. The hash also caches
+# whether the user may still sign in, for endpoints that never load the user.
+BROADCAST_KEY = 'inbox:broadcast:{audience}'
+USER_KEY = 'inbox:user:{user_id}'
+AUDIENCES_KEY = 'inbox:audiences:{user_id}'
+AUDIENCES = ('all', 'members', 'committee', 'subscribers')
+
+
+def get_user_audiences(user):
+    """Announcement audiences a user belongs to"""
+    audiences = ['all']
+    if getattr(user, 'is_member', False):
+        audiences.append('members')
+    if getattr(user, 'is_committee', False):
+        audiences.append('committee')
+    if NewsletterSubscription.objects.filter(user=user, is_active=True, confirmed_at__isnull=False).exists():
+        audiences.append('subscribers')
+    return audiences
+
+
+def get_watermark(user):
+    """Time up to which the user has read their inbox"""
+    state = InboxState.objects.filter(user=user).first()
+    return state.last_read_at if state else user.date_joined
+
+
+def sync_announcement(announcement):
+    """Index a published announcement under its audience, or drop it from every inbox"""
+    announcement_id = announcement.id
+    visible = announcement.is_published and not announcement.is_deleted
+    audience = announcement.target_audience
+    visible_at = (announcement.publish_date or announcement.created_at).timestamp()
+
+    def _sync():
+        try:
+            pipe = get_redis().pipeline()
+            for key_audience in AUDIENCES:
+                pipe.zrem(BROADCAST_KEY.format(audience=key_audience), announcement_id)
+            if visible:
+                key = BROADCAST_KEY.format(audience=audience)
+                pipe.zadd(key, {announcement_id: visible_at})
+                pipe.zremrangebyrank(key, 0, -settings.INBOX_BROADCAST_LIMIT - 1)
+            pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to sync announcement {announcement_id} to inbox: {e}")
+
+    transaction.on_commit(_sync)
+
+
+def rebuild_broadcast_index():
+    """Re-index the latest published announcements of every audience"""
+    pipe = get_redis().pipeline()
+    for audience in AUDIENCES:
+        key = BROADCAST_KEY.format(audience=audience)
+        announcements = Announcement.objects.filter(
+            is_published=True, target_audience=audience
+        ).annotate(
+            visible_at=Coalesce('publish_date', 'created_at')
+        ).order_by('-visible_at').values_list('id', 'visible_at')[:settings.INBOX_BROADCAST_LIMIT]
+
+        pipe.delete(key)
+        mapping = {announcement_id: visible_at.timestamp() for announcement_id, visible_at in announcements}
+        if mapping:
+            pipe.zadd(key, mapping)
+    pipe.execute()
+
+
+def add_inbox_item(user, kind, dedupe_key, title, body='', link='', event=None):
+    """Store a per-user inbox item once per dedupe key"""
+    item, created = InboxItem.objects.get_or_create(
+        user=user,
+        dedupe_key=dedupe_key,
+        defaults={'kind': kind, 'title': title, 'body': body, 'link': link, 'event': event}
+    )
+    if created:
+        _bump_unread([user.id])
+    return item
+
+
+def add_inbox_items(items):
+    """Bulk store per-user inbox items that are known to be new"""
+    InboxItem.objects.bulk_create(items)
+    _bump_unread([item.user_id for item in items])
+
+
+def _bump_unread(user_ids):
+    def _bump():
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hincrby(USER_KEY.format(user_id=user_id), 'unread', 1)
+            pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to update unread counters: {e}")
+
+    transaction.on_commit(_bump)
+
+
+def get_unread_count(user_id):
+    """Unread badge count served from Redis; rebuilt from the database on a cache miss
+
+    Counted in the database while Redis is unreachable, as get_inbox always is.
+    """
+    try:
+        return _cached_unread_count(user_id)
+    except RedisError as e:
+        logger.error(f"Failed to read the unread count of user {user_id}: {e}")
+        return _count_unread(user_id)
+
+
+def _cached_unread_count(user_id):
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.hmget(USER_KEY.format(user_id=user_id), 'watermark', 'unread')
+    pipe.get(AUDIENCES_KEY.format(user_id=user_id))
+    (watermark, personal), audiences = pipe.execute()
+
+    if watermark is None or audiences is None:
+        try:
+            watermark, personal, audiences = _rebuild_user_cache(user_id)
+        except User.DoesNotExist:
+            # Deleted since the token was issued
+            return 0
+    else:
+        personal = personal or 0
+        audiences = audiences.split(',')
+
+    now = time.time()
+    pipe = redis.pipeline(transaction=False)
+    for audience in audiences:
+        pipe.zcount(BROADCAST_KEY.format(audience=audience), f'({watermark}', now)
+
+    return int(personal) + sum(pipe.execute())
+
+
+def _count_unread(user_id):
+    user = User.objects.filter(id=user_id).first()
+    if user is None:
+        return 0
+
+    watermark = get_watermark(user)
+    personal = InboxItem.objects.filter(user=user, created_at__gt=watermark).count()
+    broadcasts = Announcement.objects.filter(
+        is_published=True,
+        target_audience__in=get_user_audiences(user)
+    ).annotate(
+        visible_at=Coalesce('publish_date', 'created_at')
+    ).filter(
+        visible_at__gt=watermark,
+        visible_at__lte=timezone.now()
+    ).count()
+    return personal + broadcasts
+
+
+def _rebuild_user_cache(user_id):
+    user = User.objects.get(id=user_id)
+    watermark = get_watermark(user)
+    audiences = get_user_audiences(user)
+    personal = InboxItem.objects.filter(user=user, created_at__gt=watermark).count()
+
+    pipe = get_redis().pipeline()
+    pipe.hset(USER_KEY.format(user_id=user_id), mapping={'watermark': watermark.timestamp(), 'unread': personal})
+    pipe.set(AUDIENCES_KEY.format(user_id=user_id), ','.join(audiences), ex=settings.INBOX_AUDIENCE_TTL)
+    pipe.execute()
+
+    return watermark.timestamp(), personal, audiences
+
+
+def is_user_active(user_id):
+    """Whether the user is active and verified, cached next to their inbox watermark"""
+    key = USER_KEY.format(user_id=user_id)
+    try:
+        active = get_redis().hget(key, 'active')
+    except RedisError as e:
+        logger.error(f"Failed to read the active flag of user {user_id}: {e}")
+        active = None
+    if active is not None:
+        return active == '1'
+
+    active = User.objects.filter(id=user_id, is_active=True, is_email_verified=True, is_deleted=False).exists()
+    try:
+        get_redis().hset(key, 'active', int(active))
+    except RedisError as e:
+        logger.error(f"Failed to cache the active flag of user {user_id}: {e}")
+    return active
+
+
+def forget_user_active(user_id):
+    """Drop the cached active flag once the user's row changes"""
+    def _forget():
+        try:
+            get_redis().hdel(USER_KEY.format(user_id=user_id), 'active')
+        except RedisError as e:
+            logger.error(f"Failed to drop the active flag of user {user_id}: {e}")
+
+    transaction.on_commit(_forget)
+
+
+def mark_inbox_read(user):
+    """Move the user's read watermark to now"""
+    now = timezone.now()
+    InboxState.objects.update_or_create(user=user, defaults={'last_read_at': now})
+
+    def _reset():
+        try:
+            get_redis().hset(USER_KEY.format(user_id=user.id), mapping={'watermark': now.timestamp(), 'unread': 0})
+        except RedisError as e:
+            logger.error(f"Failed to reset inbox counters for user {user.id}: {e}")
+
+    transaction.on_commit(_reset)
+    return now
+
+
+def get_inbox(user, limit=20, offset=0):
+    """Merge the user's broadcast announcements and personal items, newest first"""
+    audiences = get_user_audiences(user)
+    watermark = get_watermark(user)
+    window = offset + limit
+
+    announcements = Announcement.objects.filter(
+        is_published=True,
+        target_audience__in=audiences
+    ).annotate(
+        visible_at=Coalesce('publish_date', 'created_at'),
+        summary=Left('content', 200)
+    ).filter(
+        visible_at__lte=timezone.now()
+    ).defer('content').order_by('-visible_at')[:window]
+
+    items = InboxItem.objects.filter(user=user).order_by('-created_at')[:window]
+
+    entries = heapq.merge(
+        (_announcement_entry(announcement) for announcement in announcements),
+        (_item_entry(item) for item in items),
+        key=lambda entry: entry['created_at'],
+        reverse=True
+    )
+
+    page = list(islice(entries, offset, window))
+    for entry in page:
+        entry['is_read'] = entry['created_at'] <= watermark
+    return page
+
+
+def _announcement_entry(announcement):
+    return {
+        'kind': 'announcement',
+        'id': announcement.id,
+        'title': announcement.title,
+        'summary': announcement.summary,
+        'link': f"/announcements/{announcement.id}/",
+        'priority': announcement.priority,
+        'created_at': announcement.visible_at,
+    }
+
+
+def _item_entry(item):
+    return {
+        'kind': item.kind,
+        'id': item.id,
+        'title': item.title,
+        'summary': item.body,
+        'link': item.link,
+        'priority': None,
+        'created_at': item.created_at,
+    }
@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+
+import json
+import asyncio
+import logging
+from collections import defaultdict
+from redis import RedisError
+from redis import asyncio as aioredis
+
+from utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+ANNOUNCEMENTS_CHANNEL = 'live:announcements'
+EVENT_CHANNEL = 'live:event:{event_id}'
+
+
+def publish_live(channel, event, data):
+    """Publish a live update to the SSE clients once the current transaction commits"""
+    message = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+    def _publish():
+        try:
+            get_redis().publish(channel, message)
+        except RedisError as e:
+            logger.error(f"Failed to publish live update on {channel}: {e}")
+
+    transaction.on_commit(_publish)
+
+
+def publish_announcement(announcement):
+    publish_live(ANNOUNCEMENTS_CHANNEL, 'announcement', {
+        'id': announcement.id,
+        'title': announcement.title,
+        'announcement_type': announcement.announcement_type,
+        'priority': announcement.priority,
+        'target_audience': announcement.target_audience,
+        'publish_date': announcement.publish_date or announcement.created_at,
+    })
+
+
+def publish_seat_count(event):
+    registered = event.current_attendees_count
+    publish_live(EVENT_CHANNEL.format(event_id=event.id), 'seats', {
+        'event_id': event.id,
+        'registered': registered,
+        'capacity': event.capacity,
+        'remaining': max(event.capacity - registered, 0) if event.capacity is not None else None,
+    })
+
+
+class LiveHub:
+    """Fans Redis pub/sub messages out to every SSE client of this process over a single connection
+
+    Each client only owns a bounded queue, so idle connections cost a few
+    objects rather than a Redis connection or a thread.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._redis = None
+        self._pubsub = None
+        self._reader = None
+        self._lock = None
+        self._subscribers = defaultdict(set)
+
+    async def subscribe(self, channels):
+        self._bind_loop()
+        queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+
+        async with self._lock:
+            if self._pubsub is None:
+                self._redis = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+                self._pubsub = self._redis.pubsub()
+
+            new_channels = [channel for channel in channels if not self._subscribers[channel]]
+            for channel in channels:
+                self._subscribers[channel].add(queue)
+            if new_channels:
+                await self._pubsub.subscribe(*new_channels)
+
+            if self._reader is None:
+                self._reader = asyncio.create_task(self._read())
+
+        return queue
+
+    async def unsubscribe(self, queue, channels):
+        async with self._lock:
+            stale_channels = []
+            for channel in channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+                    stale_channels.append(channel)
+
+            if stale_channels and self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(*stale_channels)
+                except RedisError as e:
+                    logger.error(f"Failed to unsubscribe live channels: {e}")
+
+    def _bind_loop(self):
+        # Connections belong to one event loop; start over if we are called
+        # from another one (e.g. the dev server runs each stream in its own loop)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._redis = None
+            self._pubsub = None
+            self._reader = None
+            self._lock = asyncio.Lock()
+            self._subscribers = defaultdict(set)
+
+    async def _read(self):
+        try:
+            while True:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+
+                subscribers = self._subscribers.get(message['channel'])
+                if not subscribers:
+                    continue
+
+                frame = self._format(message['data'])
+                for queue in list(subscribers):
+                    try:
+                        queue.put_nowait(frame)
+                    except asyncio.QueueFull:
+                        # A stalled client only misses updates; it never blocks the others
+                        pass
+        except (RedisError, OSError) as e:
+            logger.error(f"Live update connection lost: {e}")
+        finally:
+            # Close every stream so the browsers reconnect and resubscribe
+            for queue in set().union(*self._subscribers.values()):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+            self._subscribers = defaultdict(set)
+            self._pubsub = None
+            self._reader = None
+
+    @staticmethod
+    def _format(data):
+        message = json.loads(data)
+        return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+hub = LiveHub()
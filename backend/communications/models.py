@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from utils.models import BaseModel
@@ -48,6 +49,15 @@ class Announcement(BaseModel):
     send_push = models.BooleanField(default=False, verbose_name='Send Push Notification')
     email_sent = models.BooleanField(default=False, verbose_name='Email Sent')
     push_sent = models.BooleanField(default=False, verbose_name='Push Sent')
+    delivery_task_id = models.CharField(max_length=64, blank=True, verbose_name='Delivery Task ID')
+    dispatch_claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='Dispatch Claimed At')
+    read_bitmap = models.BinaryField(
+        default=b'',
+        blank=True,
+        verbose_name='Read Bitmap',
+        help_text='zlib-compressed bitmap of reader user ids, compacted from Redis'
+    )
+    read_count = models.PositiveIntegerField(default=0, verbose_name='Read Count')
     target_audience = models.CharField(
         max_length=20,
         choices=[
@@ -68,6 +78,20 @@ class Announcement(BaseModel):
     def __str__(self):
         return self.title
 
+    @property
+    def is_visible(self):
+        """Published, not deleted and past its publish date"""
+        if not self.is_published or self.is_deleted:
+            return False
+        return self.publish_date is None or self.publish_date <= timezone.now()
+
+    @property
+    def has_pending_delivery(self):
+        """Whether a requested email or push notification has not been sent yet"""
+        if not self.is_published or self.is_deleted:
+            return False
+        return (self.send_email and not self.email_sent) or (self.send_push and not self.push_sent)
+
     @property
     def content_html(self):
         """Convert markdown content to HTML"""
@@ -140,3 +164,71 @@ class PushNotificationDevice(BaseModel):
 
     def __str__(self):
         return f"{self.user.username} - {self.device_type}"
+
+
+class EventReminder(models.Model):
+    registration = models.ForeignKey(
+        'events.Registration',
+        on_delete=models.CASCADE,
+        related_name='reminders',
+        verbose_name='Registration'
+    )
+    offset_hours = models.PositiveIntegerField(verbose_name='Offset (hours)')
+    sent_at = models.DateTimeField(auto_now_add=True, verbose_name='Sent At')
+
+    class Meta:
+        verbose_name = 'Event Reminder'
+        verbose_name_plural = 'Event Reminders'
+        unique_together = ['registration', 'offset_hours']
+
+    def __str__(self):
+        return f"{self.registration} - {self.offset_hours}h"
+
+
+class InboxItemKind(models.TextChoices):
+    EVENT_REMINDER = 'event_reminder', 'Event Reminder'
+    REGISTRATION = 'registration', 'Registration Confirmation'
+
+
+class InboxItem(models.Model):
+    """Notification addressed to a single user; broadcasts stay on Announcement"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inbox_items', verbose_name='User')
+    kind = models.CharField(max_length=20, choices=InboxItemKind.choices, verbose_name='Kind')
+    title = models.CharField(max_length=200, verbose_name='Title')
+    body = models.CharField(max_length=500, blank=True, verbose_name='Body')
+    link = models.CharField(max_length=300, blank=True, verbose_name='Link')
+    event = models.ForeignKey(
+        'events.Event',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='inbox_items',
+        verbose_name='Event'
+    )
+    dedupe_key = models.CharField(max_length=100, verbose_name='Dedupe Key')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+
+    class Meta:
+        verbose_name = 'Inbox Item'
+        verbose_name_plural = 'Inbox Items'
+        ordering = ['-created_at']
+        unique_together = ['user', 'dedupe_key']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.title}"
+
+
+class InboxState(models.Model):
+    """Per-user read watermark: everything newer than last_read_at is unread"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='inbox_state', verbose_name='User')
+    last_read_at = models.DateTimeField(verbose_name='Last Read At')
+
+    class Meta:
+        verbose_name = 'Inbox State'
+        verbose_name_plural = 'Inbox States'
+
+    def __str__(self):
+        return f"{self.user.username} - {self.last_read_at}"
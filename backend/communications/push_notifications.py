@@ -7,6 +7,7 @@ from pywebpush import webpush, WebPushException
 
 from communications.models import PushNotificationDevice
 from events.models import Registration
+from communications.utils import format_time_until
 
 logger = logging.getLogger(__name__)
 
@@ -106,21 +107,7 @@ class PushNotificationService:
             dict: Statistics of sent/failed notifications
         """
         if devices is None:
-            # Get devices based on announcement audience
-            if announcement.audience == 'all':
-                devices = PushNotificationDevice.objects.filter(is_active=True)
-            elif announcement.audience == 'members':
-                devices = PushNotificationDevice.objects.filter(
-                    user__is_member=True,
-                    is_active=True
-                )
-            elif announcement.audience == 'committee':
-                devices = PushNotificationDevice.objects.filter(
-                    user__is_committee_member=True,
-                    is_active=True
-                )
-            else:
-                devices = PushNotificationDevice.objects.none()
+            devices = self.get_audience_devices(announcement.target_audience)
 
         # Prepare notification data
         data = {
@@ -137,10 +124,70 @@ class PushNotificationService:
 
         return self.send_to_multiple(devices, data)
 
+    def send_announcement_digest_notification(
+            self,
+            announcements,
+            target_audience: str
+    ) -> Dict[str, int]:
+        """
+        Send a single push notification summarizing several announcements
+
+        Args:
+            announcements: Announcement model instances, oldest first
+            target_audience: Audience shared by the announcements
+
+        Returns:
+            dict: Statistics of sent/failed notifications
+        """
+        titles = [announcement.title for announcement in announcements]
+
+        data = {
+            'title': f'{len(titles)} new announcements',
+            'body': ' • '.join(titles)[:200],
+            'icon': '/static/images/logo.png',
+            'badge': '/static/images/badge.png',
+            'data': {
+                'type': 'announcement_digest',
+                'ids': [announcement.id for announcement in announcements],
+                'url': '/announcements/'
+            }
+        }
+
+        return self.send_to_multiple(self.get_audience_devices(target_audience), data)
+
+    def get_audience_devices(self, target_audience: str):
+        """
+        Active devices of an announcement audience, streamed in id order
+
+        Args:
+            target_audience: Announcement target audience
+
+        Returns:
+            iterator: PushNotificationDevice objects
+        """
+        if target_audience == 'all':
+            devices = PushNotificationDevice.objects.filter(is_active=True)
+        elif target_audience == 'members':
+            devices = PushNotificationDevice.objects.filter(
+                user__is_member=True,
+                is_active=True
+            )
+        elif target_audience == 'committee':
+            devices = PushNotificationDevice.objects.filter(
+                user__is_committee=True,
+                is_active=True
+            )
+        else:
+            devices = PushNotificationDevice.objects.none()
+
+        # Stream devices instead of loading the whole audience at once
+        return devices.order_by('id').iterator(chunk_size=settings.NOTIFICATION_BATCH_SIZE)
+
     def send_event_reminder_notification(
             self,
             event,
-            devices: Optional[List[PushNotificationDevice]] = None
+            devices: Optional[List[PushNotificationDevice]] = None,
+            starts_in: Optional[str] = None
     ) -> Dict[str, int]:
         """
         Send push notification for event reminder
@@ -148,6 +195,7 @@ class PushNotificationService:
         Args:
             event: Event model instance
             devices: Optional list of specific devices to send to
+            starts_in: Time left until the start, e.g. '3 hours'; worked out from now if not given
 
         Returns:
             dict: Statistics of sent/failed notifications
@@ -164,10 +212,13 @@ class PushNotificationService:
                 is_active=True
             )
 
+        if starts_in is None:
+            starts_in = format_time_until(event.start_time)
+
         # Prepare notification data
         data = {
             'title': f'Event Reminder: {event.title}',
-            'body': f'Your event "{event.title}" starts in 24 hours!',
+            'body': f'Your event "{event.title}" starts in {starts_in}!',
             'icon': '/static/images/logo.png',
             'badge': '/static/images/badge.png',
             'data': {
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction
+
+import uuid
+import zlib
+import logging
+from itertools import zip_longest
+
+from communications.models import Announcement
+from utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Reads land in a per-announcement Redis bitmap (bit n = user id n) and the
+# announcement is flagged dirty; compaction ORs the live bits into the
+# compressed bitmap column and refreshes read_count. A live bitmap holds
+# every read: once it has expired, the compacted bitmap is loaded back into
+# Redis before it is read or written, so lookups are GETBIT and BITCOUNT.
+RECEIPTS_KEY = 'receipts:announcement:{announcement_id}'
+DIRTY_KEY = 'receipts:dirty'
+
+
+def mark_announcement_read(announcement_id, user_id):
+    """Record that a user has read an announcement"""
+    redis = get_redis(decode_responses=False)
+    key = _load_bitmap(redis, announcement_id)
+    pipe = redis.pipeline()
+    pipe.setbit(key, user_id, 1)
+    pipe.expire(key, settings.READ_RECEIPT_TTL)
+    pipe.sadd(DIRTY_KEY, announcement_id)
+    pipe.execute()
+
+
+def has_read_announcement(announcement_id, user_id):
+    """Whether a user has read an announcement, live or already compacted"""
+    redis = get_redis(decode_responses=False)
+    return bool(redis.getbit(_load_bitmap(redis, announcement_id), user_id))
+
+
+def get_read_count(announcement):
+    """Number of readers including reads not compacted yet"""
+    redis = get_redis(decode_responses=False)
+    key = RECEIPTS_KEY.format(announcement_id=announcement.id)
+    if not redis.exists(key):
+        # Every read was compacted before the live bitmap expired
+        return announcement.read_count
+    return redis.bitcount(key)
+
+
+def _load_bitmap(redis, announcement_id):
+    """Key of the announcement's live bitmap, loaded from the compacted one if it has expired"""
+    key = RECEIPTS_KEY.format(announcement_id=announcement_id)
+    if redis.exists(key):
+        return key
+
+    stored = Announcement.all_objects.filter(id=announcement_id).values_list('read_bitmap', flat=True).first()
+    bitmap = decompress_bitmap(stored)
+    pipe = redis.pipeline()
+    # OR-ing the compacted bits in keeps reads that raced this load
+    pipe.set(key, b'', nx=True)
+    if bitmap:
+        staging = f"{key}:loading:{uuid.uuid4().hex}"
+        pipe.set(staging, bitmap, ex=60)
+        pipe.bitop('OR', key, key, staging)
+        pipe.delete(staging)
+    pipe.expire(key, settings.READ_RECEIPT_TTL)
+    pipe.execute()
+    return key
+
+
+def compact_read_receipts(batch_size=100):
+    """Fold the live bitmaps of dirty announcements into Postgres and return how many were compacted"""
+    redis = get_redis(decode_responses=False)
+    compacted = 0
+
+    while True:
+        announcement_ids = redis.spop(DIRTY_KEY, batch_size)
+        if not announcement_ids:
+            break
+
+        for announcement_id in map(int, announcement_ids):
+            live = redis.get(RECEIPTS_KEY.format(announcement_id=announcement_id))
+            if not live:
+                continue
+
+            with transaction.atomic():
+                stored = Announcement.all_objects.select_for_update().filter(
+                    id=announcement_id
+                ).values_list('read_bitmap', flat=True).first()
+
+                if stored is None:
+                    redis.delete(RECEIPTS_KEY.format(announcement_id=announcement_id))
+                    continue
+
+                merged = _merge(decompress_bitmap(stored), live)
+                # A queryset update keeps the save signals (and delivery rescheduling) out of it
+                Announcement.all_objects.filter(id=announcement_id).update(
+                    read_bitmap=zlib.compress(merged),
+                    read_count=_count_bits(merged)
+                )
+            compacted += 1
+
+    return compacted
+
+
+def decompress_bitmap(data):
+    return zlib.decompress(bytes(data)) if data else b''
+
+
+def _merge(stored, live):
+    return bytes(a | b for a, b in zip_longest(stored, live, fillvalue=0))
+
+
+def _count_bits(bitmap):
+    return int.from_bytes(bitmap, 'big').bit_count()
+
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+
+from events.models import Registration
+from communications.models import Announcement, InboxItemKind
+from communications.tasks import schedule_announcement_delivery
+from communications.inbox import sync_announcement, add_inbox_item, forget_user_active
+from communications.live import publish_announcement
+
+User = get_user_model()
+
+# Fields written by the delivery itself; saving only these never reschedules
+DELIVERY_FIELDS = {'email_sent', 'push_sent', 'delivery_task_id', 'dispatch_claimed_at'}
+
+
+@receiver(post_init, sender=Announcement)
+def remember_announcement_visibility(sender, instance, **kwargs):
+    # False for new rows, and when a field it depends on was deferred; such saves announce as before
+    loaded = {'is_published', 'is_deleted', 'publish_date'} <= instance.__dict__.keys()
+    instance._was_visible = instance.is_visible if loaded and instance.pk is not None else False
+
+
+@receiver(post_save, sender=Announcement)
+def schedule_announcement_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= DELIVERY_FIELDS:
+        return
+
+    # Edits, unpublishing and soft deletes all revoke the queued task; a new
+    # one is queued for the publish date while any channel is still pending.
+    schedule_announcement_delivery(instance)
+    sync_announcement(instance)
+
+    # Only the save that makes it visible goes live; announcements with a
+    # later publish date go live from their ETA task
+    visible = instance.is_visible
+    if visible and not instance._was_visible:
+        publish_announcement(instance)
+    instance._was_visible = visible
+
+
+@receiver(post_save, sender=Registration)
+def add_registration_to_inbox(sender, instance, **kwargs):
+    if instance.status != Registration.StatusChoices.CONFIRMED or instance.is_deleted:
+        return
+
+    event = instance.event
+    add_inbox_item(
+        instance.user,
+        InboxItemKind.REGISTRATION,
+        f"registration:{instance.id}",
+        title=f"Registration confirmed: {event.title}",
+        body=f"Your seat for \"{event.title}\" on {event.start_time:%Y-%m-%d %H:%M} is confirmed.",
+        link=f"/events/{event.slug}/",
+        event=event
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_active_on_change(sender, instance, **kwargs):
+    # Deactivation, verification and soft deletes all go through save()
+    forget_user_active(instance.id)
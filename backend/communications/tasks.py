@@ -1,42 +1,86 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
+import time
+import uuid
 import logging
-from celery import shared_task
-from datetime import timedelta
+from celery import shared_task, current_app
+from datetime import datetime, timedelta
 
 from events.models import Event, Registration
-from communications.models import Announcement, NewsletterSubscription
-from communications.utils import send_announcement_email, send_event_reminder, get_announcement_recipients
+from communications.models import (
+    Announcement, AnnouncementType, NewsletterSubscription, PushNotificationDevice, EventReminder,
+    InboxItem, InboxItemKind
+)
+from communications.utils import (
+    send_announcement_email, send_bulk_email, send_event_reminder_batch, format_time_until, render_newsletter_digest,
+    render_announcement_digest, iter_audience, get_newsletter_segments, iter_newsletter_segment
+)
 from communications.push_notifications import push_service
+from communications.inbox import add_inbox_items, rebuild_broadcast_index
+from communications.receipts import compact_read_receipts
+from communications.live import publish_announcement
+from communications.digest import should_coalesce, add_to_digest, pop_digest
+from utils.dispatch import enqueue_on_commit
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
-def send_announcement_notifications(self, announcement_id):
-    """Send email and push notifications for an announcement"""
+# The hard limit stays below ANNOUNCEMENT_CLAIM_TIMEOUT, so a killed delivery's
+# claim is only taken over once the worker is gone
+@shared_task(bind=True, max_retries=3, soft_time_limit=25 * 60, time_limit=30 * 60)
+def send_announcement_notifications(self, announcement_id, announce_live=False):
+    """Send email and push notifications for an announcement
+
+    announce_live is set for announcements scheduled for a later publish date,
+    whose live update can only go out once that date is reached.
+    """
+    # Only the task currently scheduled for the announcement may deliver it, and
+    # only while no other worker holds the dispatch claim.
+    claimed = Announcement.objects.filter(
+        id=announcement_id,
+        delivery_task_id=self.request.id,
+        dispatch_claimed_at__isnull=True
+    ).update(dispatch_claimed_at=timezone.now())
+    
+    if not claimed:
+        logger.info(f"Delivery {self.request.id} of announcement {announcement_id} superseded or already running")
+        return f"Delivery of announcement {announcement_id} skipped"
+    
     try:
         announcement = Announcement.objects.get(id=announcement_id)
         
+        if announce_live:
+            publish_announcement(announcement)
+        
+        # Non-urgent bursts to the same audience are merged into one digest
+        if announcement.has_pending_delivery and should_coalesce(announcement):
+            if add_to_digest(announcement):
+                send_announcement_digest.apply_async(
+                    args=[announcement.target_audience, announcement.priority],
+                    countdown=settings.ANNOUNCEMENT_DIGEST_WINDOW
+                )
+            logger.info(f"Announcement {announcement.id} queued for the {announcement.target_audience} digest")
+            return f"Announcement {announcement.id} queued for digest"
+        
         # Send email notifications
         if announcement.send_email and not announcement.email_sent:
-            recipients = get_announcement_recipients(announcement)
-            if recipients:
-                success = send_announcement_email(announcement, recipients)
-                if success:
-                    announcement.email_sent = True
-                    announcement.save()
-                    logger.info(f"Email notifications sent for announcement {announcement.id}")
+            snapshot = announcement.publish_date or timezone.now()
+            sent_count = _send_announcement_to_audience(announcement, announcement.target_audience, snapshot)
+            if sent_count:
+                Announcement.objects.filter(id=announcement.id).update(email_sent=True)
+                logger.info(f"Email notifications sent to {sent_count} recipients for announcement {announcement.id}")
         
         # Send push notifications
         if announcement.send_push and not announcement.push_sent:
-            sent_count = push_service.send_announcement_notification(announcement)
-            if sent_count > 0:
-                announcement.push_sent = True
-                announcement.save()
-                logger.info(f"Push notifications sent to {sent_count} devices for announcement {announcement.id}")
+            stats = push_service.send_announcement_notification(announcement)
+            if stats['sent'] > 0:
+                Announcement.objects.filter(id=announcement.id).update(push_sent=True)
+                logger.info(f"Push notifications sent to {stats['sent']} devices for announcement {announcement.id}")
         
         return f"Notifications sent for announcement: {announcement.title}"
         
@@ -46,6 +90,143 @@ def send_announcement_notifications(self, announcement_id):
     except Exception as exc:
         logger.error(f"Failed to send announcement notifications: {exc}")
         raise self.retry(exc=exc, countdown=60)
+    finally:
+        # Released on every exit so the retry, which keeps the task id, can claim again
+        _release_dispatch_claim(announcement_id, self.request.id)
+
+
+def _release_dispatch_claim(announcement_id, task_id):
+    Announcement.all_objects.filter(
+        id=announcement_id, delivery_task_id=task_id
+    ).update(dispatch_claimed_at=None)
+
+
+def schedule_announcement_delivery(announcement):
+    """Revoke the queued delivery of an announcement and queue a new one for its publish date"""
+    if announcement.dispatch_claimed_at and not _is_claim_stale(announcement.dispatch_claimed_at):
+        # A worker is delivering it right now; channels it misses are picked
+        # up by the sweeper once the claim is released.
+        return announcement.delivery_task_id
+    
+    previous_task_id = announcement.delivery_task_id
+    if previous_task_id:
+        transaction.on_commit(lambda: current_app.control.revoke(previous_task_id))
+    
+    now = timezone.now()
+    scheduled_later = bool(
+        announcement.is_published and not announcement.is_deleted
+        and announcement.publish_date and announcement.publish_date > now
+    )
+    
+    task_id = ''
+    if announcement.has_pending_delivery or scheduled_later:
+        eta = max(announcement.publish_date or now, now)
+        task_id = enqueue_on_commit(
+            send_announcement_notifications, announcement.id, eta=eta, announce_live=scheduled_later
+        )
+    
+    # A queryset update keeps the save signals from firing again
+    Announcement.all_objects.filter(id=announcement.id).update(
+        delivery_task_id=task_id, dispatch_claimed_at=None
+    )
+    announcement.delivery_task_id = task_id
+    announcement.dispatch_claimed_at = None
+    return task_id
+
+
+def _is_claim_stale(claimed_at):
+    return claimed_at < timezone.now() - timedelta(seconds=settings.ANNOUNCEMENT_CLAIM_TIMEOUT)
+
+
+@shared_task(soft_time_limit=25 * 60, time_limit=30 * 60)
+def send_announcement_digest(target_audience, priority):
+    """Send the announcements collected in a digest window as one email and one push"""
+    announcement_ids = pop_digest(target_audience, priority)
+    if not announcement_ids:
+        return "Digest is empty"
+    
+    # Claim the announcements so a concurrent delivery cannot send them twice
+    now = timezone.now()
+    with transaction.atomic():
+        claimed_ids = list(Announcement.objects.select_for_update(skip_locked=True).filter(
+            id__in=announcement_ids,
+            is_published=True,
+            dispatch_claimed_at__isnull=True
+        ).values_list('id', flat=True))
+        Announcement.objects.filter(id__in=claimed_ids).update(dispatch_claimed_at=now)
+    
+    try:
+        announcements = list(Announcement.objects.filter(id__in=claimed_ids).order_by('publish_date', 'id'))
+        
+        email_batch = [a for a in announcements if a.send_email and not a.email_sent]
+        push_batch = [a for a in announcements if a.send_push and not a.push_sent]
+        
+        if len(email_batch) == 1:
+            announcement = email_batch[0]
+            snapshot = announcement.publish_date or now
+            if _send_announcement_to_audience(announcement, target_audience, snapshot):
+                Announcement.objects.filter(id=announcement.id).update(email_sent=True)
+        elif email_batch:
+            subject = f"[CS Association] {len(email_batch)} new announcements"
+            html_message = render_announcement_digest(email_batch)
+            snapshot = max(a.publish_date or a.created_at for a in email_batch)
+            
+            sent_count = 0
+            for chunk in iter_audience(target_audience, snapshot):
+                if send_bulk_email(subject, html_message, [email for _, email in chunk]):
+                    sent_count += len(chunk)
+            
+            if sent_count:
+                Announcement.objects.filter(id__in=[a.id for a in email_batch]).update(email_sent=True)
+        
+        if len(push_batch) == 1:
+            stats = push_service.send_announcement_notification(push_batch[0])
+        elif push_batch:
+            stats = push_service.send_announcement_digest_notification(push_batch, target_audience)
+        else:
+            stats = {'sent': 0}
+        
+        if stats['sent'] > 0:
+            Announcement.objects.filter(id__in=[a.id for a in push_batch]).update(push_sent=True)
+        
+        logger.info(f"Digest of {len(announcements)} announcements sent to {target_audience} ({priority})")
+        return f"Digest of {len(announcements)} announcements sent to {target_audience}"
+        
+    except Exception as exc:
+        logger.error(f"Failed to send announcement digest: {exc}")
+        raise exc
+    finally:
+        # Unsent announcements are picked up again by the scheduled-announcement sweeper
+        Announcement.all_objects.filter(id__in=claimed_ids).update(dispatch_claimed_at=None)
+
+
+@shared_task
+def send_push_broadcast(title, body, data=None, target_audience='all'):
+    """Send an ad-hoc push notification to the devices of a target audience"""
+    try:
+        devices = PushNotificationDevice.objects.filter(is_active=True, user__is_active=True)
+        
+        if target_audience == 'members':
+            devices = devices.filter(user__is_member=True)
+        elif target_audience == 'committee':
+            devices = devices.filter(user__is_committee=True)
+        
+        notification = {
+            'title': title,
+            'body': body,
+            'icon': '/static/images/logo.png',
+            'badge': '/static/images/badge.png',
+            'data': data or {},
+        }
+        
+        stats = push_service.send_to_multiple(devices, notification)
+        
+        logger.info(f"Push broadcast sent to {stats['sent']} devices ({stats['failed']} failed)")
+        return f"Push broadcast sent to {stats['sent']} devices"
+        
+    except Exception as exc:
+        logger.error(f"Failed to send push broadcast: {exc}")
+        raise exc
 
 
 @shared_task(bind=True, max_retries=3)
@@ -71,126 +252,165 @@ def send_newsletter_confirmation_task(self, subscription_id):
         raise self.retry(exc=exc, countdown=60)
 
 
-@shared_task
+@shared_task(soft_time_limit=9 * 60, time_limit=10 * 60)
 def send_event_reminders():
-    """Send reminders for events starting in 24 hours"""
+    """Send due event reminders for every configured offset, once per registration and offset"""
     try:
-        # Get events starting in 24 hours
-        tomorrow = timezone.now() + timedelta(hours=24)
-        start_range = tomorrow - timedelta(minutes=30)  # 30-minute window
-        end_range = tomorrow + timedelta(minutes=30)
-        
-        events = Event.objects.filter(
-            start_time__range=(start_range, end_range),
-            status='published',
-            is_deleted=False
-        )
-        
+        now = timezone.now()
+        # Beat runs this every 10 minutes: batches not claimed by then are
+        # left to the next run rather than cut off by the time limit
+        deadline = time.monotonic() + 8 * 60
+        offsets = sorted(set(settings.EVENT_REMINDER_OFFSETS))
+
         total_sent = 0
-        
-        for event in events:
-            # Get confirmed registrations
-            registrations = Registration.objects.filter(
-                event=event,
-                status='confirmed',
+
+        for index, offset_hours in enumerate(offsets):
+            # An offset is due once the event is closer than the offset itself but
+            # not yet inside the next smaller offset, which takes over from there.
+            window_start = now + timedelta(hours=offsets[index - 1]) if index else now
+            window_end = now + timedelta(hours=offset_hours)
+
+            events = Event.objects.filter(
+                start_time__gt=window_start,
+                start_time__lte=window_end,
+                status=Event.StatusChoices.PUBLISHED,
                 is_deleted=False
-            ).select_related('user')
-            
-            for registration in registrations:
-                try:
-                    # Send email reminder
-                    send_event_reminder(event, registration.user)
-                    
-                    # Send push notification reminder
-                    push_service.send_event_reminder_notification(event, registration.user)
-                    
-                    total_sent += 1
-                    
-                except Exception as e:
-                    logger.error(f"Failed to send reminder to {registration.user.email}: {str(e)}")
-        
+            )
+
+            for event in events:
+                total_sent += _send_event_reminders_for_offset(event, offset_hours, deadline)
+
         logger.info(f"Event reminders sent to {total_sent} users")
         return f"Event reminders sent to {total_sent} users"
-        
+
     except Exception as exc:
         logger.error(f"Failed to send event reminders: {exc}")
         raise exc
 
 
-@shared_task
+def _send_event_reminders_for_offset(event, offset_hours, deadline):
+    """Claim and send pending reminders of one event for one offset in batches until the deadline"""
+    batch_size = settings.NOTIFICATION_BATCH_SIZE
+
+    pending = Registration.objects.filter(
+        event=event,
+        status=Registration.StatusChoices.CONFIRMED,
+        is_deleted=False
+    ).exclude(
+        reminders__offset_hours=offset_hours
+    ).select_related('user').prefetch_related(
+        Prefetch(
+            'user__push_devices',
+            queryset=PushNotificationDevice.objects.filter(is_active=True),
+            to_attr='active_push_devices'
+        )
+    ).order_by('id')
+
+    total_sent = 0
+
+    while time.monotonic() < deadline:
+        # Rows locked by a concurrent run are skipped; the sent markers are
+        # committed together with the claim so every reminder is sent once.
+        with transaction.atomic():
+            batch = list(pending.select_for_update(skip_locked=True, of=('self',))[:batch_size])
+            if not batch:
+                break
+            claims = EventReminder.objects.bulk_create([
+                EventReminder(registration=registration, offset_hours=offset_hours)
+                for registration in batch
+            ])
+
+        # Worded from the actual start: a late registration may be well inside its offset
+        starts_in = format_time_until(event.start_time)
+        users = send_event_reminder_batch(event, [registration.user for registration in batch], starts_in)
+        sent_ids = {user.id for user in users}
+        unsent = [claim.id for claim, registration in zip(claims, batch) if registration.user_id not in sent_ids]
+
+        if unsent:
+            # Release the claims of the unsent reminders so the next run retries them
+            EventReminder.objects.filter(id__in=unsent).delete()
+            logger.error(f"Failed to send {len(unsent)} reminders for event {event.id}, will retry")
+
+        batch = [registration for registration in batch if registration.user_id in sent_ids]
+
+        devices = [device for user in users for device in user.active_push_devices]
+        if devices:
+            push_service.send_event_reminder_notification(event, devices, starts_in=starts_in)
+
+        add_inbox_items([
+            InboxItem(
+                user=registration.user,
+                kind=InboxItemKind.EVENT_REMINDER,
+                title=f"Event Reminder: {event.title}",
+                body=f"\"{event.title}\" starts in {starts_in}.",
+                link=f"/events/{event.slug}/",
+                event=event,
+                dedupe_key=f"reminder:{registration.id}:{offset_hours}"
+            )
+            for registration in batch
+        ])
+
+        total_sent += len(users)
+
+        if unsent:
+            break
+
+    return total_sent
+
+
+@shared_task(soft_time_limit=25 * 60, time_limit=30 * 60)
 def send_weekly_newsletter():
-    """Send weekly newsletter with recent announcements and upcoming events"""
+    """Send the weekly digest, rendered once per subscriber segment"""
     try:
-        # Get active newsletter subscribers
-        subscribers = NewsletterSubscription.objects.filter(
-            is_active=True,
-            confirmed_at__isnull=False,
-            is_deleted=False
-        )
+        now = timezone.now()
+        
+        # Group active subscribers by the announcement types they chose
+        segments = get_newsletter_segments(snapshot=now)
         
-        if not subscribers.exists():
+        if not segments:
             logger.info("No active newsletter subscribers found")
             return "No active newsletter subscribers found"
         
-        # Get recent announcements (last 7 days)
-        week_ago = timezone.now() - timedelta(days=7)
+        # Get recent announcements (last 7 days), filtered per segment below
+        week_ago = now - timedelta(days=7)
         recent_announcements = Announcement.objects.filter(
             is_published=True,
-            publish_date__gte=week_ago,
-            announcement_type__in=['general', 'academic', 'newsletter'],
+            publish_date__range=(week_ago, now),
             is_deleted=False
-        ).order_by('-publish_date')[:5]
+        ).exclude(
+            announcement_type=AnnouncementType.NEWSLETTER
+        ).order_by('-publish_date')
         
         # Get upcoming events (next 14 days)
-        two_weeks_ahead = timezone.now() + timedelta(days=14)
-        upcoming_events = Event.objects.filter(
-            start_time__range=(timezone.now(), two_weeks_ahead),
+        two_weeks_ahead = now + timedelta(days=14)
+        upcoming_events = list(Event.objects.filter(
+            start_time__range=(now, two_weeks_ahead),
             status='published',
             is_deleted=False
-        ).order_by('start_time')[:5]
+        ).order_by('start_time')[:5])
         
-        # Create newsletter announcement
-        newsletter_content = f"""
-# Weekly Newsletter - {timezone.now().strftime('%B %d, %Y')}
-
-## Recent Announcements
-"""
-        
-        for announcement in recent_announcements:
-            newsletter_content += f"- **{announcement.title}** ({announcement.publish_date.strftime('%B %d')})\n"
-        
-        newsletter_content += "\n## Upcoming Events\n"
-        
-        for event in upcoming_events:
-            newsletter_content += f"- **{event.title}** - {event.start_time.strftime('%B %d, %Y at %I:%M %p')}\n"
-        
-        if not recent_announcements.exists() and not upcoming_events.exists():
-            newsletter_content += "\nNo recent announcements or upcoming events this week."
-        
-        # Create newsletter announcement
-        newsletter = Announcement.objects.create(
-            title=f"Weekly Newsletter - {timezone.now().strftime('%B %d, %Y')}",
-            content=newsletter_content,
-            announcement_type='newsletter',
-            priority='normal',
-            author_id=1,  # System user
-            is_published=True,
-            publish_date=timezone.now(),
-            send_email=True,
-            target_audience='subscribers'
-        )
+        subject = f"[CS Association] Weekly Newsletter - {now.strftime('%B %d, %Y')}"
+        total_sent = 0
+        failed = 0
         
-        # Send to subscribers
-        subscriber_emails = list(subscribers.values_list('email', flat=True))
-        success = send_announcement_email(newsletter, subscriber_emails)
+        for categories, stored_categories in segments.items():
+            # Filtered before slicing, so a busy category cannot crowd out a quiet one
+            announcements = list(recent_announcements.filter(announcement_type__in=categories)[:5])
+            events = upcoming_events if AnnouncementType.EVENT in categories else []
+            
+            html_message = render_newsletter_digest(announcements, events, now)
+            
+            for chunk in iter_newsletter_segment(stored_categories, snapshot=now):
+                if send_bulk_email(subject, html_message, [email for _, email in chunk]):
+                    total_sent += len(chunk)
+                else:
+                    failed += len(chunk)
         
-        if success:
-            newsletter.email_sent = True
-            newsletter.save()
-            logger.info(f"Weekly newsletter sent to {len(subscriber_emails)} subscribers")
-            return f"Weekly newsletter sent to {len(subscriber_emails)} subscribers"
-        else:
+        if not total_sent and failed:
             raise Exception("Failed to send weekly newsletter")
+        
+        logger.info(f"Weekly newsletter sent to {total_sent} subscribers in {len(segments)} segments")
+        return f"Weekly newsletter sent to {total_sent} subscribers in {len(segments)} segments"
             
     except Exception as exc:
         logger.error(f"Failed to send weekly newsletter: {exc}")
@@ -219,61 +439,126 @@ def cleanup_expired_tokens():
         raise exc
 
 
-@shared_task
-def send_bulk_announcement(announcement_id, recipient_emails):
-    """Send announcement to a specific list of recipients"""
+@shared_task(soft_time_limit=5 * 60, time_limit=6 * 60)
+def send_bulk_announcement(announcement_id, target_audience, snapshot=None, throttle=1):
+    """Send announcement to an audience, resolved chunk by chunk as of the snapshot time
+
+    Each chunk is its own task, queued `throttle` seconds after the previous
+    one, so the email server is paced without a worker sleeping through it.
+    """
     try:
         announcement = Announcement.objects.get(id=announcement_id)
+        snapshot = datetime.fromisoformat(snapshot) if snapshot else timezone.now()
         
-        # Split recipients into batches to avoid overwhelming the email server
-        batch_size = 50
-        total_sent = 0
-        
-        for i in range(0, len(recipient_emails), batch_size):
-            batch = recipient_emails[i:i + batch_size]
-            success = send_announcement_email(announcement, batch)
-            
-            if success:
-                total_sent += len(batch)
-                logger.info(f"Sent announcement to batch of {len(batch)} recipients")
-            
-            # Small delay between batches
-            import time
-            time.sleep(1)
+        total_queued = batches = 0
+        for batches, chunk in enumerate(iter_audience(target_audience, snapshot), start=1):
+            send_announcement_batch.apply_async(
+                args=[announcement.id, [email for _, email in chunk]],
+                countdown=(batches - 1) * throttle
+            )
+            total_queued += len(chunk)
         
-        logger.info(f"Bulk announcement sent to {total_sent} recipients")
-        return f"Bulk announcement sent to {total_sent} recipients"
+        logger.info(f"Bulk announcement queued for {total_queued} recipients in {batches} batches")
+        return f"Bulk announcement queued for {total_queued} recipients"
         
     except Exception as exc:
         logger.error(f"Failed to send bulk announcement: {exc}")
         raise exc
 
 
+@shared_task(bind=True, max_retries=3, soft_time_limit=60, time_limit=2 * 60)
+def send_announcement_batch(self, announcement_id, recipients):
+    """Email an announcement to one chunk of a bulk send"""
+    announcement = Announcement.objects.filter(id=announcement_id).first()
+    if announcement is None:
+        return f"Announcement {announcement_id} not found"
+    
+    if not send_announcement_email(announcement, recipients):
+        raise self.retry(exc=Exception("Failed to send announcement batch"), countdown=60)
+    
+    logger.info(f"Sent announcement to batch of {len(recipients)} recipients")
+    return f"Sent announcement to batch of {len(recipients)} recipients"
+
+
+def _send_announcement_to_audience(announcement, target_audience, snapshot):
+    """Email an announcement to an audience in chunks and return the number of recipients reached"""
+    total_sent = 0
+    
+    for chunk in iter_audience(target_audience, snapshot):
+        batch = [email for _, email in chunk]
+        if send_announcement_email(announcement, batch):
+            total_sent += len(batch)
+            logger.info(f"Sent announcement to batch of {len(batch)} recipients")
+    
+    return total_sent
+
+
 @shared_task
 def process_scheduled_announcements():
-    """Process announcements scheduled for publication"""
+    """Safety net for announcements whose scheduled delivery task was lost"""
     try:
         now = timezone.now()
         
-        # Get announcements scheduled for publication
-        scheduled_announcements = Announcement.objects.filter(
-            is_published=True,
-            publish_date__lte=now,
-            email_sent=False,
-            send_email=True,
-            is_deleted=False
-        )
+        # Due announcements with pending channels that nobody is delivering;
+        # the grace period leaves on-time ETA tasks alone.
+        overdue = Announcement.objects.filter(
+            is_published=True
+        ).filter(
+            Q(publish_date__isnull=True) |
+            Q(publish_date__lte=now - timedelta(seconds=settings.ANNOUNCEMENT_DISPATCH_GRACE))
+        ).filter(
+            Q(send_email=True, email_sent=False) | Q(send_push=True, push_sent=False)
+        ).filter(
+            Q(dispatch_claimed_at__isnull=True) |
+            Q(dispatch_claimed_at__lt=now - timedelta(seconds=settings.ANNOUNCEMENT_CLAIM_TIMEOUT))
+        ).filter(
+            updated_at__lte=now - timedelta(seconds=settings.ANNOUNCEMENT_DISPATCH_GRACE)
+        ).values_list('id', 'delivery_task_id')
         
         processed_count = 0
         
-        for announcement in scheduled_announcements:
-            # Send notifications
-            send_announcement_notifications.delay(announcement.id)
-            processed_count += 1
+        for announcement_id, delivery_task_id in overdue:
+            # Swap in a new task id only if nobody rescheduled it meanwhile, so
+            # the lost task is superseded; touching updated_at keeps the next
+            # sweep from re-queueing it before the new task had a chance to run.
+            task_id = str(uuid.uuid4())
+            swapped = Announcement.objects.filter(
+                id=announcement_id, delivery_task_id=delivery_task_id
+            ).update(delivery_task_id=task_id, dispatch_claimed_at=None, updated_at=now)
+            
+            if swapped:
+                send_announcement_notifications.apply_async(args=[announcement_id], task_id=task_id)
+                processed_count += 1
         
-        logger.info(f"Processed {processed_count} scheduled announcements")
-        return f"Processed {processed_count} scheduled announcements"
+        logger.info(f"Re-queued {processed_count} overdue announcements")
+        return f"Re-queued {processed_count} overdue announcements"
         
     except Exception as exc:
         logger.error(f"Failed to process scheduled announcements: {exc}")
         raise exc
+
+
+@shared_task
+def rebuild_inbox_index():
+    """Rebuild the Redis broadcast index of the in-app inbox from the database"""
+    try:
+        rebuild_broadcast_index()
+        logger.info("Rebuilt inbox broadcast index")
+        return "Rebuilt inbox broadcast index"
+        
+    except Exception as exc:
+        logger.error(f"Failed to rebuild inbox index: {exc}")
+        raise exc
+
+
+@shared_task
+def compact_announcement_read_receipts():
+    """Compact live Redis read-receipt bitmaps into the announcement rows"""
+    try:
+        count = compact_read_receipts()
+        logger.info(f"Compacted read receipts of {count} announcements")
+        return f"Compacted read receipts of {count} announcements"
+        
+    except Exception as exc:
+        logger.error(f"Failed to compact read receipts: {exc}")
+        raise exc
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from communications.views import live_stream
+
+urlpatterns = [
+    path('', live_stream, name='live-stream'),
+]
@@ -1,49 +1,82 @@
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 
 import logging
 
-from communications.models import NewsletterSubscription
+from communications.models import NewsletterSubscription, AnnouncementType
 
 logger = logging.getLogger(__name__)
 
 
 def send_announcement_email(announcement, recipients):
     """Send announcement email to recipients"""
-    try:
-        template_name = f'emails/announcement_email.html'
+    template_name = f'emails/announcement_email.html'
 
-        context = {
-            'announcement': announcement,
-            'unsubscribe_url': f"{settings.SITE_URL}/api/communications/unsubscribe/",
-            'manage_subscription_url': f"{settings.SITE_URL}/api/communications/manage-subscription/",
-        }
+    context = {
+        'announcement': announcement,
+        'unsubscribe_url': f"{settings.SITE_URL}/api/communications/unsubscribe/",
+        'manage_subscription_url': f"{settings.SITE_URL}/api/communications/manage-subscription/",
+    }
 
-        html_message = render_to_string(template_name, context)
-        plain_message = strip_tags(html_message)
+    html_message = render_to_string(template_name, context)
+    subject = f"[CS Association] {announcement.title}"
 
-        subject = f"[CS Association] {announcement.title}"
+    return send_bulk_email(subject, html_message, recipients)
 
-        send_mail(
+
+def send_bulk_email(subject, html_message, recipients):
+    """Send one pre-rendered email to a chunk of recipients"""
+    try:
+        # Recipients go in Bcc so a chunk never discloses its addresses to each other
+        message = EmailMultiAlternatives(
             subject=subject,
-            message=plain_message,
+            body=strip_tags(html_message),
             from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipients,
-            html_message=html_message,
-            fail_silently=False,
+            to=[settings.DEFAULT_FROM_EMAIL],
+            bcc=recipients,
         )
+        message.attach_alternative(html_message, 'text/html')
+        message.send(fail_silently=False)
 
-        logger.info(f"Announcement email sent to {len(recipients)} recipients")
+        logger.info(f"Bulk email '{subject}' sent to {len(recipients)} recipients")
         return True
             
     except Exception as e:
-        logger.error(f"Failed to send announcement email: {str(e)}")
+        logger.error(f"Failed to send bulk email '{subject}': {str(e)}")
         return False
 
 
+def render_newsletter_digest(announcements, events, issue_date):
+    """Render the weekly newsletter digest for one subscriber segment"""
+    context = {
+        'announcements': announcements,
+        'events': events,
+        'issue_date': issue_date,
+        'site_url': settings.SITE_URL,
+        'unsubscribe_url': f"{settings.SITE_URL}/api/communications/unsubscribe/",
+        'manage_subscription_url': f"{settings.SITE_URL}/api/communications/manage-subscription/",
+    }
+
+    return render_to_string('emails/newsletter_digest.html', context)
+
+
+def render_announcement_digest(announcements):
+    """Render one email for a burst of announcements to the same audience"""
+    context = {
+        'announcements': announcements,
+        'site_url': settings.SITE_URL,
+        'unsubscribe_url': f"{settings.SITE_URL}/api/communications/unsubscribe/",
+        'manage_subscription_url': f"{settings.SITE_URL}/api/communications/manage-subscription/",
+    }
+
+    return render_to_string('emails/announcement_digest.html', context)
+
+
 def send_newsletter_confirmation(subscription):
     """Send newsletter confirmation email"""
     try:
@@ -77,64 +110,135 @@ def send_newsletter_confirmation(subscription):
         return False
 
 
-def send_event_reminder(event, user):
-    """Send event reminder email"""
-    try:
-        template_name = f'emails/event_reminder.html'
+def send_event_reminder_batch(event, users, starts_in):
+    """Send personalised event reminder emails to a batch of users over one SMTP connection
 
-        event_url = f"{settings.SITE_URL}/events/{event.id}/"
+    Returns the users whose reminder went out; a failure stops the batch, so
+    the caller can release the rest for the next run.
+    """
+    template_name = f'emails/event_reminder.html'
 
-        context = {
-            'event': event,
-            'user': user,
-            'event_url': event_url,
-        }
+    event_url = f"{settings.SITE_URL}/events/{event.id}/"
+    subject = f"یادآوری رویداد: {event.title}"
 
-        html_message = render_to_string(template_name, context)
-        plain_message = strip_tags(html_message)
+    sent = []
+    try:
+        with get_connection(fail_silently=False) as connection:
+            for user in users:
+                context = {
+                    'event': event,
+                    'user': user,
+                    'event_url': event_url,
+                    'starts_in': starts_in,
+                }
+
+                html_message = render_to_string(template_name, context)
+                message = EmailMultiAlternatives(
+                    subject=subject,
+                    body=strip_tags(html_message),
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[user.email],
+                    connection=connection,
+                )
+                message.attach_alternative(html_message, 'text/html')
+                if message.send():
+                    sent.append(user)
 
-        subject = f"یادآوری رویداد: {event.title}"
+    except Exception as e:
+        logger.error(f"Failed to send event reminders for event {event.id} after {len(sent)} of {len(users)}: {str(e)}")
 
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+    logger.info(f"Event reminder sent to {len(sent)} users for event {event.title}")
+    return sent
 
-        logger.info(f"Event reminder sent to {user.email} for event {event.title}")
-        return True
-            
-    except Exception as e:
-        logger.error(f"Failed to send event reminder: {str(e)}")
-        return False
 
+def format_time_until(moment, now=None):
+    """'3 hours' or '45 minutes' from now until moment, for reminder wording"""
+    minutes = max(int((moment - (now or timezone.now())).total_seconds() // 60), 1)
+    if minutes < 60:
+        return f"{minutes} minute{'s' if minutes != 1 else ''}"
+    hours = round(minutes / 60)
+    return f"{hours} hour{'s' if hours != 1 else ''}"
 
-def get_announcement_recipients(announcement):
-    """Get list of email addresses based on announcement target audience"""
+
+def get_audience_queryset(target_audience, snapshot=None):
+    """Return (id, email) rows of a target audience as it was at the snapshot time"""
     
     User = get_user_model()
-    recipients = []
     
-    if announcement.target_audience == 'all':
-        # All users with email
-        recipients = list(User.objects.filter(email__isnull=False).values_list('email', flat=True))
-        
-    elif announcement.target_audience == 'members':
-        # Only members (users with is_member=True)
-        recipients = list(User.objects.filter(is_member=True, email__isnull=False).values_list('email', flat=True))
+    if target_audience == 'subscribers':
+        # Only newsletter subscribers
+        queryset = NewsletterSubscription.objects.filter(is_active=True, confirmed_at__isnull=False)
+        if snapshot:
+            queryset = queryset.filter(confirmed_at__lte=snapshot)
+    else:
+        queryset = User.objects.filter(email__isnull=False)
         
-    elif announcement.target_audience == 'committee':
-        # Only committee members
-        recipients = list(User.objects.filter(is_committee=True, email__isnull=False).values_list('email', flat=True))
+        if target_audience == 'members':
+            # Only members (users with is_member=True)
+            queryset = queryset.filter(is_member=True)
+        elif target_audience == 'committee':
+            # Only committee members
+            queryset = queryset.filter(is_committee=True)
+        elif target_audience != 'all':
+            return User.objects.none().values_list('id', 'email')
         
-    elif announcement.target_audience == 'subscribers':
-        # Only newsletter subscribers
-        recipients = list(NewsletterSubscription.objects.filter(
-            is_active=True, 
-            confirmed_at__isnull=False
-        ).values_list('email', flat=True))
+        if snapshot:
+            queryset = queryset.filter(date_joined__lte=snapshot)
+    
+    return queryset.order_by('id').values_list('id', 'email')
+
+
+def iter_audience(target_audience, snapshot=None, chunk_size=None):
+    """Yield chunks of (id, email) tuples of an audience from a server-side cursor"""
+    return _iter_chunks(get_audience_queryset(target_audience, snapshot), chunk_size)
+
+
+def get_newsletter_segments(snapshot=None):
+    """Group confirmed subscribers by the set of announcement types they receive
+
+    Returns a mapping of category set -> stored ``subscribed_categories`` values
+    that normalise to it. An empty selection means every category.
+    """
+    subscriptions = NewsletterSubscription.objects.filter(is_active=True, confirmed_at__isnull=False)
+    if snapshot:
+        subscriptions = subscriptions.filter(confirmed_at__lte=snapshot)
+
+    all_categories = frozenset(AnnouncementType.values)
+    segments = {}
+
+    for categories in subscriptions.order_by().values_list('subscribed_categories', flat=True).distinct():
+        segment = frozenset(categories or []) & all_categories or all_categories
+        segments.setdefault(segment, []).append(categories)
+
+    return segments
+
+
+def iter_newsletter_segment(stored_categories, snapshot=None, chunk_size=None):
+    """Yield chunks of (id, email) tuples of the subscribers in one segment"""
+    segment_filter = Q()
+    for categories in stored_categories:
+        segment_filter |= Q(subscribed_categories=categories)
+
+    subscriptions = NewsletterSubscription.objects.filter(
+        segment_filter,
+        is_active=True,
+        confirmed_at__isnull=False,
+    )
+    if snapshot:
+        subscriptions = subscriptions.filter(confirmed_at__lte=snapshot)
+
+    return _iter_chunks(subscriptions.order_by('id').values_list('id', 'email'), chunk_size)
+
+
+def _iter_chunks(queryset, chunk_size=None):
+    chunk_size = chunk_size or settings.NOTIFICATION_BATCH_SIZE
+    
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
     
-    return recipients
+    if chunk:
+        yield chunk
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+import asyncio
+
+from communications.live import hub, ANNOUNCEMENTS_CHANNEL, EVENT_CHANNEL
+
+
+async def live_stream(request):
+    """Server-Sent Events stream of announcement publications and seat counts
+
+    Seat counts are streamed for the events listed in ?events=1,2,3.
+    Serve through config.asgi so idle streams do not hold a worker thread.
+    """
+    event_ids = [
+        int(event_id) for event_id in request.GET.get('events', '').split(',') if event_id.isdigit()
+    ][:settings.LIVE_MAX_EVENTS]
+    channels = [ANNOUNCEMENTS_CHANNEL] + [EVENT_CHANNEL.format(event_id=event_id) for event_id in event_ids]
+
+    queue = await hub.subscribe(channels)
+
+    async def stream():
+        try:
+            yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=settings.LIVE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing idle streams
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            await hub.unsubscribe(queue, channels)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -29,13 +29,24 @@ app.conf.update(
     task_soft_time_limit=60,
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # Image decoding runs on its own queue, served by a worker sized to the cores
+    task_routes={
+        'gallery.tasks.process_uploaded_image': {'queue': 'media'},
+        'gallery.tasks.import_gallery_archive': {'queue': 'media'},
+        'gallery.tasks.process_import_batch': {'queue': 'media'},
+        'gallery.tasks.process_featured_image': {'queue': 'media'},
+        'gallery.tasks.render_share_image': {'queue': 'media'},
+        'gallery.tasks.move_gallery_files': {'queue': 'media'},
+        'events.tasks.render_ticket': {'queue': 'media'},
+        'events.tasks.render_ticket_batch': {'queue': 'media'},
+    },
 )
 
 # Celery Beat configuration
 app.conf.beat_schedule = {
     'send-event-reminders': {
         'task': 'communications.tasks.send_event_reminders',
-        'schedule': crontab(minute=0, hour='*/1'),  # Every hour
+        'schedule': crontab(minute='*/10'),  # Every 10 minutes
     },
     'send-weekly-newsletter': {
         'task': 'communications.tasks.send_weekly_newsletter',
@@ -47,6 +58,30 @@ app.conf.beat_schedule = {
     },
     'process-scheduled-announcements': {
         'task': 'communications.tasks.process_scheduled_announcements',
-        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+        'schedule': crontab(minute='*/15'),  # Safety net; deliveries are scheduled with an ETA on save
+    },
+    'compact-read-receipts': {
+        'task': 'communications.tasks.compact_announcement_read_receipts',
+        'schedule': crontab(minute='*/10'),  # Every 10 minutes
+    },
+    'rebuild-inbox-index': {
+        'task': 'communications.tasks.rebuild_inbox_index',
+        'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM
+    },
+    'cleanup-stale-uploads': {
+        'task': 'gallery.tasks.cleanup_stale_uploads',
+        'schedule': crontab(minute=30),  # Hourly
+    },
+    'cleanup-orphan-blobs': {
+        'task': 'gallery.tasks.cleanup_orphan_blobs',
+        'schedule': crontab(minute=45),  # Hourly
+    },
+    'cleanup-share-images': {
+        'task': 'gallery.tasks.cleanup_share_images',
+        'schedule': crontab(hour=4, minute=0),  # Daily at 4 AM
+    },
+    'cleanup-export-jobs': {
+        'task': 'utils.tasks.cleanup_export_jobs',
+        'schedule': crontab(hour=4, minute=30),  # Daily at 4:30 AM
     },
 }
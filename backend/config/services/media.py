@@ -0,0 +1,116 @@
+from decouple import config
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# On-demand resize endpoint: where resized images are cached, the size bound
+# of that cache (bytes), how often eviction may scan it (seconds) and the
+# largest edge a signed URL may ask for
+RESIZE_CACHE_DIR = Path(config('RESIZE_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'resize')))
+RESIZE_CACHE_MAX_BYTES = config('RESIZE_CACHE_MAX_BYTES', default=1024 * 1024 * 1024, cast=int)
+RESIZE_CACHE_EVICT_INTERVAL = config('RESIZE_CACHE_EVICT_INTERVAL', default=60, cast=int)
+RESIZE_MAX_DIMENSION = config('RESIZE_MAX_DIMENSION', default=2400, cast=int)
+
+# Chunked uploads: where partial uploads are assembled, the largest chunk a
+# request may carry (bytes) and how long an idle upload is kept (seconds)
+UPLOAD_CHUNK_DIR = Path(config('UPLOAD_CHUNK_DIR', default=str(BASE_DIR / 'cache' / 'uploads')))
+UPLOAD_CHUNK_SIZE = config('UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int)
+UPLOAD_EXPIRY = config('UPLOAD_EXPIRY', default=24 * 60 * 60, cast=int)
+
+# Bulk gallery imports: where uploaded archives wait to be extracted (outside
+# MEDIA_ROOT, so they are never served), the largest archive and image
+# accepted (bytes), the most images per archive and how many images each
+# worker task processes
+GALLERY_IMPORT_DIR = Path(config('GALLERY_IMPORT_DIR', default=str(BASE_DIR / 'cache' / 'imports')))
+GALLERY_IMPORT_MAX_SIZE = config('GALLERY_IMPORT_MAX_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)
+GALLERY_IMPORT_MAX_FILE_SIZE = config('GALLERY_IMPORT_MAX_FILE_SIZE', default=25 * 1024 * 1024, cast=int)
+GALLERY_IMPORT_MAX_FILES = config('GALLERY_IMPORT_MAX_FILES', default=1000, cast=int)
+GALLERY_IMPORT_BATCH_SIZE = config('GALLERY_IMPORT_BATCH_SIZE', default=8, cast=int)
+
+# Content-addressed media: how long an unreferenced file is kept before it is
+# deleted (seconds), and the largest perceptual hash distance (in bits, at
+# most 3) reported as a near duplicate; 0 turns near-duplicate checks off
+MEDIA_BLOB_GRACE = config('MEDIA_BLOB_GRACE', default=60 * 60, cast=int)
+MEDIA_PHASH_DISTANCE = config('MEDIA_PHASH_DISTANCE', default=3, cast=int)
+
+# Protected media: files of private gallery images, e-tickets and exports are
+# kept in the 'protected' storage, which is never served publicly (a
+# directory outside MEDIA_ROOT, or with a bucket configured a second bucket
+# without anonymous access), and only reached through signed URLs valid for
+# about PROTECTED_MEDIA_URL_EXPIRY seconds that name the object, not the
+# file. After checking the signature Django only names the file, and the
+# front server sends it: set PROTECTED_MEDIA_SERVER to 'nginx' for
+# X-Accel-Redirect, with an internal location such as
+#     location /internal-media/ { internal; alias /app/protected/; }
+# or to 'sendfile' for X-Sendfile (Apache, lighttpd). Left empty, Django
+# streams the file itself, which is meant for development
+PROTECTED_MEDIA_ROOT = Path(config('PROTECTED_MEDIA_ROOT', default=str(BASE_DIR / 'protected')))
+PROTECTED_MEDIA_SERVER = config('PROTECTED_MEDIA_SERVER', default='')
+PROTECTED_MEDIA_INTERNAL_URL = config('PROTECTED_MEDIA_INTERNAL_URL', default='/internal-media/')
+PROTECTED_MEDIA_URL_EXPIRY = config('PROTECTED_MEDIA_URL_EXPIRY', default=60 * 60, cast=int)
+
+# Open Graph share images of posts and events: the site name and logo (a
+# static file) drawn on them, and the font. Persian titles need a font with
+# Arabic script, and Pillow built with raqm to shape them
+SHARE_IMAGE_SITE_NAME = config('SHARE_IMAGE_SITE_NAME', default='GuilanCE Association')
+SHARE_IMAGE_LOGO = config('SHARE_IMAGE_LOGO', default='img/logo.png')
+SHARE_IMAGE_FONT = config('SHARE_IMAGE_FONT', default='/usr/share/fonts/truetype/vazirmatn/Vazirmatn-Bold.ttf')
+
+# QR e-tickets of confirmed registrations, drawn with the share image font by
+# the media workers; regenerating an event's tickets fans out batches of
+# TICKET_BATCH_SIZE registrations to them
+TICKET_BATCH_SIZE = config('TICKET_BATCH_SIZE', default=50, cast=int)
+
+# XLSX exports written by workers are kept for this long, in seconds
+EXPORT_RETENTION = config('EXPORT_RETENTION', default=7 * 24 * 60 * 60, cast=int)
+
+# Admin imports run by workers: where uploaded files wait (outside
+# MEDIA_ROOT), how many rows are imported per transaction and how many row
+# errors are kept on the job
+DATA_IMPORT_DIR = Path(config('DATA_IMPORT_DIR', default=str(BASE_DIR / 'cache' / 'data-imports')))
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=1000, cast=int)
+IMPORT_MAX_ERRORS = config('IMPORT_MAX_ERRORS', default=100, cast=int)
+
+# Object storage: with a bucket configured, every image field is stored in
+# S3-compatible storage (MinIO in docker-compose) instead of MEDIA_ROOT, and
+# clients may upload straight to it with presigned PUT URLs, valid for
+# DIRECT_UPLOAD_EXPIRY seconds and signed for DIRECT_UPLOAD_ENDPOINT_URL when
+# clients reach storage at another address than the server does
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')
+AWS_PROTECTED_BUCKET_NAME = config(
+    'AWS_PROTECTED_BUCKET_NAME', default=f"{AWS_STORAGE_BUCKET_NAME}-protected" if AWS_STORAGE_BUCKET_NAME else ''
+)
+AWS_S3_ENDPOINT_URL = config('AWS_S3_ENDPOINT_URL', default=None)
+AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
+AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default=None)
+AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default=None)
+AWS_S3_CUSTOM_DOMAIN = config('AWS_S3_CUSTOM_DOMAIN', default=None)
+AWS_S3_URL_PROTOCOL = config('AWS_S3_URL_PROTOCOL', default='https:')
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+# Media is public; content-addressed names are never overwritten. The
+# protected bucket overrides this and is only read through presigned URLs
+AWS_QUERYSTRING_AUTH = False
+AWS_S3_FILE_OVERWRITE = False
+AWS_DEFAULT_ACL = None
+
+STORAGES = {
+    'default': {
+        'BACKEND': (
+            'storages.backends.s3.S3Storage' if AWS_STORAGE_BUCKET_NAME
+            else 'django.core.files.storage.FileSystemStorage'
+        ),
+    },
+    'protected': {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {'bucket_name': AWS_PROTECTED_BUCKET_NAME, 'querystring_auth': True, 'custom_domain': None},
+    } if AWS_STORAGE_BUCKET_NAME else {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': PROTECTED_MEDIA_ROOT, 'base_url': None},
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+DIRECT_UPLOAD_EXPIRY = config('DIRECT_UPLOAD_EXPIRY', default=15 * 60, cast=int)
+DIRECT_UPLOAD_ENDPOINT_URL = config('DIRECT_UPLOAD_ENDPOINT_URL', default=None)
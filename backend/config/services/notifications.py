@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import config, Csv
 
 # Added VAPID configuration for web push notifications
 # VAPID Configuration for Web Push Notifications
@@ -10,3 +10,39 @@ VAPID_CLAIMS = {
 
 # Site URL for push notification links
 SITE_URL = config('SITE_URL', default='http://localhost:8000')
+
+# Event reminders: hours before start_time at which confirmed attendees are reminded
+EVENT_REMINDER_OFFSETS = config('EVENT_REMINDER_OFFSETS', default='24,1', cast=Csv(int))
+
+# Maximum number of emails/push messages handed to a single send call
+NOTIFICATION_BATCH_SIZE = config('NOTIFICATION_BATCH_SIZE', default=100, cast=int)
+
+# How long the status of a queued notification can be looked up by whoever queued it
+DELIVERY_TRACKING_TTL = config('DELIVERY_TRACKING_TTL', default=24 * 3600, cast=int)
+
+# Scheduled announcements: how long an ETA task may lag before the sweeper
+# re-enqueues it, and after how long a dispatch claim is considered abandoned
+ANNOUNCEMENT_DISPATCH_GRACE = config('ANNOUNCEMENT_DISPATCH_GRACE', default=300, cast=int)
+ANNOUNCEMENT_CLAIM_TIMEOUT = config('ANNOUNCEMENT_CLAIM_TIMEOUT', default=35 * 60, cast=int)
+
+# In-app inbox: broadcasts kept per audience in Redis, and how long a user's
+# resolved audiences are cached for the unread badge
+INBOX_BROADCAST_LIMIT = config('INBOX_BROADCAST_LIMIT', default=200, cast=int)
+INBOX_AUDIENCE_TTL = config('INBOX_AUDIENCE_TTL', default=3600, cast=int)
+
+# Read receipts: live Redis bitmaps expire after this long without reads, once
+# their bits have been compacted into Postgres
+READ_RECEIPT_TTL = config('READ_RECEIPT_TTL', default=30 * 24 * 3600, cast=int)
+
+# Live updates (SSE): per-client buffer, keep-alive interval (seconds), browser
+# reconnect delay (ms) and how many events one stream may follow
+LIVE_QUEUE_SIZE = config('LIVE_QUEUE_SIZE', default=100, cast=int)
+LIVE_HEARTBEAT = config('LIVE_HEARTBEAT', default=20, cast=int)
+LIVE_RETRY_MS = config('LIVE_RETRY_MS', default=5000, cast=int)
+LIVE_MAX_EVENTS = config('LIVE_MAX_EVENTS', default=20, cast=int)
+
+# Announcement digests: non-urgent announcements of these priorities published
+# to the same audience within the window (seconds) are sent as one email and
+# one push; 0 disables coalescing
+ANNOUNCEMENT_DIGEST_WINDOW = config('ANNOUNCEMENT_DIGEST_WINDOW', default=0, cast=int)
+ANNOUNCEMENT_DIGEST_PRIORITIES = config('ANNOUNCEMENT_DIGEST_PRIORITIES', default='low,normal,high', cast=Csv())
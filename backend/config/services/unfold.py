@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.templatetags.static import static
+from decouple import config
 
 # Django Unfold Configuration
 UNFOLD = {
@@ -90,6 +91,10 @@ UNFOLD = {
     },
 }
 
+# Unfiltered admin changelists of tables with more rows than this show the
+# row count estimated by PostgreSQL statistics instead of counting them
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
 def environment_callback(request):
     return ["Development", "warning"] if settings.DEBUG else ["Production", "success"]
 
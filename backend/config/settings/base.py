@@ -39,6 +39,7 @@ LOCAL_APPS = [
     'events',
     'communications',
     'payments',
+    'utils',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -218,3 +219,4 @@ from config.services.unfold import *
 from config.services.location import *
 from config.services.notifications import *
 from config.services.zarinpal import *
+from config.services.media import *
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from ninja import NinjaAPI
 from api.urls import router as api_router
+from gallery.views import share_page
 
 api = NinjaAPI(
     title="CS Association API",
@@ -15,7 +16,10 @@ api.add_router("", api_router)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/live/', include('communications.urls')),
+    path(f"{settings.MEDIA_URL.strip('/')}/", include('gallery.urls')),
     path('api/', api.urls),
+    path('share/<str:kind>/<str:slug>', share_page, name='share-page'),
 ]
 
 if settings.DEBUG:
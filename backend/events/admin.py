@@ -1,13 +1,20 @@
 from django.contrib import admin
 from django import forms
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from unfold.admin import ModelAdmin
+from unfold.contrib.filters.admin import AutocompleteSelectFilter
 from simplemde.widgets import SimpleMDEEditor
 from import_export.admin import ImportExportModelAdmin
 
-from utils.admin import SoftDeleteListFilter
+from utils.admin import (
+    SoftDeleteListFilter, StreamingExportMixin, BackgroundImportMixin, IndexedSearchMixin, EstimatedCountPaginator
+)
 from events.models import Event, Registration
 from events.resources import EventResource, RegistrationResource
+from events.tasks import render_ticket_batch, regenerate_event_tickets
+from utils.dispatch import enqueue_on_commit
 
 class EventAdminForm(forms.ModelForm):
     description = forms.CharField(
@@ -21,7 +28,7 @@ class EventAdminForm(forms.ModelForm):
 
 
 @admin.register(Event)
-class EventAdmin(ModelAdmin, ImportExportModelAdmin):
+class EventAdmin(BackgroundImportMixin, ModelAdmin, ImportExportModelAdmin):
     form = EventAdminForm
     resource_class = EventResource
     list_display = (
@@ -67,7 +74,7 @@ class EventAdmin(ModelAdmin, ImportExportModelAdmin):
 
     actions = [
         'make_published', 'make_draft', 'make_cancelled', 'make_completed',
-        'restore_events'
+        'regenerate_tickets', 'restore_events'
     ]
 
     def price_display(self, obj):
@@ -110,6 +117,13 @@ class EventAdmin(ModelAdmin, ImportExportModelAdmin):
 
     make_completed.short_description = "Mark selected events as completed"
 
+    def regenerate_tickets(self, request, queryset):
+        for event_id in queryset.values_list('id', flat=True):
+            enqueue_on_commit(regenerate_event_tickets, event_id, force=True)
+        self.message_user(request, f"Regenerating the tickets of {queryset.count()} events in the background.")
+
+    regenerate_tickets.short_description = "Regenerate tickets of selected events"
+
     def restore_events(self, request, queryset):
         for event in queryset:
             event.restore()
@@ -119,21 +133,29 @@ class EventAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(Registration)
-class RegistrationAdmin(ModelAdmin, ImportExportModelAdmin):
+class RegistrationAdmin(IndexedSearchMixin, StreamingExportMixin, ModelAdmin, ImportExportModelAdmin):
     resource_class = RegistrationResource
     list_display = (
-        'user', 'event', 'status', 'registered_at', 'ticket_id', 'is_deleted'
+        'user', 'event', 'status', 'registered_at', 'checked_in_at', 'ticket_id', 'is_deleted'
     )
+    list_select_related = ('user', 'event')
     list_filter = (
-        'status', 'event', 'user', 'is_deleted', 'registered_at',
-        SoftDeleteListFilter
+        SoftDeleteListFilter, 'status', ('event', AutocompleteSelectFilter),
+        ('user', AutocompleteSelectFilter), 'is_deleted', 'registered_at'
     )
-    search_fields = ('user__username', 'user__email', 'user__first_name', 'user__last_name', 'event__title', 'ticket_id')
-    readonly_fields = ('ticket_id', 'registered_at', 'deleted_at')
+    list_filter_submit = True
+    search_fields = ('ticket_id', 'user__email', 'user__student_id', 'user__username')
+    search_help_text = "Exact ticket id, e-mail, student id or username"
+    uuid_search_fields = ('ticket_id',)
+    email_search_fields = ('user__email',)
+    exact_search_fields = ('user__student_id', 'user__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ('ticket_id', 'ticket_file', 'registered_at', 'checked_in_at', 'deleted_at')
 
     fieldsets = (
         ('Registration Details', {
-            'fields': ('user', 'event', 'status', 'registered_at', 'ticket_id')
+            'fields': ('user', 'event', 'status', 'registered_at', 'checked_in_at', 'ticket_id', 'ticket_file')
         }),
         ('Soft Delete', {
             'fields': ('is_deleted', 'deleted_at'),
@@ -148,6 +170,8 @@ class RegistrationAdmin(ModelAdmin, ImportExportModelAdmin):
 
     def confirm_registrations(self, request, queryset):
         queryset.update(status=Registration.StatusChoices.CONFIRMED)
+        # update() sends no signals; render the tickets of the batch here
+        enqueue_on_commit(render_ticket_batch, list(queryset.filter(ticket_file='').values_list('id', flat=True)))
         self.message_user(request, f"Confirmed {queryset.count()} registrations.")
 
     confirm_registrations.short_description = "Confirm selected registrations"
@@ -159,7 +183,7 @@ class RegistrationAdmin(ModelAdmin, ImportExportModelAdmin):
     cancel_registrations.short_description = "Cancel selected registrations"
 
     def mark_attended(self, request, queryset):
-        queryset.update(status=Registration.StatusChoices.ATTENDED)
+        queryset.update(status=Registration.StatusChoices.ATTENDED, checked_in_at=Coalesce('checked_in_at', timezone.now()))
         self.message_user(request, f"Marked {queryset.count()} registrations as attended.")
 
     mark_attended.short_description = "Mark selected registrations as attended"
@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models import Case, When, Value, DateTimeField
+from django.utils import timezone
+
+from events.models import Registration
+
+# Scans sent in one batch by a scanner that was offline
+MAX_BATCH_SCANS = 1000
+
+_RESULT_FIELDS = ('ticket_id', 'status', 'checked_in_at', 'user__username', 'user__first_name', 'user__last_name')
+
+
+class CheckInResult:
+    CHECKED_IN = 'checked_in'
+    ALREADY_CHECKED_IN = 'already_checked_in'
+    NOT_CONFIRMED = 'not_confirmed'
+    UNKNOWN_TICKET = 'unknown_ticket'
+
+
+def check_in(event, ticket_id):
+    """Check a scanned ticket in at the door
+
+    The check-in is a single UPDATE through the unique ticket index that only
+    matches a confirmed registration, so concurrent scans of a ticket check it
+    in once; scanning it again reports when it was checked in.
+    """
+    tickets = Registration.objects.filter(event=event, ticket_id=ticket_id)
+    checked_in = tickets.filter(status=Registration.StatusChoices.CONFIRMED).update(
+        status=Registration.StatusChoices.ATTENDED,
+        checked_in_at=timezone.now()
+    )
+
+    registration = tickets.values(*_RESULT_FIELDS).first()
+    if checked_in:
+        return _result(ticket_id, CheckInResult.CHECKED_IN, registration)
+    return _result(ticket_id, _refusal(registration), registration)
+
+
+def merge_scans(scans):
+    """{ticket_id: scanned_at} of (ticket_id, scanned_at) pairs; a ticket scanned more than once counts from its first scan"""
+    merged = {}
+    for ticket_id, when in scans:
+        times = [value for value in (merged.get(ticket_id), _aware(when)) if value]
+        merged[ticket_id] = min(times, default=None)
+    return merged
+
+
+def check_in_batch(event, scans):
+    """Check in scans collected offline, as {ticket_id: scanned_at or None}
+
+    Every ticket is looked up and locked in one query and all confirmed ones
+    are checked in with one UPDATE, at the time they were scanned.
+    """
+    now = timezone.now()
+    scanned_at = {ticket_id: min(_aware(when) or now, now) for ticket_id, when in scans.items()}
+
+    with transaction.atomic():
+        registrations = {
+            registration['ticket_id']: registration
+            for registration in Registration.objects.select_for_update(of=('self',)).filter(
+                event=event, ticket_id__in=scanned_at
+            ).values(*_RESULT_FIELDS)
+        }
+        confirmed = {
+            ticket_id for ticket_id, registration in registrations.items()
+            if registration['status'] == Registration.StatusChoices.CONFIRMED
+        }
+        if confirmed:
+            Registration.objects.filter(event=event, ticket_id__in=confirmed).update(
+                status=Registration.StatusChoices.ATTENDED,
+                checked_in_at=Case(
+                    *[When(ticket_id=ticket_id, then=Value(scanned_at[ticket_id])) for ticket_id in confirmed],
+                    output_field=DateTimeField()
+                )
+            )
+
+    results = []
+    for ticket_id in scanned_at:
+        registration = registrations.get(ticket_id)
+        if ticket_id in confirmed:
+            registration['checked_in_at'] = scanned_at[ticket_id]
+            results.append(_result(ticket_id, CheckInResult.CHECKED_IN, registration))
+        else:
+            results.append(_result(ticket_id, _refusal(registration), registration))
+    return results
+
+
+def roster_snapshot(event):
+    """Compact map of ticket id to attendee name of an event, for scanners to check tickets offline"""
+    tickets, checked_in = {}, []
+    rows = Registration.objects.filter(
+        event=event,
+        status__in=[Registration.StatusChoices.CONFIRMED, Registration.StatusChoices.ATTENDED]
+    ).values_list('ticket_id', 'status', 'user__username', 'user__first_name', 'user__last_name')
+
+    for ticket_id, status, username, first_name, last_name in rows.iterator():
+        tickets[str(ticket_id)] = f"{first_name} {last_name}".strip() or username
+        if status == Registration.StatusChoices.ATTENDED:
+            checked_in.append(str(ticket_id))
+
+    return {
+        'event_id': event.id,
+        'generated_at': timezone.now(),
+        'tickets': tickets,
+        'checked_in': checked_in,
+    }
+
+
+def _aware(value):
+    # Scanners without a UTC offset send local time
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
+
+
+def _refusal(registration):
+    if registration is None:
+        return CheckInResult.UNKNOWN_TICKET
+    if registration['status'] == Registration.StatusChoices.ATTENDED:
+        return CheckInResult.ALREADY_CHECKED_IN
+    return CheckInResult.NOT_CONFIRMED
+
+
+def _result(ticket_id, result, registration):
+    if registration is None:
+        return {'ticket_id': ticket_id, 'result': result}
+    name = f"{registration['user__first_name']} {registration['user__last_name']}".strip()
+    return {
+        'ticket_id': ticket_id,
+        'result': result,
+        'name': name or registration['user__username'],
+        'checked_in_at': registration['checked_in_at'],
+    }
@@ -8,9 +8,11 @@ import markdown
 from location_field.models.plain import PlainLocationField as LocationField
 
 from utils.models import BaseModel
+from gallery.models import FeaturedImageMixin, ShareImageMixin
+from gallery.storage import protected_storage
 
 
-class Event(BaseModel):
+class Event(ShareImageMixin, FeaturedImageMixin, BaseModel):
     class TypeChoices(models.TextChoices):
         ONLINE = 'online', 'Online'
         ON_SITE = 'on_site', 'On-Site'
@@ -60,9 +62,16 @@ class Event(BaseModel):
         return self.title
 
     def save(self, *args, **kwargs):
+        self.fill_derived_fields()
+        super().save(*args, **kwargs)
+
+    def fill_derived_fields(self):
+        """Slug left blank; bulk imports call this instead of save()"""
         if not self.slug:
             self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+
+    def share_image_text(self):
+        return self.title, timezone.localtime(self.start_time).strftime('%Y-%m-%d %H:%M')
 
     @property
     def description_html(self):
@@ -107,6 +116,8 @@ class Registration(BaseModel):
     status = models.CharField(max_length=10, choices=StatusChoices.choices,
                               default=StatusChoices.PENDING)
     ticket_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    checked_in_at = models.DateTimeField(null=True, blank=True)
+    ticket_file = models.CharField(max_length=255, blank=True, help_text="Rendered QR ticket (PNG, with a PDF next to it)")
 
     class Meta:
         unique_together = ['event', 'user']
@@ -118,3 +129,11 @@ class Registration(BaseModel):
 
     def __str__(self):
         return f"{self.user.username} registered for {self.event.title}"
+
+    def protected_file(self, variant):
+        """(storage, name) of the PNG or PDF ticket, for the protected media view"""
+        from events.tickets import pdf_name
+
+        if not self.ticket_file or variant not in ('png', 'pdf'):
+            return None
+        return protected_storage(), self.ticket_file if variant == 'png' else pdf_name(self.ticket_file)
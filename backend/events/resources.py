@@ -1,17 +1,22 @@
 from import_export import resources, fields
-from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
+from import_export.widgets import ForeignKeyWidget
 
 from events.models import Event, Registration
 from users.models import User
 from gallery.models import Gallery
+from gallery.resources import FeaturedImageImportMixin
+from utils.imports import BulkImportMixin, CachedManyToManyWidget
 
-class EventResource(resources.ModelResource):
+class EventResource(FeaturedImageImportMixin, BulkImportMixin, resources.ModelResource):
     gallery_images = fields.Field(
         column_name='gallery_images',
         attribute='gallery_images',
-        widget=ManyToManyWidget(Gallery, field='title', separator='|')
+        widget=CachedManyToManyWidget(Gallery, field='title', separator='|')
     )
 
+    # Filled in by fill_derived_fields() when left blank
+    bulk_update_extra_fields = FeaturedImageImportMixin.bulk_update_extra_fields + ('slug',)
+
     class Meta:
         model = Event
         fields = (
@@ -22,6 +27,8 @@ class EventResource(resources.ModelResource):
             'is_deleted', 'deleted_at'
         )
         export_order = fields
+        use_bulk = True
+        batch_size = 1000
 
 class RegistrationResource(resources.ModelResource):
     event = fields.Field(
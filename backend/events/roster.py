@@ -0,0 +1,55 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+import json
+
+from events.models import Registration
+from utils.exports import CHUNK_SIZE, csv_lines, csv_response
+
+# One joined query, read in chunks
+ROSTER_FIELDS = (
+    'id', 'ticket_id', 'status', 'registered_at', 'checked_in_at',
+    'user_id', 'user__username', 'user__first_name', 'user__last_name', 'user__email',
+)
+ROSTER_COLUMNS = (
+    'id', 'ticket_id', 'status', 'registered_at', 'checked_in_at',
+    'user_id', 'username', 'first_name', 'last_name', 'email',
+)
+
+
+def roster_queryset(event, status=None):
+    queryset = Registration.objects.filter(event=event)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by('registered_at', 'id').values_list(*ROSTER_FIELDS)
+
+
+def roster_entries(event, status=None):
+    """Registrations of an event as flat dicts, with the attendee fields inlined"""
+    for row in roster_queryset(event, status).iterator(chunk_size=CHUNK_SIZE):
+        yield dict(zip(ROSTER_COLUMNS, row))
+
+
+def roster_response(event, format, status=None):
+    """Stream an event's roster as CSV or JSON lines, without building it in memory"""
+    filename = f"{event.slug or event.pk}-roster.{format}"
+    if format == 'csv':
+        rows = ([_csv_value(value) for value in entry.values()] for entry in roster_entries(event, status))
+        return csv_response(csv_lines(ROSTER_COLUMNS, rows), filename)
+
+    response = StreamingHttpResponse(_json_lines(event, status), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _json_lines(event, status):
+    for entry in roster_entries(event, status):
+        yield json.dumps(entry, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
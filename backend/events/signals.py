@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from events.models import Registration
+from events.tasks import render_ticket
+from communications.live import publish_seat_count
+from utils.dispatch import enqueue_on_commit
+
+# Only saves touching these fields can change the number of confirmed seats
+SEAT_FIELDS = {'status', 'is_deleted'}
+
+
+@receiver(post_save, sender=Registration)
+def publish_seat_count_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & SEAT_FIELDS:
+        return
+    publish_seat_count(instance.event)
+
+
+@receiver(post_delete, sender=Registration)
+def publish_seat_count_on_delete(sender, instance, **kwargs):
+    publish_seat_count(instance.event)
+
+
+@receiver(post_save, sender=Registration)
+def render_ticket_on_confirm(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & SEAT_FIELDS:
+        return
+    if instance.status == Registration.StatusChoices.CONFIRMED and not instance.is_deleted and not instance.ticket_file:
+        enqueue_on_commit(render_ticket, instance.pk)
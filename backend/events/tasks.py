@@ -0,0 +1,71 @@
+from django.conf import settings
+
+from celery import shared_task, group
+from celery.exceptions import SoftTimeLimitExceeded
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True, max_retries=3)
+def render_ticket(self, registration_id):
+    """Render the QR ticket of a confirmed registration, unless it is up to date"""
+    from .models import Registration
+    from .tickets import store_ticket
+
+    registration = Registration.objects.select_related('event', 'user').filter(
+        id=registration_id, status=Registration.StatusChoices.CONFIRMED
+    ).first()
+    if registration is None:
+        return f"Registration {registration_id} has no ticket"
+
+    try:
+        store_ticket(registration)
+    except Exception as exc:
+        logger.error(f"Failed to render ticket of registration {registration_id}: {exc}")
+        raise self.retry(exc=exc, countdown=60)
+    return f"Rendered ticket of registration {registration_id}"
+
+@shared_task(soft_time_limit=10 * 60, time_limit=12 * 60)
+def render_ticket_batch(registration_ids, force=False):
+    """Render the tickets of a batch of registrations; runs on the media queue"""
+    from .models import Registration
+    from .tickets import store_ticket
+
+    registrations = Registration.objects.select_related('event', 'user').filter(
+        id__in=registration_ids, status=Registration.StatusChoices.CONFIRMED
+    )
+    rendered = failed = 0
+    for registration in registrations:
+        try:
+            store_ticket(registration, force=force)
+            rendered += 1
+        except SoftTimeLimitExceeded:
+            # The rest stay as they were; regenerating again renders them
+            logger.error(f"Ticket batch stopped at the time limit after {rendered + failed} of {len(registration_ids)}")
+            break
+        except Exception as exc:
+            logger.error(f"Failed to render ticket of registration {registration.id}: {exc}")
+            failed += 1
+    return f"Rendered {rendered} tickets, {failed} failed"
+
+@shared_task(soft_time_limit=5 * 60, time_limit=6 * 60)
+def regenerate_event_tickets(event_id, force=False):
+    """Render the tickets of every confirmed registration of an event
+
+    Batches are fanned out to the media queue, whose worker runs a process per
+    core, so a large event uses all of them. Up-to-date tickets are skipped
+    unless `force` is set.
+    """
+    from .models import Registration
+
+    registration_ids = list(Registration.objects.filter(
+        event_id=event_id, status=Registration.StatusChoices.CONFIRMED
+    ).order_by('id').values_list('id', flat=True))
+
+    batch_size = settings.TICKET_BATCH_SIZE
+    batches = [registration_ids[i:i + batch_size] for i in range(0, len(registration_ids), batch_size)]
+    if batches:
+        group(render_ticket_batch.s(batch, force) for batch in batches).apply_async()
+
+    logger.info(f"Regenerating {len(registration_ids)} tickets of event {event_id} in {len(batches)} batches")
+    return f"Regenerating {len(registration_ids)} tickets in {len(batches)} batches"
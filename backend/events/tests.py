@@ -0,0 +1,101 @@
+from django.test import TestCase
+from django.utils import timezone
+
+import json
+from datetime import datetime, timedelta
+
+from api.authentication import create_jwt_token
+from events.models import Event, Registration
+from users.models import User
+
+
+class CheckInBatchTests(TestCase):
+    def setUp(self):
+        start = timezone.now() + timedelta(hours=1)
+        self.event = Event.objects.create(
+            title="Check-in", description="-", start_time=start, end_time=start + timedelta(hours=2)
+        )
+        self.scanner = User.objects.create_user(
+            username='scanner', email='scanner@example.com', password='-', student_id='900001',
+            is_staff=True, is_email_verified=True
+        )
+        attendee = User.objects.create_user(
+            username='attendee', email='attendee@example.com', password='-', student_id='900002',
+            is_email_verified=True
+        )
+        self.registration = Registration.objects.create(
+            event=self.event, user=attendee, status=Registration.StatusChoices.CONFIRMED
+        )
+
+    def sync(self, scans):
+        return self.client.post(
+            f'/api/events/{self.event.id}/check-in/batch',
+            data=json.dumps({'scans': scans}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {create_jwt_token(self.scanner)}'
+        )
+
+    def test_scan_without_utc_offset_is_local_time(self):
+        scanned_at = timezone.localtime() - timedelta(minutes=5)
+        naive = scanned_at.replace(tzinfo=None, microsecond=0)
+        ticket_id = str(self.registration.ticket_id)
+
+        response = self.sync([
+            {'ticket_id': ticket_id, 'scanned_at': naive.isoformat()},
+            {'ticket_id': ticket_id, 'scanned_at': (naive + timedelta(minutes=1)).isoformat()},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['result'], 'checked_in')
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.checked_in_at, timezone.make_aware(naive))
+
+    def test_scan_in_the_future_is_clamped_to_now(self):
+        future = datetime.now() + timedelta(days=1)
+
+        response = self.sync([{'ticket_id': str(self.registration.ticket_id), 'scanned_at': future.isoformat()}])
+
+        self.assertEqual(response.status_code, 200)
+        self.registration.refresh_from_db()
+        self.assertLessEqual(self.registration.checked_in_at, timezone.now())
+
+
+class CheckInPermissionTests(TestCase):
+    def setUp(self):
+        start = timezone.now() + timedelta(hours=1)
+        self.event = Event.objects.create(
+            title="Door", description="-", start_time=start, end_time=start + timedelta(hours=2)
+        )
+        self.attendee = User.objects.create_user(
+            username='guest', email='guest@example.com', password='-', student_id='900010',
+            is_email_verified=True
+        )
+        self.registration = Registration.objects.create(
+            event=self.event, user=self.attendee, status=Registration.StatusChoices.CONFIRMED
+        )
+
+    def check_in(self, user):
+        return self.client.post(
+            f'/api/events/{self.event.id}/check-in',
+            data=json.dumps({'ticket_id': str(self.registration.ticket_id)}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {create_jwt_token(user)}'
+        )
+
+    def test_committee_member_checks_in(self):
+        volunteer = User.objects.create_user(
+            username='volunteer', email='volunteer@example.com', password='-', student_id='900011',
+            is_committee=True, is_email_verified=True
+        )
+
+        response = self.check_in(volunteer)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result'], 'checked_in')
+
+    def test_attendee_is_refused(self):
+        response = self.check_in(self.attendee)
+
+        self.assertEqual(response.status_code, 403)
+        self.registration.refresh_from_db()
+        self.assertEqual(self.registration.status, Registration.StatusChoices.CONFIRMED)
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+import io
+import json
+import hashlib
+import qrcode
+from PIL import Image, ImageDraw, features
+
+from gallery.share_images import load_font, wrap_text
+from gallery.storage import protected_storage
+
+TICKET_PREFIX = 'tickets/'
+SIZE = (720, 1080)
+MARGIN = 48
+QR_SIZE = 520
+# Printed at this resolution the PDF ticket is 3.6 x 5.4 inches
+PDF_DPI = 200
+# Bump when the layout changes, so every ticket is drawn again
+LAYOUT_VERSION = 1
+
+BACKGROUND = (255, 255, 255)
+ACCENT = (59, 130, 246)
+TEXT = (17, 24, 39)
+MUTED = (75, 85, 99)
+
+
+def ticket_file_name(registration):
+    """Storage name of a registration's ticket PNG, a hash of everything drawn on it
+
+    The ticket id is part of the name, so ticket files cannot be guessed.
+    """
+    content = json.dumps([LAYOUT_VERSION, settings.SHARE_IMAGE_SITE_NAME, *_ticket_text(registration)])
+    digest = hashlib.sha1(content.encode()).hexdigest()[:12]
+    return f"{TICKET_PREFIX}{registration.event_id}/{registration.ticket_id}-{digest}.png"
+
+
+def pdf_name(name):
+    return f"{name[:-len('.png')]}.pdf"
+
+
+def store_ticket(registration, force=False):
+    """Render and store the PNG and PDF tickets of a registration unless they are up to date
+
+    Returns the name of the PNG; the files of the previous ticket are deleted.
+    """
+    from events.models import Registration
+
+    # Tickets are personal: kept out of the public media storage
+    storage = protected_storage()
+    name = ticket_file_name(registration)
+    if force or not storage.exists(name):
+        png, pdf = render_ticket(registration)
+        for file_name, content in ((name, png), (pdf_name(name), pdf)):
+            # Names are never reused by storage, so a forced render replaces the files
+            storage.delete(file_name)
+            storage.save(file_name, ContentFile(content))
+
+    previous = registration.ticket_file
+    Registration.all_objects.filter(pk=registration.pk).update(ticket_file=name)
+    registration.ticket_file = name
+    if previous and previous != name:
+        storage.delete(previous)
+        storage.delete(pdf_name(previous))
+    return name
+
+
+def render_ticket(registration):
+    """Draw the ticket of a registration; returns the PNG and PDF bytes"""
+    title, when, where, attendee = _ticket_text(registration)
+    canvas = Image.new('RGB', SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(canvas)
+    center = SIZE[0] // 2
+
+    # Header band with the site name
+    draw.rectangle((0, 0, SIZE[0], 120), fill=ACCENT)
+    _text(draw, (center, 60), settings.SHARE_IMAGE_SITE_NAME, load_font(34), BACKGROUND)
+
+    # Event title, up to three lines, then when and where
+    y = 180
+    title_font = load_font(44)
+    for line in wrap_text(draw, title, title_font, SIZE[0] - 2 * MARGIN, max_lines=3):
+        _text(draw, (center, y), line, title_font, TEXT)
+        y += 58
+    y += 10
+    for line in (when, where):
+        if line:
+            _text(draw, (center, y), line, load_font(28), MUTED)
+            y += 44
+
+    # The QR code holds the ticket id, which the door scanner looks up
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=2)
+    code.add_data(str(registration.ticket_id))
+    code.make(fit=True)
+    qr = code.make_image(fill_color='black', back_color='white').get_image().convert('RGB')
+    qr = qr.resize((QR_SIZE, QR_SIZE), Image.Resampling.NEAREST)
+    canvas.paste(qr, (center - QR_SIZE // 2, SIZE[1] - QR_SIZE - 190))
+
+    _text(draw, (center, SIZE[1] - 130), attendee, load_font(36), TEXT)
+    _text(draw, (center, SIZE[1] - 70), str(registration.ticket_id), load_font(20), MUTED)
+
+    png, pdf = io.BytesIO(), io.BytesIO()
+    canvas.save(png, 'PNG', optimize=True)
+    canvas.save(pdf, 'PDF', resolution=PDF_DPI)
+    return png.getvalue(), pdf.getvalue()
+
+
+def _ticket_text(registration):
+    """(title, when, where, attendee) drawn on the ticket"""
+    event, user = registration.event, registration.user
+    when = timezone.localtime(event.start_time).strftime('%Y-%m-%d %H:%M')
+    where = event.address or ('Online' if event.event_type == event.TypeChoices.ONLINE else '')
+    return event.title, when, where, user.get_full_name() or user.username
+
+
+def _direction(text):
+    """'rtl' for Persian text when raqm can shape it"""
+    if any('\u0590' <= char <= '\u08ff' for char in text) and features.check('raqm'):
+        return 'rtl'
+    return None
+
+
+def _text(draw, position, text, font, fill):
+    """Draw a line centred on `position`"""
+    draw.text(position, text, font=font, fill=fill, anchor='mm', direction=_direction(text))
@@ -6,22 +6,22 @@ from import_export.admin import ImportExportModelAdmin
 
 from gallery.models import Gallery
 from gallery.resources import GalleryResource
-from utils.admin import SoftDeleteListFilter
+from utils.admin import SoftDeleteListFilter, BackgroundImportMixin
 
 @admin.register(Gallery)
-class GalleryAdmin(ModelAdmin, ImportExportModelAdmin):
+class GalleryAdmin(BackgroundImportMixin, ModelAdmin, ImportExportModelAdmin):
     resource_class = GalleryResource
     list_display = ('title', 'image_preview', 'uploaded_by', 'file_size_display', 'dimensions', 'is_public', 'created_at')
     list_filter = ('is_public', 'uploaded_by', 'created_at', SoftDeleteListFilter)
     search_fields = ('title', 'description', 'alt_text')
-    readonly_fields = ('file_size', 'width', 'height', 'image_preview_large', 'markdown_url')
+    readonly_fields = ('file_size', 'width', 'height', 'renditions', 'processed_at', 'image_preview_large', 'markdown_url')
     
     fieldsets = (
         ('Image Info', {
             'fields': ('title', 'description', 'image', 'alt_text', 'is_public')
         }),
         ('Metadata', {
-            'fields': ('uploaded_by', 'file_size', 'width', 'height'),
+            'fields': ('uploaded_by', 'file_size', 'width', 'height', 'renditions', 'processed_at'),
             'classes': ('collapse',)
         }),
         ('Preview & Usage', {
@@ -40,7 +40,7 @@ class GalleryAdmin(ModelAdmin, ImportExportModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 4px;" />',
-                obj.image.url
+                obj.thumbnail_url
             )
         return "No Image"
     image_preview.short_description = "Preview"
@@ -49,7 +49,7 @@ class GalleryAdmin(ModelAdmin, ImportExportModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-width: 300px; max-height: 300px; object-fit: contain;" />',
-                obj.image.url
+                obj.rendition_url('medium')
             )
         return "No Image"
     image_preview_large.short_description = "Image Preview"
@@ -65,12 +65,18 @@ class GalleryAdmin(ModelAdmin, ImportExportModelAdmin):
     dimensions.short_description = "Dimensions"
     
     def make_public(self, request, queryset):
-        queryset.update(is_public=True)
+        # Saved one by one, so their files are moved to the matching storage
+        for image in queryset:
+            image.is_public = True
+            image.save(update_fields=['is_public', 'updated_at'])
         self.message_user(request, f"Made {queryset.count()} images public.")
     make_public.short_description = "Make selected images public"
     
     def make_private(self, request, queryset):
-        queryset.update(is_public=False)
+        # Saved one by one, so their files are moved to the matching storage
+        for image in queryset:
+            image.is_public = False
+            image.save(update_fields=['is_public', 'updated_at'])
         self.message_user(request, f"Made {queryset.count()} images private.")
     make_private.short_description = "Make selected images private"
     
@@ -0,0 +1,179 @@
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.text import slugify
+
+import re
+import struct
+import hashlib
+import posixpath
+
+from gallery.models import Gallery
+from gallery.processing import file_crc32
+
+# Albums are streamed as uncompressed (STORED) ZIPs: JPEGs do not compress,
+# and with every CRC and size known up front the byte layout of the archive
+# is fixed, so its length is known and any range of it can be produced
+# without building the rest.
+CHUNK_SIZE = 256 * 1024
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+ZIP64_END_RECORD = struct.Struct('<IQHHIIQQQQ')
+ZIP64_LOCATOR = struct.Struct('<IIQI')
+ZIP64_OFFSET_EXTRA = struct.Struct('<HHQ')
+
+UTF8_FLAG = 0x0800
+VERSION = 20
+ZIP64_VERSION = 45
+ZIP32_LIMIT = 0xFFFFFFFF
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def ensure_checksums(images):
+    """Fill in the CRC and size of images stored before they were recorded at processing time"""
+    for image in images:
+        if image.crc32 is None or image.file_size is None:
+            image.crc32 = file_crc32(image.image)
+            image.file_size = image.image.size
+            Gallery.all_objects.filter(pk=image.pk, image=image.image.name).update(
+                crc32=image.crc32, file_size=image.file_size
+            )
+
+
+class Album:
+    """The byte layout of a STORED ZIP of gallery images
+
+    The archive is a list of segments, each either literal header bytes or a
+    stored file, so only the headers (a few dozen bytes per image) are held
+    in memory.
+    """
+
+    def __init__(self, images):
+        self.segments = []
+        self.size = 0
+        central_directory = []
+
+        for index, image in enumerate(images, start=1):
+            name = self._entry_name(index, image).encode()
+            dos_time, dos_date = self._dos_datetime(image.created_at)
+            offset = self.size
+
+            self._add(LOCAL_HEADER.pack(
+                0x04034b50, VERSION, UTF8_FLAG, 0, dos_time, dos_date,
+                image.crc32, image.file_size, image.file_size, len(name), 0
+            ) + name)
+            self._add(image.image.name, length=image.file_size)
+
+            extra = b''
+            if offset >= ZIP32_LIMIT:
+                extra = ZIP64_OFFSET_EXTRA.pack(0x0001, 8, offset)
+            central_directory.append(CENTRAL_HEADER.pack(
+                0x02014b50, ZIP64_VERSION if extra else VERSION, ZIP64_VERSION if extra else VERSION,
+                UTF8_FLAG, 0, dos_time, dos_date, image.crc32, image.file_size, image.file_size,
+                len(name), len(extra), 0, 0, 0, 0, min(offset, ZIP32_LIMIT)
+            ) + name + extra)
+
+        directory_offset = self.size
+        directory = b''.join(central_directory)
+        self._add(directory)
+        self._add(self._end_records(len(central_directory), len(directory), directory_offset))
+
+        self.etag = '"%s"' % hashlib.sha1(
+            b''.join(f"{image.image.name}:{image.crc32}:{image.file_size};".encode() for image in images)
+        ).hexdigest()
+
+    def stream(self, start, end):
+        """Yield bytes start..end (inclusive) of the archive"""
+        position = 0
+        for length, content, is_file in self.segments:
+            segment_end = position + length
+            if segment_end > start and position <= end:
+                first = max(start - position, 0)
+                last = min(end - position, length - 1)
+                if is_file:
+                    yield from self._read_file(content, first, last - first + 1)
+                else:
+                    yield content[first:last + 1]
+            position = segment_end
+            if position > end:
+                break
+
+    def _add(self, content, length=None):
+        is_file = length is not None
+        length = length if is_file else len(content)
+        self.segments.append((length, content, is_file))
+        self.size += length
+
+    def _end_records(self, count, directory_size, directory_offset):
+        if count < 0xFFFF and directory_size < ZIP32_LIMIT and directory_offset < ZIP32_LIMIT:
+            return END_RECORD.pack(0x06054b50, 0, 0, count, count, directory_size, directory_offset, 0)
+
+        zip64_offset = directory_offset + directory_size
+        return (
+            ZIP64_END_RECORD.pack(
+                0x06064b50, ZIP64_END_RECORD.size - 12, ZIP64_VERSION, ZIP64_VERSION,
+                0, 0, count, count, directory_size, directory_offset
+            )
+            + ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_offset, 1)
+            + END_RECORD.pack(
+                0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                min(directory_size, ZIP32_LIMIT), min(directory_offset, ZIP32_LIMIT), 0
+            )
+        )
+
+    @staticmethod
+    def _read_file(name, offset, length):
+        storage = Gallery._meta.get_field('image').storage
+        with storage.open(name, 'rb') as stored:
+            stored.seek(offset)
+            while length > 0:
+                block = stored.read(min(CHUNK_SIZE, length))
+                if not block:
+                    raise IOError(f"{name} is shorter than recorded")
+                length -= len(block)
+                yield block
+
+    @staticmethod
+    def _entry_name(index, image):
+        extension = posixpath.splitext(image.image.name)[1].lower()
+        return f"{index:03d}-{slugify(image.title, allow_unicode=True) or 'photo'}{extension}"
+
+    @staticmethod
+    def _dos_datetime(moment):
+        if moment.year < 1980:
+            return 0, (1 << 5) | 1
+        return (
+            (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2),
+            ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day,
+        )
+
+
+def album_response(request, album, filename):
+    """Stream an album, honouring a single Range (and If-Range) so downloads can resume"""
+    start, end, status = 0, album.size - 1, 200
+
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (if_range is None or if_range == album.etag):
+        match = RANGE_PATTERN.match(range_header.strip())
+        if match and any(match.groups()):
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), album.size - 1) if last else album.size - 1
+            else:
+                start = max(album.size - int(last), 0)
+            if start > end or start >= album.size:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{album.size}"
+                return response
+            status = 206
+
+    response = StreamingHttpResponse(album.stream(start, end), status=status, content_type='application/zip')
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = album.etag
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if status == 206:
+        response['Content-Range'] = f"bytes {start}-{end}/{album.size}"
+    return response
@@ -0,0 +1,202 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.utils import timezone
+
+import hashlib
+import posixpath
+from collections import Counter
+from PIL import Image
+
+from gallery.models import Gallery, MediaBlob
+from gallery.storage import private_name
+
+BLOB_PREFIX = 'blobs/'
+
+# Image fields whose files are stored as content-addressed blobs: model -> fields
+BLOB_FIELDS = {
+    'gallery.Gallery': ('image',),
+    'events.Event': ('featured_image',),
+    'blog.Post': ('featured_image',),
+    'users.User': ('profile_picture',),
+}
+
+PHASH_BANDS = 4
+PHASH_MASK = (1 << 64) - 1
+
+
+def blob_sha(name):
+    """SHA-256 of a blob from its storage name, or None for files stored before blobs"""
+    if name and name.startswith(BLOB_PREFIX):
+        return posixpath.splitext(posixpath.basename(name))[0]
+    return None
+
+
+def store_blob(content, filename):
+    """Store a file under the hash of its bytes unless those bytes are already stored
+
+    Returns the MediaBlob. References are not counted here but when a model
+    saves the blob's name, see retain_blobs.
+    """
+    sha256 = getattr(content, 'sha256', None)
+    if sha256 is None:
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+    # Touching the existing blob keeps the orphan sweep away until the new
+    # reference is saved
+    if MediaBlob.all_objects.filter(sha256=sha256).update(updated_at=timezone.now()):
+        return MediaBlob.all_objects.get(sha256=sha256)
+
+    name = _blob_name(sha256, filename)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, content)
+
+    phash = _perceptual_hash(name)
+    blob, created = MediaBlob.all_objects.get_or_create(
+        sha256=sha256,
+        defaults={'name': name, 'size': default_storage.size(name), **_phash_fields(phash)}
+    )
+    if not created and blob.name != name:
+        # Lost a race with an upload of the same bytes
+        default_storage.delete(name)
+    return blob
+
+
+def adopt_blob(name, sha256):
+    """Make a file already in storage the blob of its bytes, moving it under its hash
+
+    For files uploaded straight to object storage: the bytes were checked by
+    storage, and in a bucket the move is a server-side copy. The perceptual
+    hash is left to the image pipeline, see fill_perceptual_hash.
+    """
+    if MediaBlob.all_objects.filter(sha256=sha256).update(updated_at=timezone.now()):
+        default_storage.delete(name)
+        return MediaBlob.all_objects.get(sha256=sha256)
+
+    blob_name = _blob_name(sha256, name)
+    if not default_storage.exists(blob_name):
+        if hasattr(default_storage, 'bucket'):
+            default_storage.bucket.copy(
+                {'Bucket': default_storage.bucket_name, 'Key': default_storage._normalize_name(name)},
+                default_storage._normalize_name(blob_name)
+            )
+        else:
+            with default_storage.open(name, 'rb') as stored:
+                blob_name = default_storage.save(blob_name, stored)
+    default_storage.delete(name)
+
+    blob, created = MediaBlob.all_objects.get_or_create(
+        sha256=sha256,
+        defaults={'name': blob_name, 'size': default_storage.size(blob_name)}
+    )
+    if not created and blob.name != blob_name:
+        default_storage.delete(blob_name)
+    return blob
+
+
+def fill_perceptual_hash(name):
+    """Hash a blob that was adopted without being decoded"""
+    if MediaBlob.all_objects.filter(name=name, phash__isnull=True).exists():
+        fields = _phash_fields(_perceptual_hash(name))
+        if fields:
+            MediaBlob.all_objects.filter(name=name).update(**fields)
+
+
+def commit_blob_fields(instance):
+    """Move files newly assigned to an instance's image fields into blob storage
+
+    Files of private gallery images are never shared with other images, so
+    they are saved to the protected storage under a name of their own.
+    """
+    for field in BLOB_FIELDS[instance._meta.label]:
+        field_file = getattr(instance, field)
+        if field_file and not field_file._committed:
+            if getattr(instance, 'is_public', True):
+                name = store_blob(field_file.file, field_file.name).name
+            else:
+                name = field_file.storage.save(private_name(field_file.name), field_file.file)
+            setattr(instance, field, name)
+
+
+def retain_blobs(names):
+    for name, count in Counter(name for name in names if blob_sha(name)).items():
+        MediaBlob.all_objects.filter(name=name).update(ref_count=F('ref_count') + count)
+
+
+def release_blobs(names):
+    """Drop references; unreferenced blobs are deleted by cleanup_orphan_blobs after a grace period"""
+    for name, count in Counter(name for name in names if blob_sha(name)).items():
+        MediaBlob.all_objects.filter(name=name, ref_count__gte=count).update(
+            ref_count=F('ref_count') - count,
+            updated_at=timezone.now()
+        )
+
+
+def find_similar_blobs(blob, distance):
+    """Other referenced blobs whose perceptual hash is within `distance` bits
+
+    A match within 3 bits shares at least one of the four 16-bit bands, so
+    the candidates come from indexed equality lookups.
+    """
+    if not distance or blob.phash is None:
+        return []
+
+    bands = Q()
+    for band in range(PHASH_BANDS):
+        bands |= Q(**{f'phash_band_{band}': getattr(blob, f'phash_band_{band}')})
+
+    candidates = MediaBlob.all_objects.filter(bands, ref_count__gt=0).exclude(pk=blob.pk)
+    return [
+        candidate for candidate in candidates
+        if bin((candidate.phash ^ blob.phash) & PHASH_MASK).count('1') <= distance
+    ]
+
+
+def find_similar_images(gallery):
+    """Ids of other gallery images holding the same picture or, by perceptual hash, a near-identical one
+
+    Only public images and the uploader's own are reported, so an upload
+    never reveals that someone else's private image exists.
+    """
+    blob = MediaBlob.all_objects.filter(name=gallery.image.name).first()
+    if blob is None:
+        return []
+
+    names = [blob.name] + [similar.name for similar in find_similar_blobs(blob, settings.MEDIA_PHASH_DISTANCE)]
+    return list(Gallery.objects.filter(
+        Q(is_public=True) | Q(uploaded_by_id=gallery.uploaded_by_id),
+        image__in=names
+    ).exclude(pk=gallery.pk).values_list('id', flat=True))
+
+
+def _blob_name(sha256, filename):
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256}{posixpath.splitext(filename)[1].lower()}"
+
+
+def _perceptual_hash(name):
+    """64-bit difference hash: whether each pixel of a 9x8 grayscale thumbnail is brighter than its neighbour"""
+    try:
+        with default_storage.open(name, 'rb') as image_file, Image.open(image_file) as img:
+            img.draft('L', (64, 64))
+            pixels = list(img.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def _phash_fields(bits):
+    if bits is None:
+        return {}
+    fields = {f'phash_band_{band}': (bits >> (16 * band)) & 0xFFFF for band in range(PHASH_BANDS)}
+    # Stored signed to fit a BigIntegerField
+    fields['phash'] = bits - (1 << 64) if bits >= 1 << 63 else bits
+    return fields
+
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+import os
+import zipfile
+import posixpath
+
+from gallery.models import Gallery
+from gallery.blobs import blob_sha, store_blob, retain_blobs
+from gallery.processing import generate_renditions, file_crc32
+from utils.dispatch import enqueue_on_commit
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+
+
+class GalleryImportError(Exception):
+    """Raised when an import source cannot be read at all"""
+
+
+def store_archive_images(archive_file):
+    """Stream the images out of a ZIP archive into media storage
+
+    Entries are copied one buffer at a time, so no image is ever held in
+    memory whole. Returns the stored names with their titles, and how many
+    entries were skipped for being too large or repeated within the import.
+    """
+    stored, skipped = _StoredImages(), 0
+    try:
+        with zipfile.ZipFile(archive_file) as zf:
+            entries = [info for info in zf.infolist() if _is_image(info.filename) and not info.is_dir()]
+            if len(entries) > settings.GALLERY_IMPORT_MAX_FILES:
+                raise GalleryImportError(f"Archive has more than {settings.GALLERY_IMPORT_MAX_FILES} images")
+
+            for info in entries:
+                # Checked against the header, and zipfile stops reading there
+                if info.file_size > settings.GALLERY_IMPORT_MAX_FILE_SIZE:
+                    skipped += 1
+                    continue
+                with zf.open(info) as entry:
+                    stored.add(entry, info.filename)
+    except zipfile.BadZipFile as e:
+        raise GalleryImportError(f"Not a valid ZIP archive: {e}")
+
+    return stored.images, skipped + stored.repeated
+
+
+def store_directory_images(path):
+    """Copy the images of a server-side directory (recursively) into media storage"""
+    if not os.path.isdir(path):
+        raise GalleryImportError(f"{path} is not a directory")
+
+    stored, skipped = _StoredImages(), 0
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            if not _is_image(filename):
+                continue
+            file_path = os.path.join(root, filename)
+            if os.path.getsize(file_path) > settings.GALLERY_IMPORT_MAX_FILE_SIZE:
+                skipped += 1
+                continue
+            if len(stored.images) == settings.GALLERY_IMPORT_MAX_FILES:
+                # Whatever was stored is unreferenced and swept with the orphans
+                raise GalleryImportError(f"Directory has more than {settings.GALLERY_IMPORT_MAX_FILES} images")
+            with open(file_path, 'rb') as source:
+                stored.add(source, filename)
+
+    return stored.images, skipped + stored.repeated
+
+
+def process_image(name, title):
+    """Decode a stored original once and write its renditions
+
+    Touches storage only, never the database, so it can run in a worker
+    process of a pool. Returns the fields of the Gallery row to create.
+    """
+    image = Gallery(image=name).image
+    (width, height), renditions, placeholder = generate_renditions(image, blob_sha(name))
+    return {
+        'image': name,
+        'title': title,
+        'width': width,
+        'height': height,
+        'file_size': image.size,
+        'crc32': file_crc32(image),
+        'renditions': renditions,
+        'placeholder': placeholder,
+    }
+
+
+def find_processed_images(names):
+    """Row fields for images whose bytes are already in the gallery and processed, by name"""
+    processed = Gallery.all_objects.filter(
+        image__in=names, processed_at__isnull=False
+    ).values('image', 'width', 'height', 'file_size', 'crc32', 'renditions', 'placeholder')
+    return {fields['image']: fields for fields in processed}
+
+
+def create_gallery_images(gallery_import, results):
+    """Insert the processed images and attach them to the event in one M2M insert"""
+    processed_at = timezone.now()
+    images = Gallery.objects.bulk_create([
+        Gallery(
+            uploaded_by_id=gallery_import.uploaded_by_id,
+            is_public=gallery_import.is_public,
+            processed_at=processed_at,
+            **result
+        )
+        for result in results
+    ])
+    gallery_import.event.gallery_images.add(*images)
+    # bulk_create skips the signals that count blob references
+    retain_blobs(image.image.name for image in images)
+    # Archives are stored as blobs; private images are moved out of them
+    moving = [image.pk for image in images if image.needs_moving]
+    if moving:
+        from gallery.tasks import move_gallery_files
+        enqueue_on_commit(move_gallery_files, moving)
+    return images
+
+
+class _StoredImages:
+    """Stores images as blobs, keeping the first of any repeated picture"""
+
+    def __init__(self):
+        self.images = []
+        self.repeated = 0
+        self._names = set()
+
+    def add(self, source, filename):
+        name = store_blob(File(source), filename).name
+        if name in self._names:
+            self.repeated += 1
+        else:
+            self._names.add(name)
+            self.images.append((name, _title(filename)))
+
+
+def _is_image(filename):
+    basename = posixpath.basename(filename)
+    return (
+        not filename.startswith('__MACOSX/')
+        and not basename.startswith('.')
+        and posixpath.splitext(basename)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+
+def _title(filename):
+    return posixpath.splitext(posixpath.basename(filename))[0][:200]
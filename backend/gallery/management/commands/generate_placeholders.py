@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.apps import apps
+
+from PIL import UnidentifiedImageError
+
+from gallery.models import Gallery
+from gallery.placeholders import compute_placeholder
+
+FEATURED_IMAGE_MODELS = ('events.Event', 'blog.Post')
+
+
+class Command(BaseCommand):
+    help = "Compute the placeholders of images stored before placeholders were generated during processing"
+
+    def handle(self, *args, **options):
+        count = 0
+        for image in Gallery.all_objects.filter(placeholder='').exclude(image='').iterator():
+            placeholder = self._compute(image.image)
+            if placeholder:
+                Gallery.all_objects.filter(pk=image.pk, image=image.image.name).update(placeholder=placeholder[1])
+                count += 1
+
+        for label in FEATURED_IMAGE_MODELS:
+            model = apps.get_model(label)
+            queryset = model.all_objects.filter(featured_image_placeholder='').exclude(featured_image='')
+            for instance in queryset.exclude(featured_image__isnull=True).iterator():
+                placeholder = self._compute(instance.featured_image)
+                if placeholder:
+                    model.all_objects.filter(pk=instance.pk, featured_image=instance.featured_image.name).update(
+                        featured_image_aspect_ratio=placeholder[0],
+                        featured_image_placeholder=placeholder[1]
+                    )
+                    count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated {count} placeholders"))
+
+    def _compute(self, image):
+        try:
+            return compute_placeholder(image)
+        except (UnidentifiedImageError, OSError) as e:
+            self.stderr.write(f"Skipped {image.name}: {e}")
+            return None
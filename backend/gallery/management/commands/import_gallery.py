@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils import timezone
+
+import os
+import django
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from events.models import Event
+from gallery.models import GalleryImport
+from gallery.imports import (
+    GalleryImportError, store_archive_images, store_directory_images,
+    process_image, find_processed_images, create_gallery_images
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import the photos of a server-side directory or ZIP archive into an event's gallery"
+
+    def add_arguments(self, parser):
+        parser.add_argument('event', help="Event id or slug")
+        parser.add_argument('path', help="Directory or .zip file to import")
+        parser.add_argument('--user', required=True, help="Username the images are credited to")
+        parser.add_argument('--private', action='store_true', help="Hide the imported images from the public gallery")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Decoding processes (default: all cores)")
+
+    def handle(self, *args, **options):
+        event = Event.objects.filter(slug=options['event']).first()
+        if event is None and options['event'].isdigit():
+            event = Event.objects.filter(id=options['event']).first()
+        if event is None:
+            raise CommandError(f"Event {options['event']} not found")
+
+        user = User.objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} not found")
+
+        path = os.path.abspath(options['path'])
+        gallery_import = GalleryImport.objects.create(
+            event=event,
+            uploaded_by=user,
+            source_path=path,
+            is_public=not options['private'],
+            status=GalleryImport.StatusChoices.EXTRACTING
+        )
+
+        try:
+            if os.path.isfile(path):
+                with open(path, 'rb') as archive:
+                    stored, skipped = store_archive_images(archive)
+            else:
+                stored, skipped = store_directory_images(path)
+        except (GalleryImportError, OSError) as e:
+            GalleryImport.objects.filter(id=gallery_import.id).update(
+                status=GalleryImport.StatusChoices.FAILED, error=str(e), finished_at=timezone.now()
+            )
+            raise CommandError(str(e))
+
+        # Images already in the gallery reuse their renditions
+        processed = find_processed_images([name for name, _ in stored])
+
+        GalleryImport.objects.filter(id=gallery_import.id).update(
+            status=GalleryImport.StatusChoices.PROCESSING,
+            total_files=len(stored),
+            processed_files=len(processed),
+            failed_files=skipped
+        )
+        self.stdout.write(
+            f"Processing {len(stored) - len(processed)} images with {options['workers']} workers "
+            f"({len(processed)} already processed, {skipped} skipped)"
+        )
+
+        results = [
+            {**processed[name], 'title': title} if name in processed else None
+            for name, title in stored
+        ]
+        failed = []
+        # django.setup() makes the workers work with spawn/forkserver start methods too
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            futures = {
+                executor.submit(process_image, name, title): index
+                for index, (name, title) in enumerate(stored)
+                if name not in processed
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    failed.append(stored[index][0])
+                    self.stderr.write(f"Failed to process {stored[index][1]}: {e}")
+
+                GalleryImport.objects.filter(id=gallery_import.id).update(processed_files=F('processed_files') + 1)
+                if done % 25 == 0 or done == len(futures):
+                    self.stdout.write(f"  {done}/{len(futures)}")
+
+        images = create_gallery_images(gallery_import, [result for result in results if result is not None])
+
+        GalleryImport.objects.filter(id=gallery_import.id).update(
+            status=GalleryImport.StatusChoices.COMPLETED,
+            failed_files=F('failed_files') + len(failed),
+            created_images=len(images),
+            finished_at=timezone.now()
+        )
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(images)} images into {event}"))
@@ -1,20 +1,116 @@
 from django.db import models
 from django.conf import settings
-
-from PIL import Image
+from django.core.files.storage import FileSystemStorage, default_storage
 
 from utils.models import BaseModel
+from utils.dispatch import enqueue_on_commit
+from gallery.placeholders import aspect_ratio
+from gallery.protected import build_protected_url
+from gallery.storage import media_storage, is_private_name
+
+import os
+import uuid
+
+
+def stored_file_name(instance, field):
+    """Name of the file stored for `field` when the instance was loaded, for post_init receivers
+
+    Read from the raw value, so a deferred field costs no query: None then.
+    Nothing is stored yet for a new row, whatever it was created with.
+    """
+    if instance.pk is None:
+        return ''
+    if field not in instance.__dict__:
+        return None
+    value = instance.__dict__[field]
+    return getattr(value, 'name', value) or ''
+
+
+def file_replaced(instance, field, stored):
+    """Whether `field` names another file than the one stored, see stored_file_name"""
+    if stored is None:
+        if field not in instance.__dict__:
+            # Deferred and never touched since
+            return False
+        stored = type(instance)._base_manager.filter(pk=instance.pk).values_list(field, flat=True).first() or ''
+    return getattr(instance, field).name != stored
+
+
+class FeaturedImageMixin(models.Model):
+    """Placeholder and aspect ratio of a model's `featured_image`, filled in by a worker"""
+    featured_image_placeholder = models.TextField(blank=True)
+    featured_image_aspect_ratio = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+    # _stored_featured_image is set by a post_init receiver, see gallery.signals
+
+    def save(self, *args, **kwargs):
+        # New files are moved into blob storage by the pre_save signal
+        image_changed = self.reset_featured_image()
+
+        super().save(*args, **kwargs)
+        self._stored_featured_image = self.featured_image.name
+
+        if image_changed and self.featured_image:
+            from gallery.tasks import process_featured_image
+            enqueue_on_commit(process_featured_image, self._meta.label, self.pk)
+
+    def reset_featured_image(self):
+        """Clear what was derived from a replaced image; returns whether it was replaced"""
+        if not file_replaced(self, 'featured_image', self._stored_featured_image):
+            return False
+        self.featured_image_placeholder = ''
+        self.featured_image_aspect_ratio = None
+        return True
+
+
+class ShareImageMixin(models.Model):
+    """Open Graph image of a published post or event, drawn by a worker whenever what it shows changes
+
+    Subclasses provide share_image_text() and a `featured_image`.
+    """
+    share_image = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        abstract = True
+
+    def share_image_text(self):
+        """(title, subtitle) drawn on the share image"""
+        raise NotImplementedError
+
+    @property
+    def share_image_url(self):
+        return default_storage.url(self.share_image) if self.share_image else None
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.queue_share_image()
+
+    def queue_share_image(self):
+        """Queue a render unless the image is a draft's or already shows the current text"""
+        from gallery.share_images import share_image_name
+        if self.status != self.StatusChoices.DRAFT and share_image_name(self) != self.share_image:
+            from gallery.tasks import render_share_image
+            enqueue_on_commit(render_share_image, self._meta.label, self.pk)
+
 
 class Gallery(BaseModel):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to='gallery/')
+    # Private images' files are under private/, in the protected storage
+    image = models.ImageField(upload_to='gallery/', storage=media_storage)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='gallery_images')
     alt_text = models.CharField(max_length=200, blank=True)
     file_size = models.PositiveIntegerField(null=True, blank=True)
+    crc32 = models.PositiveBigIntegerField(null=True, blank=True)
     width = models.PositiveIntegerField(null=True, blank=True)
     height = models.PositiveIntegerField(null=True, blank=True)
     is_public = models.BooleanField(default=True)
+    renditions = models.JSONField(default=dict, blank=True)
+    placeholder = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -23,48 +119,104 @@ class Gallery(BaseModel):
     def __str__(self):
         return self.title
 
+    # _stored_image_name is set by a post_init receiver, see gallery.signals
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        if self.image:
-            # Get file size
+        # New files are moved into blob storage by the pre_save signal, so a
+        # file uploaded here is matched with its twin by the worker instead
+        image_changed = self.image_replaced()
+        needs_processing = False
+
+        if image_changed:
+            # Only cheap metadata here; decoding and renditions happen in a worker
             self.file_size = self.image.size
-            
-            # Get image dimensions
-            with Image.open(self.image.path) as img:
-                self.width, self.height = img.size
-            
-            # Compress image if it's too large
-            self.compress_image()
-            
-            # Update fields without triggering save again
-            Gallery.objects.filter(pk=self.pk).update(
-                file_size=self.file_size,
-                width=self.width,
-                height=self.height
-            )
-
-    def compress_image(self):
-        """Compress image if it's larger than 2MB or dimensions are too large"""
-        if not self.image:
-            return
-            
-        with Image.open(self.image.path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            
-            # Resize if too large
-            max_size = (1920, 1080)
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Compress if file size is too large
-            quality = 85
-            if self.file_size and self.file_size > 2 * 1024 * 1024:  # 2MB
-                quality = 70
-            
-            img.save(self.image.path, "JPEG", quality=quality, optimize=True)
+            self.crc32 = self.width = self.height = None
+            self.renditions = {}
+            self.placeholder = ''
+
+            # The same bytes were uploaded before: reuse their renditions
+            twin = self.find_processed_twin() if self.image._committed else None
+            if twin:
+                for field, value in twin.items():
+                    setattr(self, field, value)
+            else:
+                self.processed_at = None
+                needs_processing = True
+
+        super().save(*args, **kwargs)
+        self._stored_image_name = self.image.name
+
+        if needs_processing:
+            from gallery.tasks import process_uploaded_image
+            enqueue_on_commit(process_uploaded_image, self.pk)
+
+        if self.needs_moving:
+            from gallery.tasks import move_gallery_files
+            enqueue_on_commit(move_gallery_files, [self.pk])
+
+    def image_replaced(self):
+        return bool(self.image) and file_replaced(self, 'image', self._stored_image_name)
+
+    @property
+    def needs_moving(self):
+        """Whether the files are in the public storage of a private image, or the other way round"""
+        return bool(self.image) and self.is_public == is_private_name(self.image.name)
+
+    def find_processed_twin(self):
+        """What was derived from the same blob for another, processed gallery image"""
+        return Gallery.all_objects.filter(
+            image=self.image.name, processed_at__isnull=False
+        ).exclude(pk=self.pk).values('crc32', 'width', 'height', 'renditions', 'placeholder', 'processed_at').first()
+
+    def file_url(self, variant):
+        """URL of the original or a rendition; private images only get signed, expiring URLs"""
+        name = self.image.name if variant == 'original' else self.renditions[variant]['path']
+        if self.is_public and not is_private_name(name):
+            return self.image.storage.url(name)
+        return build_protected_url(self, variant)
+
+    def protected_file(self, variant):
+        """(storage, name) of the original or a rendition, for the protected media view"""
+        if variant == 'original':
+            name = self.image.name
+        else:
+            name = self.renditions.get(variant, {}).get('path')
+        return (self.image.storage.route(name), name) if name else None
+
+    @property
+    def image_url(self):
+        return self.file_url('original') if self.image else None
+
+    def rendition_url(self, name):
+        """URL of a rendition, falling back to the original until it is processed"""
+        if name in self.renditions:
+            return self.file_url(name)
+        return self.image_url
+
+    @property
+    def aspect_ratio(self):
+        return aspect_ratio(self.width, self.height)
+
+    @property
+    def thumbnail_url(self):
+        return self.rendition_url('thumbnail')
+
+    @property
+    def webp_url(self):
+        return self.rendition_url('webp')
+
+    @property
+    def srcset(self):
+        """srcset of the JPEG renditions, smallest first"""
+        # Small originals yield renditions of equal width; keep one of each
+        candidates = {
+            rendition['width']: name
+            for name, rendition in sorted(self.renditions.items(), key=lambda item: -item[1]['size'])
+            if rendition['format'] == 'jpeg'
+        }
+        if not candidates:
+            return self.image_url or ''
+        return ', '.join(f"{self.file_url(candidates[width])} {width}w" for width in sorted(candidates))
 
     @property
     def file_size_mb(self):
@@ -76,4 +228,121 @@ class Gallery(BaseModel):
     @property
     def markdown_url(self):
         """Return URL for use in markdown"""
-        return f"![{self.alt_text or self.title}]({self.image.url})"
+        return f"![{self.alt_text or self.title}]({self.image_url})"
+
+
+class ChunkedUpload(BaseModel):
+    """An upload in progress; its bytes are appended to a file on disk, never kept in memory"""
+
+    class PurposeChoices(models.TextChoices):
+        GALLERY = 'gallery', 'Gallery Image'
+        PROFILE_PICTURE = 'profile_picture', 'Profile Picture'
+        GALLERY_IMPORT = 'gallery_import', 'Gallery Import Archive'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    purpose = models.CharField(max_length=20, choices=PurposeChoices.choices)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+    @property
+    def temp_path(self):
+        return settings.UPLOAD_CHUNK_DIR / f"{self.id}.part"
+
+    @property
+    def is_complete(self):
+        return self.received_size == self.total_size
+
+
+class DirectUpload(BaseModel):
+    """An upload sent by the client straight to object storage with a presigned PUT URL"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='direct_uploads')
+    purpose = models.CharField(max_length=20, choices=ChunkedUpload.PurposeChoices.choices)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    total_size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.total_size} bytes)"
+
+    @property
+    def key(self):
+        """Storage name the client uploads to, until the file is moved into blob storage"""
+        return f"incoming/{self.id}{os.path.splitext(self.filename)[1].lower()}"
+
+
+def import_storage():
+    return FileSystemStorage(location=settings.GALLERY_IMPORT_DIR)
+
+
+class GalleryImport(BaseModel):
+    """A bulk import of photos into an event's gallery, from a ZIP archive or a server-side directory"""
+
+    class StatusChoices(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        EXTRACTING = 'extracting', 'Extracting'
+        PROCESSING = 'processing', 'Processing'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    event = models.ForeignKey('events.Event', on_delete=models.CASCADE, related_name='gallery_imports')
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='gallery_imports')
+    archive = models.FileField(upload_to='archives/', storage=import_storage, blank=True)
+    source_path = models.CharField(max_length=500, blank=True)
+    is_public = models.BooleanField(default=True)
+    status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.PENDING)
+    total_files = models.PositiveIntegerField(default=0)
+    processed_files = models.PositiveIntegerField(default=0)
+    failed_files = models.PositiveIntegerField(default=0)
+    created_images = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import #{self.pk} for {self.event}"
+
+    @property
+    def progress(self):
+        """Percentage of the images that have been processed"""
+        if self.status == self.StatusChoices.COMPLETED:
+            return 100
+        if not self.total_files:
+            return 0
+        return min(100, round(self.processed_files * 100 / self.total_files))
+
+
+class MediaBlob(BaseModel):
+    """A stored file keyed by the SHA-256 of its bytes, shared by every image field that holds it"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    # 64-bit difference hash, and its four 16-bit bands for indexed lookups
+    phash = models.BigIntegerField(null=True, blank=True)
+    phash_band_0 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_1 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_2 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_3 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
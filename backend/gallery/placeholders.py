@@ -0,0 +1,32 @@
+import io
+import base64
+from PIL import Image, ImageOps
+
+# Longest edge of a placeholder; browsers scale it up and blur it
+PLACEHOLDER_EDGE = 16
+
+
+def make_placeholder(img):
+    """A few hundred bytes of WebP as a data URI, painted while the real image loads"""
+    small = img.copy()
+    small.thumbnail((PLACEHOLDER_EDGE, PLACEHOLDER_EDGE), Image.Resampling.LANCZOS)
+    if small.mode not in ('RGB', 'RGBA'):
+        small = small.convert('RGBA' if 'transparency' in small.info or small.mode == 'LA' else 'RGB')
+
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=40)
+    return f"data:image/webp;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def aspect_ratio(width, height):
+    if not width or not height:
+        return None
+    return round(width / height, 4)
+
+
+def compute_placeholder(image):
+    """Aspect ratio and placeholder of a stored image, decoding as little of it as possible"""
+    with image.open('rb') as original, Image.open(original) as img:
+        img.draft('RGB', (PLACEHOLDER_EDGE * 4, PLACEHOLDER_EDGE * 4))
+        img = ImageOps.exif_transpose(img)
+        return aspect_ratio(*img.size), make_placeholder(img)
@@ -0,0 +1,107 @@
+from django.core.files.base import ContentFile
+
+import io
+import zlib
+import posixpath
+from PIL import Image, ImageOps
+
+from gallery.placeholders import make_placeholder
+from gallery.storage import PRIVATE_PREFIX, is_private_name
+
+# name: (longest edge, format, quality), largest first so every rendition is
+# resized from the previous one instead of from the full-size original
+RENDITIONS = [
+    ('large', 1920, 'JPEG', 85),
+    ('webp', 1920, 'WEBP', 80),
+    ('medium', 960, 'JPEG', 82),
+    ('thumbnail', 320, 'JPEG', 80),
+]
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+ORIENTATION_TAG = 0x0112
+
+CRC_BLOCK_SIZE = 1024 * 1024
+
+
+def generate_renditions(image, key):
+    """Decode the original once and store every rendition under gallery/renditions/<key>/
+
+    Renditions of a private original go under private/ with it.
+
+    Returns the original's (width, height), the rendition metadata keyed by
+    rendition name (storage path, dimensions and byte size) and a placeholder
+    data URI made from the smallest rendition.
+    """
+    storage = image.storage
+    directory = posixpath.join('gallery', 'renditions', str(key))
+    if is_private_name(image.name):
+        directory = f"{PRIVATE_PREFIX}{directory}"
+
+    with image.open('rb') as original, Image.open(original) as img:
+        # For JPEGs, let libjpeg decode at 1/2, 1/4 or 1/8 scale when that is
+        # still at least as large as the biggest rendition; bounds memory for
+        # camera-sized uploads. A no-op for other formats.
+        stored_size = img.size
+        img.draft('RGB', _fit(stored_size, RENDITIONS[0][1]))
+
+        # Orientations 5-8 are rotated by 90 degrees, which swaps the edges
+        rotated = img.getexif().get(ORIENTATION_TAG) in (5, 6, 7, 8)
+        original_size = stored_size[::-1] if rotated else stored_size
+        img = ImageOps.exif_transpose(img)
+
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode == 'LA' else 'RGB')
+
+        renditions = {}
+        current = img
+        for name, edge, image_format, quality in RENDITIONS:
+            size = _fit(original_size, edge)
+            if current.size != size:
+                current = current.resize(size, Image.Resampling.LANCZOS)
+
+            encoded = current
+            if image_format == 'JPEG' and encoded.mode != 'RGB':
+                encoded = _flatten(encoded)
+
+            buffer = io.BytesIO()
+            encoded.save(buffer, image_format, quality=quality, optimize=True)
+
+            path = posixpath.join(directory, f"{name}.{EXTENSIONS[image_format]}")
+            if storage.exists(path):
+                storage.delete(path)
+            path = storage.save(path, ContentFile(buffer.getvalue()))
+
+            renditions[name] = {
+                'path': path,
+                'width': size[0],
+                'height': size[1],
+                'size': buffer.tell(),
+                'format': image_format.lower(),
+            }
+
+        placeholder = make_placeholder(current)
+
+    return original_size, renditions, placeholder
+
+
+def file_crc32(image):
+    """CRC-32 of a stored file, as recorded in the ZIP album entries"""
+    crc = 0
+    with image.open('rb') as stored:
+        for block in iter(lambda: stored.read(CRC_BLOCK_SIZE), b''):
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def _fit(size, edge):
+    """Scale (width, height) so the longest edge is at most `edge`, never upscaling"""
+    width, height = size
+    scale = min(1, edge / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _flatten(img):
+    background = Image.new('RGB', img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel('A'))
+    return background
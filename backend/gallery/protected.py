@@ -0,0 +1,92 @@
+from django.apps import apps
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.crypto import salted_hmac, constant_time_compare
+from django.utils.http import content_disposition_header
+
+import time
+import mimetypes
+from urllib.parse import quote
+
+from gallery.storage import protected_storage
+
+
+# URL kind -> model whose protected_file(variant) names the file to send
+PROTECTED_MODELS = {
+    'gallery': 'gallery.Gallery',
+    'ticket': 'events.Registration',
+    'export': 'utils.ExportJob',
+}
+
+
+def build_protected_url(instance, variant, filename=None):
+    """Signed, expiring URL of a file of `instance` that must not be served from the public media path
+
+    The URL names the object and which of its files, never the storage name,
+    which the view looks up again. Whoever builds the URL has checked the
+    permissions; the file view only checks the signature. Expiry is rounded
+    up to a whole window, so the URL of a file stays the same, and
+    cacheable, for a while.
+    """
+    kind = next(kind for kind, label in PROTECTED_MODELS.items() if label == instance._meta.label)
+    path = f"{kind}/{instance.pk}/{variant}"
+    window = settings.PROTECTED_MEDIA_URL_EXPIRY
+    expires = (int(time.time()) // window + 2) * window
+    query = f"?filename={quote(filename)}" if filename else ''
+    return f"{settings.MEDIA_URL}protected/{sign(expires, path, filename)}/{expires}/{path}{query}"
+
+
+def sign(expires, path, filename=None):
+    return salted_hmac('gallery.protected', f"{expires}/{path}/{filename or ''}").hexdigest()[:32]
+
+
+def verify(signature, expires, path, filename=None):
+    return expires > time.time() and constant_time_compare(signature, sign(expires, path, filename))
+
+
+def find_protected_file(kind, pk, variant):
+    """(storage, name) of a file a protected URL points to, or None"""
+    if kind not in PROTECTED_MODELS:
+        return None
+    instance = apps.get_model(PROTECTED_MODELS[kind])._base_manager.filter(pk=pk).first()
+    return instance.protected_file(variant) if instance is not None else None
+
+
+def protected_file_response(storage, name, filename=None):
+    """Hand the transfer of a stored file to whatever serves it best
+
+    Behind nginx the response only names an internal location
+    (X-Accel-Redirect) and behind Apache or lighttpd the file on disk
+    (X-Sendfile), so the proxy sends the bytes. Object storage redirects to a
+    short-lived presigned URL. Otherwise, as in development, Django streams
+    the file.
+    """
+    if hasattr(storage, 'bucket_name'):
+        client = storage.connection.meta.client
+        params = {'Bucket': storage.bucket_name, 'Key': storage._normalize_name(name)}
+        if filename:
+            params['ResponseContentDisposition'] = content_disposition_header(True, filename)
+        return HttpResponseRedirect(client.generate_presigned_url(
+            'get_object', Params=params, ExpiresIn=settings.PROTECTED_MEDIA_URL_EXPIRY
+        ))
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.PROTECTED_MEDIA_SERVER == 'nginx':
+        # A private image still waiting to be moved is in the public media directory
+        location = settings.PROTECTED_MEDIA_INTERNAL_URL if storage is protected_storage() else settings.MEDIA_URL
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(f"{location}{name}")
+    elif settings.PROTECTED_MEDIA_SERVER == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = storage.path(name)
+    else:
+        try:
+            response = FileResponse(storage.open(name, 'rb'), content_type=content_type)
+        except FileNotFoundError:
+            raise Http404("File not found")
+
+    if filename:
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    # Shared caches must not keep what the signature protects
+    response['Cache-Control'] = f"private, max-age={settings.PROTECTED_MEDIA_URL_EXPIRY}"
+    return response
@@ -0,0 +1,231 @@
+from django.apps import apps
+from django.conf import settings
+from django.utils.crypto import salted_hmac, constant_time_compare
+
+import io
+import os
+import time
+import fcntl
+import hashlib
+import logging
+import tempfile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Images that may be resized: URL name -> (model, image field)
+SOURCES = {
+    'gallery': ('gallery.Gallery', 'image'),
+    'event': ('events.Event', 'featured_image'),
+    'post': ('blog.Post', 'featured_image'),
+    'avatar': ('users.User', 'profile_picture'),
+}
+
+FITS = ('cover', 'contain')
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpg': ('JPEG', 'image/jpeg'), 'png': ('PNG', 'image/png')}
+
+
+class ResizeError(Exception):
+    """Raised for resize requests that cannot be served"""
+
+
+def build_resize_url(source, instance, width, height=0, fit='cover', image_format='webp'):
+    """Signed URL of a resized copy of an instance's image, or None if it has no image"""
+    field_file = getattr(instance, SOURCES[source][1])
+    if not field_file:
+        return None
+
+    spec = f"{width}x{height}_{fit}.{image_format}"
+    path = f"{source}/{instance.pk}/{image_version(field_file)}/{spec}"
+    return f"{settings.MEDIA_URL}resize/{sign(path)}/{path}"
+
+
+def image_version(field_file):
+    """Changes whenever the stored file changes, so resized URLs can be cached forever"""
+    return hashlib.md5(field_file.name.encode()).hexdigest()[:10]
+
+
+def sign(path):
+    return salted_hmac('gallery.resize', path).hexdigest()[:16]
+
+
+def verify(signature, path):
+    return constant_time_compare(signature, sign(path))
+
+
+def parse_spec(spec):
+    """Parse '<width>x<height>_<fit>.<format>' into its validated parts"""
+    try:
+        size, rest = spec.split('_', 1)
+        fit, image_format = rest.rsplit('.', 1)
+        width, height = (int(value) for value in size.split('x', 1))
+    except ValueError:
+        raise ResizeError("Malformed resize spec")
+
+    if fit not in FITS or image_format not in FORMATS:
+        raise ResizeError("Unsupported fit or format")
+    if not (0 < width <= settings.RESIZE_MAX_DIMENSION and 0 <= height <= settings.RESIZE_MAX_DIMENSION):
+        raise ResizeError("Unsupported dimensions")
+    return width, height, fit, image_format
+
+
+def open_resized_image(source, pk, version, spec):
+    """Open the cached resize, producing it on the first request
+
+    Concurrent misses for the same resize wait on one file lock, so only the
+    first of them decodes and resizes the original. The file is returned open,
+    so eviction can unlink it without breaking a response in flight.
+    """
+    width, height, fit, image_format = parse_spec(spec)
+    key = f"{source}/{pk}/{version}/{spec}"
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    path = settings.RESIZE_CACHE_DIR / digest[:2] / f"{digest}.{image_format}"
+
+    cached = _open(path)
+    if cached:
+        return cached
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{path}.lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Another request may have produced it while we waited
+            cached = _open(path)
+            if cached:
+                return cached
+
+            field_file = _load_source(source, pk)
+            if image_version(field_file) != version:
+                raise ResizeError("Image has changed")
+
+            data = _resize(field_file, width, height, fit, FORMATS[image_format][0])
+
+            # Write then rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+            resized = open(path, 'rb')
+        finally:
+            # The lock file is left in place: unlinking it would let a later
+            # request lock a new file while a waiter holds the old one
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    evict_if_needed()
+    return resized
+
+
+def content_type(path):
+    return FORMATS[os.path.splitext(path)[1][1:]][1]
+
+
+def _open(path):
+    try:
+        cached = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    # The cache is LRU by mtime; atime is unreliable on noatime mounts
+    os.utime(cached.fileno())
+    return cached
+
+
+def _load_source(source, pk):
+    if source not in SOURCES:
+        raise ResizeError("Unknown source")
+
+    model_name, field_name = SOURCES[source]
+    model = apps.get_model(model_name)
+    queryset = model.objects.filter(pk=pk)
+    if source == 'gallery':
+        queryset = queryset.filter(is_public=True)
+
+    instance = queryset.first()
+    field_file = getattr(instance, field_name, None)
+    if not field_file:
+        raise ResizeError("Image not found")
+    return field_file
+
+
+def _resize(field_file, width, height, fit, image_format):
+    try:
+        return _encode_resized(field_file, width, height, fit, image_format)
+    except (OSError, Image.DecompressionBombError) as e:
+        # A missing, corrupt or oversized original is a 404 like any other unservable request
+        logger.error(f"Failed to resize {field_file.name}: {e}")
+        raise ResizeError("Image cannot be decoded")
+
+
+def _encode_resized(field_file, width, height, fit, image_format):
+    with field_file.open('rb') as original, Image.open(original) as img:
+        # Square box: the EXIF orientation may still swap the edges
+        edge = max(width, height)
+        img.draft('RGB', (edge, edge))
+        img = ImageOps.exif_transpose(img)
+
+        if image_format == 'JPEG' and img.mode != 'RGB':
+            img = img.convert('RGB')
+        elif img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA')
+
+        if fit == 'cover' and height:
+            img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+        else:
+            # Bounded by the box, never upscaled; height 0 means "any height"
+            img.thumbnail((width, height or settings.RESIZE_MAX_DIMENSION), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, image_format, quality=82, optimize=True)
+        return buffer.getvalue()
+
+
+def evict_if_needed():
+    """Delete least recently used resizes once the cache exceeds its size bound
+
+    Runs at most once per RESIZE_CACHE_EVICT_INTERVAL across all processes.
+    """
+    cache_dir = settings.RESIZE_CACHE_DIR
+    stamp = cache_dir / '.evicted'
+
+    try:
+        if time.time() - stamp.stat().st_mtime < settings.RESIZE_CACHE_EVICT_INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+
+    with open(cache_dir / '.evict.lock', 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # Another process is already evicting
+
+        stamp.touch()
+        entries = []
+        total = 0
+        for bucket in os.scandir(cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(('.lock', '.tmp')):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= settings.RESIZE_CACHE_MAX_BYTES:
+            return
+
+        # Evict down to 90% so eviction does not run on every new write
+        target = settings.RESIZE_CACHE_MAX_BYTES * 0.9
+        entries.sort()
+        removed = 0
+        for _, size, entry_path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(entry_path)
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        logger.info(f"Evicted {removed} resized images from the cache")
@@ -1,17 +1,68 @@
 from import_export import resources, fields
-from import_export.widgets import ForeignKeyWidget
 
 from gallery.models import Gallery
 from users.models import User
+from utils.dispatch import enqueue_on_commit
+from utils.imports import BulkImportMixin, CachedForeignKeyWidget
 
-class GalleryResource(resources.ModelResource):
+
+class FeaturedImageImportMixin:
+    """Bulk import hooks of posts and events: what FeaturedImageMixin and ShareImageMixin do on save"""
+
+    bulk_update_extra_fields = ('featured_image_placeholder', 'featured_image_aspect_ratio')
+
+    def before_save_instance(self, instance, row, **kwargs):
+        super().before_save_instance(instance, row, **kwargs)
+        instance.fill_derived_fields()
+        instance._featured_image_replaced = instance.reset_featured_image()
+
+    def after_bulk_save(self, instances, created):
+        from gallery.tasks import process_featured_image
+
+        super().after_bulk_save(instances, created)
+        for instance in instances:
+            if instance._featured_image_replaced and instance.featured_image:
+                enqueue_on_commit(process_featured_image, instance._meta.label, instance.pk)
+            instance._stored_featured_image = instance.featured_image.name
+            instance.queue_share_image()
+
+
+class GalleryResource(BulkImportMixin, resources.ModelResource):
     uploaded_by = fields.Field(
         column_name='uploaded_by',
         attribute='uploaded_by',
-        widget=ForeignKeyWidget(User, 'username')
+        widget=CachedForeignKeyWidget(User, 'username')
     )
 
+    # Cleared with a replaced image, as Gallery.save() does
+    bulk_update_extra_fields = ('crc32', 'renditions', 'placeholder', 'processed_at')
+
     class Meta:
         model = Gallery
         fields = ('id', 'title', 'description', 'image', 'uploaded_by', 
                  'alt_text', 'file_size', 'width', 'height', 'is_public', 'created_at')
+        use_bulk = True
+        batch_size = 1000
+
+    def before_save_instance(self, instance, row, **kwargs):
+        super().before_save_instance(instance, row, **kwargs)
+        instance._image_replaced = instance.image_replaced()
+        if instance._image_replaced:
+            instance.crc32 = None
+            instance.renditions = {}
+            instance.placeholder = ''
+            instance.processed_at = None
+
+    def after_bulk_save(self, instances, created):
+        from gallery.tasks import process_uploaded_image, move_gallery_files
+
+        super().after_bulk_save(instances, created)
+        for instance in instances:
+            if instance._image_replaced:
+                enqueue_on_commit(process_uploaded_image, instance.pk)
+            instance._stored_image_name = instance.image.name
+
+        # Rows imported or updated as private may still point at public blobs
+        moving = [instance.pk for instance in instances if instance.needs_moving]
+        if moving:
+            enqueue_on_commit(move_gallery_files, moving)
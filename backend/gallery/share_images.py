@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+import io
+import json
+import hashlib
+from PIL import Image, ImageDraw, ImageFont, ImageOps, features
+
+SHARE_PREFIX = 'share/'
+SIZE = (1200, 630)
+MARGIN = 64
+# Bump when the layout changes, so every share image is drawn again
+LAYOUT_VERSION = 1
+
+BACKGROUND = (17, 24, 39)
+ACCENT = (59, 130, 246)
+TEXT = (255, 255, 255)
+MUTED = (209, 213, 219)
+
+
+def share_image_name(instance):
+    """Storage name of an instance's share image, a hash of everything drawn on it"""
+    title, subtitle = instance.share_image_text()
+    content = json.dumps([
+        LAYOUT_VERSION, settings.SHARE_IMAGE_SITE_NAME, title, subtitle, instance.featured_image.name or ''
+    ])
+    digest = hashlib.sha1(content.encode()).hexdigest()
+    return f"{SHARE_PREFIX}{digest[:2]}/{digest}.jpg"
+
+
+def render_share_image(instance):
+    """Draw the 1200x630 Open Graph image of a post or event; returns the JPEG bytes"""
+    title, subtitle = instance.share_image_text()
+    canvas = _background(instance.featured_image)
+    draw = ImageDraw.Draw(canvas)
+
+    # Header: logo and site name
+    x = MARGIN
+    logo_path = finders.find(settings.SHARE_IMAGE_LOGO)
+    if logo_path:
+        with Image.open(logo_path) as logo:
+            logo = logo.convert('RGBA')
+            logo.thumbnail((72, 72), Image.Resampling.LANCZOS)
+            canvas.paste(logo, (x, MARGIN), logo)
+            x += logo.width + 20
+    _text(draw, (x, MARGIN + 36), settings.SHARE_IMAGE_SITE_NAME, load_font(32), MUTED, anchor='lm')
+
+    # Footer, from the bottom up: subtitle, then up to three lines of title
+    bottom = SIZE[1] - MARGIN
+    draw.rectangle((MARGIN, bottom - 6, MARGIN + 120, bottom), fill=ACCENT)
+    bottom -= 30
+    if subtitle:
+        _text(draw, (MARGIN, bottom), subtitle, load_font(34), MUTED, anchor='ld')
+        bottom -= 60
+
+    title_font = load_font(64)
+    for line in reversed(wrap_text(draw, title, title_font, SIZE[0] - 2 * MARGIN, max_lines=3)):
+        _text(draw, (MARGIN, bottom), line, title_font, TEXT, anchor='ld')
+        bottom -= 80
+
+    buffer = io.BytesIO()
+    canvas.save(buffer, 'JPEG', quality=88, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _background(featured_image):
+    """The cover image darkened towards the bottom, where the text goes, or a plain background"""
+    canvas = Image.new('RGB', SIZE, BACKGROUND)
+    if not featured_image:
+        return canvas
+
+    try:
+        with featured_image.open('rb') as original, Image.open(original) as img:
+            img.draft('RGB', SIZE)
+            cover = ImageOps.fit(ImageOps.exif_transpose(img).convert('RGB'), SIZE, Image.Resampling.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        return canvas
+
+    shade = Image.linear_gradient('L').resize(SIZE).point(lambda value: 110 + value * 130 // 255)
+    return Image.composite(canvas, cover, shade)
+
+
+def load_font(size):
+    """The share image font at `size`, or Pillow's default when it is not installed"""
+    try:
+        return ImageFont.truetype(settings.SHARE_IMAGE_FONT, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def _is_rtl(text):
+    return any('\u0590' <= char <= '\u08ff' for char in text)
+
+
+def _text(draw, position, text, font, fill, anchor):
+    """Draw a line; right-to-left text (Persian) is shaped and right-aligned when raqm is available"""
+    if _is_rtl(text) and features.check('raqm'):
+        x, y = position
+        draw.text((SIZE[0] - x, y), text, font=font, fill=fill, anchor=anchor.replace('l', 'r'), direction='rtl')
+    else:
+        draw.text(position, text, font=font, fill=fill, anchor=anchor)
+
+
+def wrap_text(draw, text, font, width, max_lines):
+    """Split text into lines that fit `width`, ending with an ellipsis if it is cut short"""
+    direction = 'rtl' if _is_rtl(text) and features.check('raqm') else None
+    fits = lambda line: draw.textlength(line, font=font, direction=direction) <= width
+
+    lines, line = [], ''
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if fits(candidate) or not line:
+            line = candidate
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        while lines[-1] and not fits(f"{lines[-1]}…"):
+            lines[-1] = lines[-1].rsplit(' ', 1)[0] if ' ' in lines[-1] else lines[-1][:-1]
+        lines[-1] = f"{lines[-1]}…"
+    return lines
@@ -0,0 +1,81 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+
+from gallery.blobs import BLOB_FIELDS, commit_blob_fields, retain_blobs, release_blobs
+from gallery.storage import is_private_name
+from gallery.models import FeaturedImageMixin, Gallery, stored_file_name
+
+
+def remember_blob_names(sender, instance, **kwargs):
+    # Raw values straight after loading; deferred fields are left out and so
+    # never counted
+    instance._blob_names = {
+        field: _name(instance.__dict__[field])
+        for field in BLOB_FIELDS[sender._meta.label]
+        if field in instance.__dict__
+    }
+
+
+def commit_blobs_on_save(sender, instance, **kwargs):
+    commit_blob_fields(instance)
+
+
+def count_blob_references(sender, instance, created=False, update_fields=None, **kwargs):
+    stored = instance._blob_names
+    for field in BLOB_FIELDS[sender._meta.label]:
+        if update_fields is not None and field not in update_fields:
+            continue
+        if field not in stored and not created:
+            continue
+
+        name = getattr(instance, field).name or ''
+        previous = stored.get(field, '')
+        if name != previous:
+            retain_blobs([name])
+            release_blobs([previous])
+        stored[field] = name
+
+
+def release_blobs_on_delete(sender, instance, **kwargs):
+    release_blobs(instance._blob_names.values())
+
+
+def delete_private_files(sender, instance, **kwargs):
+    # Private files belong to one image only, unlike blobs
+    storage = instance.image.storage
+    names = [instance.image.name] + [rendition['path'] for rendition in instance.renditions.values()]
+    names = [name for name in names if is_private_name(name)]
+
+    def _delete():
+        for name in names:
+            storage.delete(name)
+
+    if names:
+        transaction.on_commit(_delete)
+
+
+def remember_stored_images(sender, instance, **kwargs):
+    # Without touching the fields, so rows loaded with .only() or .defer() cost no query
+    if isinstance(instance, FeaturedImageMixin):
+        instance._stored_featured_image = stored_file_name(instance, 'featured_image')
+    if isinstance(instance, Gallery):
+        instance._stored_image_name = stored_file_name(instance, 'image')
+
+
+def _name(value):
+    return getattr(value, 'name', value) or ''
+
+
+for label in BLOB_FIELDS:
+    model = apps.get_model(label)
+    post_init.connect(remember_blob_names, sender=model, dispatch_uid=f'blobs_post_init_{label}')
+    pre_save.connect(commit_blobs_on_save, sender=model, dispatch_uid=f'blobs_pre_save_{label}')
+    post_save.connect(count_blob_references, sender=model, dispatch_uid=f'blobs_post_save_{label}')
+    post_delete.connect(release_blobs_on_delete, sender=model, dispatch_uid=f'blobs_post_delete_{label}')
+
+post_delete.connect(delete_private_files, sender=Gallery, dispatch_uid='gallery_private_files_post_delete')
+
+for model in apps.get_models():
+    if issubclass(model, (FeaturedImageMixin, Gallery)):
+        post_init.connect(remember_stored_images, sender=model, dispatch_uid=f'stored_images_post_init_{model._meta.label}')
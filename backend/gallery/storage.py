@@ -0,0 +1,66 @@
+from django.core.files.storage import Storage, default_storage, storages
+
+import uuid
+import posixpath
+
+# Names under this prefix are kept in the protected storage
+PRIVATE_PREFIX = 'private/'
+
+
+def protected_storage():
+    """Storage of files that are only ever served through signed URLs"""
+    return storages['protected']
+
+
+def is_private_name(name):
+    return bool(name) and name.startswith(PRIVATE_PREFIX)
+
+
+def private_name(filename):
+    """Fresh name under private/ for a private gallery original; never a content hash"""
+    return f"{PRIVATE_PREFIX}gallery/{uuid.uuid4().hex}{posixpath.splitext(filename)[1].lower()}"
+
+
+class MediaStorage(Storage):
+    """The default storage, except for names under private/, which are kept in the protected storage
+
+    Lets one image field hold public and private files: a gallery image's
+    file is moved between the two when the image is made public or private.
+    """
+
+    def route(self, name):
+        return protected_storage() if is_private_name(name) else default_storage
+
+    def _open(self, name, mode='rb'):
+        return self.route(name).open(name, mode)
+
+    def save(self, name, content, max_length=None):
+        return self.route(name).save(name, content, max_length=max_length)
+
+    def generate_filename(self, filename):
+        return default_storage.generate_filename(filename)
+
+    def delete(self, name):
+        return self.route(name).delete(name)
+
+    def exists(self, name):
+        return self.route(name).exists(name)
+
+    def listdir(self, path):
+        return self.route(path).listdir(path)
+
+    def size(self, name):
+        return self.route(name).size(name)
+
+    def url(self, name):
+        return self.route(name).url(name)
+
+    def path(self, name):
+        return self.route(name).path(name)
+
+    def get_modified_time(self, name):
+        return self.route(name).get_modified_time(name)
+
+
+def media_storage():
+    return MediaStorage()
@@ -1,23 +1,323 @@
+from django.conf import settings
+from django.utils import timezone
+
 from celery import shared_task
-from PIL import Image
+from celery.exceptions import SoftTimeLimitExceeded
+from PIL import UnidentifiedImageError
 import logging
+from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def process_uploaded_image(gallery_id):
-    """Process uploaded image: compress, resize, extract metadata"""
+@shared_task(bind=True, max_retries=3)
+def process_uploaded_image(self, gallery_id):
+    """Process uploaded image: extract metadata and write the renditions in one decode"""
     try:
         from .models import Gallery
-        gallery_item = Gallery.objects.get(id=gallery_id)
+        from .processing import generate_renditions, file_crc32
+        from .blobs import blob_sha, fill_perceptual_hash
         
+        gallery_item = Gallery.all_objects.get(id=gallery_id)
+        
+        twin = gallery_item.find_processed_twin() if gallery_item.image else None
+        if twin:
+            Gallery.all_objects.filter(pk=gallery_item.pk, image=gallery_item.image.name).update(**twin)
+            logger.info(f"Reused the renditions of a twin for image: {gallery_item.title}")
+            return f"Reused renditions for image: {gallery_item.title}"
+
         if gallery_item.image:
-            # This will trigger the compression and metadata extraction
-            gallery_item.compress_image()
+            (width, height), renditions, placeholder = generate_renditions(
+                gallery_item.image, blob_sha(gallery_item.image.name) or gallery_item.pk
+            )
+            
+            # Update fields without triggering save again
+            Gallery.all_objects.filter(pk=gallery_item.pk, image=gallery_item.image.name).update(
+                crc32=file_crc32(gallery_item.image),
+                width=width,
+                height=height,
+                renditions=renditions,
+                placeholder=placeholder,
+                processed_at=timezone.now()
+            )
+            # Direct uploads reach blob storage without being decoded
+            fill_perceptual_hash(gallery_item.image.name)
             
             logger.info(f"Processed image: {gallery_item.title}")
             return f"Processed image: {gallery_item.title}"
-            
+        
+    except Gallery.DoesNotExist:
+        logger.error(f"Gallery image {gallery_id} not found")
+        return f"Gallery image {gallery_id} not found"
+    except (UnidentifiedImageError, OSError) as exc:
+        # Not retried: the stored file itself is unreadable
+        logger.error(f"Failed to decode image {gallery_id}: {exc}")
+        return f"Failed to decode image {gallery_id}"
     except Exception as exc:
         logger.error(f"Failed to process image: {exc}")
-        raise exc
+        raise self.retry(exc=exc, countdown=60)
+
+@shared_task(bind=True, max_retries=3)
+def process_featured_image(self, model_label, object_id):
+    """Store the placeholder and aspect ratio of an event or post featured image"""
+    from django.apps import apps
+    from .placeholders import compute_placeholder
+
+    model = apps.get_model(model_label)
+    instance = model.all_objects.filter(pk=object_id).first()
+    if instance is None or not instance.featured_image:
+        return f"{model_label} {object_id} has no featured image"
+
+    try:
+        ratio, placeholder = compute_placeholder(instance.featured_image)
+    except (UnidentifiedImageError, OSError) as exc:
+        logger.error(f"Failed to decode featured image of {model_label} {object_id}: {exc}")
+        return f"Failed to decode featured image of {model_label} {object_id}"
+    except Exception as exc:
+        logger.error(f"Failed to process featured image: {exc}")
+        raise self.retry(exc=exc, countdown=60)
+
+    # Only if the image is still the one we decoded
+    model.all_objects.filter(pk=object_id, featured_image=instance.featured_image.name).update(
+        featured_image_placeholder=placeholder,
+        featured_image_aspect_ratio=ratio
+    )
+    return f"Processed featured image of {model_label} {object_id}"
+
+@shared_task(bind=True, max_retries=3)
+def render_share_image(self, model_label, object_id):
+    """Draw the Open Graph image of a post or event, unless an identical one is already stored"""
+    from django.apps import apps
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from .share_images import share_image_name, render_share_image as render
+
+    model = apps.get_model(model_label)
+    instance = model.all_objects.filter(pk=object_id).first()
+    if instance is None:
+        return f"{model_label} {object_id} not found"
+
+    name = share_image_name(instance)
+    if not default_storage.exists(name):
+        try:
+            default_storage.save(name, ContentFile(render(instance)))
+        except Exception as exc:
+            logger.error(f"Failed to render share image of {model_label} {object_id}: {exc}")
+            raise self.retry(exc=exc, countdown=60)
+
+    model.all_objects.filter(pk=object_id).update(share_image=name)
+    return f"Rendered share image of {model_label} {object_id}"
+
+@shared_task
+def cleanup_share_images():
+    """Delete share images that no post or event shows any more"""
+    from django.core.files.storage import default_storage
+    from blog.models import Post
+    from events.models import Event
+    from .share_images import SHARE_PREFIX
+
+    if not default_storage.exists(SHARE_PREFIX):
+        return "Deleted 0 share images"
+
+    in_use = set(Post.all_objects.values_list('share_image', flat=True))
+    in_use.update(Event.all_objects.values_list('share_image', flat=True))
+    # Files younger than a day may belong to a render whose row is not updated yet
+    cutoff = timezone.now() - timedelta(days=1)
+    count = 0
+    for bucket in default_storage.listdir(SHARE_PREFIX)[0]:
+        for filename in default_storage.listdir(f"{SHARE_PREFIX}{bucket}")[1]:
+            name = f"{SHARE_PREFIX}{bucket}/{filename}"
+            if name not in in_use and default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                count += 1
+
+    logger.info(f"Deleted {count} share images")
+    return f"Deleted {count} share images"
+
+@shared_task
+def cleanup_stale_uploads():
+    """Delete chunked and direct uploads that have been idle for longer than UPLOAD_EXPIRY"""
+    from .models import ChunkedUpload, DirectUpload
+    from .uploads import discard_upload
+
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_EXPIRY)
+    count = 0
+    for model in (ChunkedUpload, DirectUpload):
+        for upload in model.all_objects.filter(updated_at__lt=cutoff):
+            discard_upload(upload)
+            count += 1
+
+    logger.info(f"Deleted {count} stale uploads")
+    return f"Deleted {count} stale uploads"
+
+@shared_task(soft_time_limit=25 * 60, time_limit=30 * 60)
+def import_gallery_archive(import_id):
+    """Extract an uploaded archive and fan its images out to the media queue"""
+    from celery import chord
+    from .models import GalleryImport
+    from .imports import store_archive_images
+
+    gallery_import = GalleryImport.objects.get(id=import_id)
+    gallery_import.status = GalleryImport.StatusChoices.EXTRACTING
+    gallery_import.save(update_fields=['status', 'updated_at'])
+
+    # Whatever goes wrong, the time limit included, the import is failed
+    # rather than left extracting; stored images are swept with the orphans
+    try:
+        with gallery_import.archive.open('rb') as archive_file:
+            stored, skipped = store_archive_images(archive_file)
+
+        # The originals are in media storage now; the archive is not needed
+        gallery_import.archive.delete(save=False)
+        gallery_import.status = GalleryImport.StatusChoices.PROCESSING
+        gallery_import.total_files = len(stored)
+        gallery_import.failed_files = skipped
+        gallery_import.save(update_fields=['status', 'total_files', 'failed_files', 'archive', 'updated_at'])
+
+        batch_size = settings.GALLERY_IMPORT_BATCH_SIZE
+        batches = [stored[i:i + batch_size] for i in range(0, len(stored), batch_size)]
+        if not batches:
+            finish_gallery_import.delay([], import_id)
+        else:
+            # A batch or the finish failing for good fails the import too
+            finish = finish_gallery_import.s(import_id).on_error(fail_gallery_import.s(import_id))
+            chord(process_import_batch.s(import_id, batch) for batch in batches)(finish)
+    except Exception as e:
+        _fail_gallery_import(import_id, e)
+        return f"Gallery import {import_id} failed"
+
+    logger.info(f"Gallery import {import_id}: {len(stored)} images in {len(batches)} batches")
+    return f"Gallery import {import_id}: {len(stored)} images in {len(batches)} batches"
+
+@shared_task(soft_time_limit=10 * 60, time_limit=12 * 60)
+def process_import_batch(import_id, batch):
+    """Decode and resize a batch of imported images; runs on the media queue"""
+    from django.db.models import F
+    from .models import GalleryImport
+    from .imports import process_image, find_processed_images
+
+    processed = find_processed_images([name for name, _ in batch])
+    results, failed = [], []
+    for index, (name, title) in enumerate(batch):
+        if name in processed:
+            # Already in the gallery: reuse its renditions
+            results.append({**processed[name], 'title': title})
+            continue
+        try:
+            results.append(process_image(name, title))
+        except SoftTimeLimitExceeded:
+            # Return what is done so the chord still finishes the import
+            logger.error(f"Gallery import {import_id}: time limit reached, {len(batch) - index} images left")
+            failed.extend(image for image, _ in batch[index:])
+            break
+        except Exception as exc:
+            logger.error(f"Failed to process imported image {name}: {exc}")
+            failed.append(name)
+
+    GalleryImport.objects.filter(id=import_id).update(
+        processed_files=F('processed_files') + len(batch),
+        failed_files=F('failed_files') + len(failed)
+    )
+    return results
+
+@shared_task(soft_time_limit=5 * 60, time_limit=6 * 60)
+def finish_gallery_import(batch_results, import_id):
+    """Create the gallery rows of a finished import in one go"""
+    from django.db import transaction
+    from .models import GalleryImport
+    from .imports import create_gallery_images
+
+    try:
+        gallery_import = GalleryImport.objects.select_related('event').get(id=import_id)
+        results = [result for batch in batch_results for result in batch]
+        with transaction.atomic():
+            images = create_gallery_images(gallery_import, results)
+            GalleryImport.objects.filter(id=import_id).update(
+                status=GalleryImport.StatusChoices.COMPLETED,
+                created_images=len(images),
+                finished_at=timezone.now()
+            )
+    except Exception as e:
+        _fail_gallery_import(import_id, e)
+        return f"Gallery import {import_id} failed"
+
+    logger.info(f"Gallery import {import_id} completed: {len(images)} images added to {gallery_import.event}")
+    return f"Gallery import {import_id} completed: {len(images)} images"
+
+@shared_task
+def fail_gallery_import(request, exc, traceback, import_id):
+    """Errback of the import chord: a batch task died, so finish_gallery_import never runs"""
+    _fail_gallery_import(import_id, exc)
+
+def _fail_gallery_import(import_id, error):
+    from .models import GalleryImport
+
+    gallery_import = GalleryImport.objects.filter(id=import_id).first()
+    if gallery_import is None:
+        return
+    if gallery_import.archive:
+        try:
+            gallery_import.archive.delete(save=False)
+        except OSError as e:
+            logger.error(f"Failed to delete the archive of gallery import {import_id}: {e}")
+    # Not save(): the worker's copy of the row may be stale
+    GalleryImport.objects.filter(id=import_id).update(
+        status=GalleryImport.StatusChoices.FAILED,
+        error=str(error) or error.__class__.__name__,
+        archive=gallery_import.archive.name or '',
+        finished_at=timezone.now()
+    )
+    logger.error(f"Gallery import {import_id} failed: {error}")
+
+@shared_task(bind=True, max_retries=3, soft_time_limit=10 * 60, time_limit=12 * 60)
+def move_gallery_files(self, gallery_ids):
+    """Move the files of images made public or private to the matching storage; runs on the media queue"""
+    from .models import Gallery
+    from .visibility import move_gallery_files as move
+
+    moved = 0
+    for gallery_item in Gallery.all_objects.filter(id__in=gallery_ids):
+        try:
+            if move(gallery_item):
+                moved += 1
+            elif gallery_item.needs_moving:
+                # Changed while copying: the latest save queued its own move
+                logger.info(f"Gallery image {gallery_item.pk} changed while its files were moved")
+        except Exception as exc:
+            logger.error(f"Failed to move the files of image {gallery_item.pk}: {exc}")
+            raise self.retry(exc=exc, countdown=60)
+
+        if gallery_item.processed_at is None:
+            # Renditions are written next to wherever the original is now
+            process_uploaded_image.delay(gallery_item.pk)
+
+    logger.info(f"Moved the files of {moved} gallery images")
+    return f"Moved the files of {moved} gallery images"
+
+@shared_task
+def cleanup_orphan_blobs():
+    """Delete blobs that no image field has referenced for MEDIA_BLOB_GRACE, with their renditions"""
+    from django.db import transaction
+    from django.core.files.storage import default_storage
+    from .models import MediaBlob
+
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_BLOB_GRACE)
+    count = 0
+    for blob_id in MediaBlob.all_objects.filter(ref_count=0, updated_at__lt=cutoff).values_list('id', flat=True):
+        with transaction.atomic():
+            # Re-checked under a lock: an upload may have just reused it
+            blob = MediaBlob.all_objects.select_for_update().filter(
+                id=blob_id, ref_count=0, updated_at__lt=cutoff
+            ).first()
+            if blob is None:
+                continue
+
+            default_storage.delete(blob.name)
+            renditions = f"gallery/renditions/{blob.sha256}"
+            if default_storage.exists(renditions):
+                for filename in default_storage.listdir(renditions)[1]:
+                    default_storage.delete(f"{renditions}/{filename}")
+            blob.hard_delete()
+            count += 1
+
+    logger.info(f"Deleted {count} unreferenced media files")
+    return f"Deleted {count} unreferenced media files"
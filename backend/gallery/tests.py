@@ -0,0 +1,272 @@
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+import io
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+import requests
+from moto import mock_aws
+from PIL import Image
+
+from events.models import Event
+from gallery.models import ChunkedUpload, Gallery, GalleryImport, MediaBlob
+from gallery.storage import protected_storage
+from gallery.tasks import fail_gallery_import, finish_gallery_import
+from gallery.visibility import move_gallery_files
+from gallery.uploads import UploadError, start_direct_upload, complete_direct_upload
+from users.models import User
+
+BUCKET = 'guilance-test'
+
+S3_STORAGES = {
+    'default': {'BACKEND': 'storages.backends.s3.S3Storage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(
+    STORAGES=S3_STORAGES,
+    AWS_STORAGE_BUCKET_NAME=BUCKET,
+    AWS_S3_ENDPOINT_URL=None,
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_ACCESS_KEY_ID='testing',
+    AWS_SECRET_ACCESS_KEY='testing',
+    DIRECT_UPLOAD_ENDPOINT_URL=None,
+)
+class DirectUploadTests(TestCase):
+    """Presign -> PUT -> complete against moto's S3"""
+
+    def setUp(self):
+        self.mock = mock_aws()
+        self.mock.start()
+        self.addCleanup(self.mock.stop)
+        default_storage.connection.meta.client.create_bucket(Bucket=BUCKET)
+        self.user = User.objects.create_user(
+            username='uploader', email='uploader@example.com', password='-', student_id='900100',
+            is_email_verified=True
+        )
+
+    def start(self, content, sha256=None):
+        return start_direct_upload(
+            self.user, ChunkedUpload.PurposeChoices.GALLERY, 'photo.png', 'image/png',
+            len(content), sha256 or hashlib.sha256(content).hexdigest()
+        )
+
+    def put(self, put_request, content):
+        return requests.put(put_request['url'], data=content, headers=put_request['headers'])
+
+    def test_presigned_put_with_matching_checksum_is_adopted_as_blob(self):
+        content = _png('red')
+        upload, put_request = self.start(content)
+
+        self.assertEqual(put_request['method'], 'PUT')
+        self.assertIn('x-amz-checksum-sha256', put_request['headers'])
+        self.assertEqual(self.put(put_request, content).status_code, 200)
+
+        name = complete_direct_upload(upload)
+
+        blob = MediaBlob.all_objects.get(sha256=upload.sha256)
+        self.assertEqual(name, blob.name)
+        self.assertEqual(blob.size, len(content))
+        self.assertTrue(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(upload.key))
+
+    def test_completion_with_wrong_size_is_rejected(self):
+        content = _png('green')
+        upload, put_request = self.start(content)
+        default_storage.connection.meta.client.put_object(
+            Bucket=BUCKET, Key=upload.key, Body=content[:-10], ContentType='image/png'
+        )
+
+        with self.assertRaisesMessage(UploadError, "Checksum mismatch"):
+            complete_direct_upload(upload)
+        self.assertFalse(default_storage.exists(upload.key))
+        self.assertFalse(MediaBlob.all_objects.exists())
+
+    def test_completion_with_wrong_checksum_is_rejected(self):
+        content, other = _png('blue'), _png('yellow')
+        upload, put_request = self.start(content)
+        # Same size, other bytes, sent without the presigned checksum header
+        other = other[:len(content)].ljust(len(content), b'\0')
+        default_storage.connection.meta.client.put_object(
+            Bucket=BUCKET, Key=upload.key, Body=other, ContentType='image/png'
+        )
+
+        with self.assertRaisesMessage(UploadError, "Checksum mismatch"):
+            complete_direct_upload(upload)
+        self.assertFalse(default_storage.exists(upload.key))
+
+    def test_duplicate_upload_adopts_existing_blob(self):
+        content = _png('purple')
+        first, put_request = self.start(content)
+        self.put(put_request, content)
+        name = complete_direct_upload(first)
+
+        second, put_request = self.start(content)
+        self.assertEqual(self.put(put_request, content).status_code, 200)
+
+        self.assertEqual(complete_direct_upload(second), name)
+        self.assertEqual(MediaBlob.all_objects.filter(sha256=first.sha256).count(), 1)
+        self.assertFalse(default_storage.exists(second.key))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_start_rejects_a_bad_checksum(self):
+        with self.assertRaisesMessage(UploadError, "sha256 must be a hex digest"):
+            self.start(_png('white'), sha256='not-a-digest')
+
+
+MEDIA_DIR = tempfile.mkdtemp()
+PROTECTED_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    STORAGES={
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': MEDIA_DIR},
+        },
+        'protected': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': PROTECTED_DIR, 'base_url': None},
+        },
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+    PROTECTED_MEDIA_SERVER='',
+)
+class PrivateImageTests(TestCase):
+    """Private originals live in the protected storage and move when the visibility changes"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_DIR, ignore_errors=True)
+        shutil.rmtree(PROTECTED_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='owner', email='owner@example.com', password='-', student_id='900200',
+            is_email_verified=True
+        )
+
+    def upload(self, content, is_public):
+        image = Gallery(
+            title='Photo', uploaded_by=self.user, is_public=is_public,
+            image=SimpleUploadedFile('photo.png', content, content_type='image/png')
+        )
+        image.save()
+        return image
+
+    def test_private_upload_is_served_only_through_a_signed_url(self):
+        content = _png('red')
+        image = self.upload(content, is_public=False)
+
+        self.assertTrue(image.image.name.startswith('private/'))
+        self.assertTrue(protected_storage().exists(image.image.name))
+        self.assertFalse(default_storage.exists(image.image.name))
+        self.assertFalse(MediaBlob.all_objects.exists())
+
+        url = image.image_url
+        self.assertIn('/protected/', url)
+        self.assertNotIn(image.image.name, url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+        self.assertEqual(self.client.get(url.replace('/original', '/large')).status_code, 403)
+
+    def test_files_move_with_the_visibility(self):
+        content = _png('blue')
+        image = self.upload(content, is_public=False)
+        private = image.image.name
+
+        image.is_public = True
+        image.save(update_fields=['is_public', 'updated_at'])
+        self.assertTrue(move_gallery_files(Gallery.objects.get(pk=image.pk)))
+
+        image.refresh_from_db()
+        blob = MediaBlob.all_objects.get(sha256=hashlib.sha256(content).hexdigest())
+        self.assertEqual(image.image.name, blob.name)
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+        self.assertFalse(protected_storage().exists(private))
+        self.assertNotIn('/protected/', image.image_url)
+
+        image.is_public = False
+        image.save(update_fields=['is_public', 'updated_at'])
+        self.assertTrue(move_gallery_files(Gallery.objects.get(pk=image.pk)))
+
+        image.refresh_from_db()
+        blob.refresh_from_db()
+        self.assertTrue(image.image.name.startswith('private/'))
+        self.assertTrue(protected_storage().exists(image.image.name))
+        self.assertEqual(blob.ref_count, 0)
+        self.assertIn('/protected/', image.image_url)
+
+
+class GalleryImportTests(TestCase):
+    """An import that breaks midway is failed, not left processing"""
+
+    def setUp(self):
+        start = timezone.now() + timedelta(days=1)
+        event = Event.objects.create(title="Album", description="-", start_time=start, end_time=start + timedelta(hours=2))
+        user = User.objects.create_user(
+            username='importer', email='importer@example.com', password='-', student_id='900400',
+            is_staff=True, is_email_verified=True
+        )
+        self.gallery_import = GalleryImport.objects.create(
+            event=event, uploaded_by=user, status=GalleryImport.StatusChoices.PROCESSING
+        )
+
+    def assertFailed(self):
+        self.gallery_import.refresh_from_db()
+        self.assertEqual(self.gallery_import.status, GalleryImport.StatusChoices.FAILED)
+        self.assertTrue(self.gallery_import.error)
+        self.assertIsNotNone(self.gallery_import.finished_at)
+
+    def test_failing_finish_creates_no_images(self):
+        result = finish_gallery_import([[{'image': 'blobs/aa/missing.jpg', 'no_such_field': 1}]], self.gallery_import.id)
+
+        self.assertEqual(result, f"Gallery import {self.gallery_import.id} failed")
+        self.assertFailed()
+        self.assertFalse(Gallery.all_objects.exists())
+
+    def test_chord_errback_fails_the_import(self):
+        fail_gallery_import(None, RuntimeError("worker lost"), None, self.gallery_import.id)
+
+        self.assertFailed()
+        self.assertEqual(self.gallery_import.error, "worker lost")
+
+
+class StoredImageTests(TestCase):
+    """What a row's image was when loaded is remembered without loading deferred fields"""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='-', student_id='900500',
+            is_email_verified=True
+        )
+        Gallery.objects.bulk_create([
+            Gallery(title=f'Photo {index}', image=f'blobs/0{index}/photo.png', uploaded_by=user)
+            for index in range(3)
+        ])
+
+    def test_deferred_image_costs_no_query(self):
+        with self.assertNumQueries(1):
+            images = list(Gallery.objects.only('id', 'title'))
+        self.assertFalse(images[0].image_replaced())
+
+    def test_replacing_a_deferred_image_is_noticed(self):
+        image = Gallery.objects.only('id', 'title').first()
+        image.image = 'blobs/ff/other.png'
+
+        self.assertTrue(image.image_replaced())
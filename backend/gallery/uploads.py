@@ -0,0 +1,278 @@
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+import io
+import os
+import base64
+import hashlib
+import boto3
+import zipfile
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from PIL import Image, UnidentifiedImageError
+
+from gallery.models import ChunkedUpload, DirectUpload
+from gallery.blobs import adopt_blob
+
+MAX_SIZES = {
+    ChunkedUpload.PurposeChoices.GALLERY: 10 * 1024 * 1024,
+    ChunkedUpload.PurposeChoices.PROFILE_PICTURE: 5 * 1024 * 1024,
+    ChunkedUpload.PurposeChoices.GALLERY_IMPORT: settings.GALLERY_IMPORT_MAX_SIZE,
+}
+
+ARCHIVE_CONTENT_TYPES = ('application/zip', 'application/x-zip-compressed', 'application/octet-stream')
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Direct uploads are for single images; archives are extracted from local disk
+DIRECT_PURPOSES = (ChunkedUpload.PurposeChoices.GALLERY, ChunkedUpload.PurposeChoices.PROFILE_PICTURE)
+HEADER_PROBE_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised for chunked or direct upload requests that cannot be accepted"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AssembledFile(File):
+    """A finished upload on disk
+
+    Exposes temporary_file_path() like Django's TemporaryUploadedFile, so
+    FileSystemStorage moves it into MEDIA_ROOT instead of copying it, and
+    carries its verified checksum so blob storage need not hash it again.
+    """
+
+    def __init__(self, file, name, sha256):
+        super().__init__(file, name)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def validate_upload(purpose, content_type, total_size, sha256):
+    """Check a declared upload against its purpose; returns the normalised checksum"""
+    if purpose not in MAX_SIZES:
+        raise UploadError("Unknown upload purpose")
+    if purpose == ChunkedUpload.PurposeChoices.GALLERY_IMPORT:
+        if content_type not in ARCHIVE_CONTENT_TYPES:
+            raise UploadError("File must be a ZIP archive")
+    elif not content_type.startswith('image/'):
+        raise UploadError("File must be an image")
+    if not 0 < total_size <= MAX_SIZES[purpose]:
+        raise UploadError(f"File size must be less than {MAX_SIZES[purpose] // (1024 * 1024)}MB")
+
+    sha256 = sha256.lower()
+    if len(sha256) != 64 or any(char not in '0123456789abcdef' for char in sha256):
+        raise UploadError("sha256 must be a hex digest")
+    return sha256
+
+
+def start_upload(user, purpose, filename, content_type, total_size, sha256):
+    """Register a new upload and create its empty file on disk"""
+    upload = ChunkedUpload.objects.create(
+        user=user,
+        purpose=purpose,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type,
+        total_size=total_size,
+        sha256=validate_upload(purpose, content_type, total_size, sha256)
+    )
+
+    settings.UPLOAD_CHUNK_DIR.mkdir(parents=True, exist_ok=True)
+    upload.temp_path.touch()
+    return upload
+
+
+def write_chunk(upload, offset, chunk):
+    """Write a chunk at `offset` and return the number of bytes received so far
+
+    The caller must hold a row lock on the upload. Chunks are accepted in
+    order only; a chunk at any other offset is rejected, and the client
+    resumes from the upload's received_size.
+    """
+    if offset != upload.received_size:
+        raise UploadError(f"Expected the chunk at offset {upload.received_size}", status=409)
+    if chunk.size > settings.UPLOAD_CHUNK_SIZE:
+        raise UploadError(f"Chunks must be at most {settings.UPLOAD_CHUNK_SIZE} bytes")
+    if offset + chunk.size > upload.total_size:
+        raise UploadError("Chunk exceeds the declared file size")
+
+    try:
+        with open(upload.temp_path, 'r+b') as part:
+            part.seek(offset)
+            for piece in chunk.chunks():
+                part.write(piece)
+            part.truncate()
+    except FileNotFoundError:
+        raise UploadError("Upload has expired", status=404)
+
+    upload.received_size = offset + chunk.size
+    upload.save(update_fields=['received_size', 'updated_at'])
+    return upload.received_size
+
+
+def assemble_upload(upload):
+    """Check the finished file against its declared size and checksum
+
+    Returns the file open for reading, ready to be saved to an ImageField.
+    """
+    if not upload.is_complete:
+        raise UploadError(f"Upload is incomplete: {upload.received_size} of {upload.total_size} bytes received")
+
+    try:
+        part = open(upload.temp_path, 'rb')
+    except FileNotFoundError:
+        raise UploadError("Upload has expired", status=404)
+
+    digest = hashlib.sha256()
+    for block in iter(lambda: part.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    if digest.hexdigest() != upload.sha256:
+        part.close()
+        raise UploadError("Checksum mismatch; restart the upload")
+
+    part.seek(0)
+    if upload.purpose == ChunkedUpload.PurposeChoices.GALLERY_IMPORT:
+        if not zipfile.is_zipfile(part):
+            part.close()
+            raise UploadError("File must be a ZIP archive")
+    else:
+        # Only the header is parsed here; decoding is left to the image pipeline
+        try:
+            with Image.open(part):
+                pass
+        except (UnidentifiedImageError, OSError):
+            part.close()
+            raise UploadError("File must be an image")
+
+    part.seek(0)
+    return AssembledFile(part, upload.filename, upload.sha256)
+
+
+def discard_upload(upload):
+    """Delete an upload and whatever is left of its file"""
+    if isinstance(upload, DirectUpload):
+        default_storage.delete(upload.key)
+    else:
+        try:
+            os.unlink(upload.temp_path)
+        except FileNotFoundError:
+            pass  # Already moved into storage
+    upload.hard_delete()
+
+
+# --- Direct uploads ---
+
+def direct_uploads_enabled():
+    """Whether media is kept in object storage that clients can upload to themselves"""
+    return hasattr(default_storage, 'bucket_name')
+
+
+def start_direct_upload(user, purpose, filename, content_type, total_size, sha256):
+    """Register an upload to object storage and presign the PUT request that sends it
+
+    The request must carry the declared size and SHA-256, so storage itself
+    rejects a body that does not match. Returns the upload and the request
+    the client is to make.
+    """
+    if not direct_uploads_enabled():
+        raise UploadError("Direct uploads need object storage; use a chunked upload instead")
+    if purpose not in DIRECT_PURPOSES:
+        raise UploadError("Only images can be uploaded directly")
+
+    upload = DirectUpload.objects.create(
+        user=user,
+        purpose=purpose,
+        filename=os.path.basename(filename)[:255],
+        content_type=content_type,
+        total_size=total_size,
+        sha256=validate_upload(purpose, content_type, total_size, sha256)
+    )
+
+    checksum = _base64_sha256(upload.sha256)
+    url = _presigning_client().generate_presigned_url(
+        'put_object',
+        Params={
+            'Bucket': default_storage.bucket_name,
+            'Key': _object_key(upload.key),
+            'ContentType': content_type,
+            'ContentLength': total_size,
+            'ChecksumSHA256': checksum,
+        },
+        ExpiresIn=settings.DIRECT_UPLOAD_EXPIRY
+    )
+    return upload, {
+        'url': url,
+        'method': 'PUT',
+        'headers': {'Content-Type': content_type, 'x-amz-checksum-sha256': checksum},
+        'expires_in': settings.DIRECT_UPLOAD_EXPIRY,
+    }
+
+
+def complete_direct_upload(upload):
+    """Check an object the client has uploaded and move it into blob storage
+
+    Only the object's metadata and image header are fetched, unless storage
+    kept no SHA-256 of the upload; the copy into blob storage happens inside
+    the bucket. Returns the blob's name, ready to
+    be assigned to an ImageField.
+    """
+    client, key = default_storage.connection.meta.client, _object_key(upload.key)
+    try:
+        head = client.head_object(Bucket=default_storage.bucket_name, Key=key, ChecksumMode='ENABLED')
+    except ClientError:
+        raise UploadError("File has not been uploaded yet", status=409)
+
+    if head['ContentLength'] != upload.total_size or _stored_sha256(client, key, head) != upload.sha256:
+        default_storage.delete(upload.key)
+        raise UploadError("Checksum mismatch; restart the upload")
+
+    header = client.get_object(
+        Bucket=default_storage.bucket_name, Key=key, Range=f"bytes=0-{HEADER_PROBE_SIZE - 1}"
+    )['Body'].read()
+    try:
+        with Image.open(io.BytesIO(header)):
+            pass
+    except (UnidentifiedImageError, OSError):
+        default_storage.delete(upload.key)
+        raise UploadError("File must be an image")
+
+    return adopt_blob(upload.key, upload.sha256).name
+
+
+def _presigning_client():
+    """S3 client for the endpoint clients reach, which may differ from the one the server uses"""
+    return boto3.client(
+        's3',
+        endpoint_url=settings.DIRECT_UPLOAD_ENDPOINT_URL or settings.AWS_S3_ENDPOINT_URL,
+        region_name=settings.AWS_S3_REGION_NAME,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=Config(signature_version='s3v4')
+    )
+
+
+def _stored_sha256(client, key, head):
+    """SHA-256 of an uploaded object, as verified by storage on upload or else read back"""
+    if head.get('ChecksumSHA256'):
+        return base64.b64decode(head['ChecksumSHA256']).hex()
+
+    digest = hashlib.sha256()
+    body = client.get_object(Bucket=default_storage.bucket_name, Key=key)['Body']
+    for block in body.iter_chunks(HASH_BLOCK_SIZE):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def _object_key(name):
+    # Storage names are relative to the storage's location within the bucket
+    return default_storage._normalize_name(name)
+
+
+def _base64_sha256(sha256):
+    return base64.b64encode(bytes.fromhex(sha256)).decode()
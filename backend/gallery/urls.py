@@ -0,0 +1,8 @@
+from django.urls import path
+
+from gallery.views import resize_image, protected_media
+
+urlpatterns = [
+    path('resize/<str:signature>/<str:source>/<int:pk>/<str:version>/<str:spec>', resize_image, name='resize-image'),
+    path('protected/<str:signature>/<int:expires>/<str:kind>/<int:pk>/<str:variant>', protected_media, name='protected-media'),
+]
@@ -0,0 +1,71 @@
+from django.apps import apps
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponseForbidden
+from django.shortcuts import render
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from gallery import protected
+from gallery.resize import ResizeError, open_resized_image, verify, content_type
+
+# Pages with share images: URL kind (as in the SPA's routes) -> (model, Open Graph type)
+SHARE_PAGES = {
+    'blog': ('blog.Post', 'article'),
+    'event': ('events.Event', 'website'),
+}
+
+
+def resize_image(request, signature, source, pk, version, spec):
+    """Serve a resized copy of a stored image; the URL is built by gallery.resize.build_resize_url"""
+    if not verify(signature, f"{source}/{pk}/{version}/{spec}"):
+        return HttpResponseForbidden("Invalid signature")
+
+    try:
+        resized = open_resized_image(source, pk, version, spec)
+    except ResizeError as e:
+        raise Http404(str(e))
+
+    response = FileResponse(resized, content_type=content_type(resized.name))
+    # The version in the URL changes with the image, so the response never goes stale
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def protected_media(request, signature, expires, kind, pk, variant):
+    """Serve a private file; the URL is built by gallery.protected.build_protected_url"""
+    filename = request.GET.get('filename')
+    if not protected.verify(signature, expires, f"{kind}/{pk}/{variant}", filename):
+        return HttpResponseForbidden("Invalid or expired signature")
+
+    found = protected.find_protected_file(kind, pk, variant)
+    if found is None:
+        raise Http404("File not found")
+    return protected.protected_file_response(*found, filename)
+
+
+def share_page(request, kind, slug):
+    """Open Graph tags of a post or event for link previews; browsers are sent on to the SPA
+
+    Only reads the stored share image, so a burst of crawlers never renders one.
+    """
+    if kind not in SHARE_PAGES:
+        raise Http404("Unknown page")
+
+    model_name, og_type = SHARE_PAGES[kind]
+    model = apps.get_model(model_name)
+    instance = model.objects.filter(slug=slug).exclude(status=model.StatusChoices.DRAFT).first()
+    if instance is None:
+        raise Http404("Page not found")
+
+    description = instance.excerpt if kind == 'blog' else strip_tags(instance.description_html)
+    image_url = instance.share_image_url or (instance.featured_image.url if instance.featured_image else None)
+    response = render(request, 'share/page.html', {
+        'site_name': settings.SHARE_IMAGE_SITE_NAME,
+        'og_type': og_type,
+        'title': instance.title,
+        'description': Truncator(description.strip()).chars(200),
+        'image_url': request.build_absolute_uri(image_url) if image_url else None,
+        'page_url': f"{settings.FRONTEND_ROOT.rstrip('/')}/{kind}/{slug}",
+    })
+    response['Cache-Control'] = 'public, max-age=300'
+    return response
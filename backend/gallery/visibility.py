@@ -0,0 +1,80 @@
+from django.core.files import File
+
+import posixpath
+
+from gallery.models import Gallery
+from gallery.blobs import blob_sha, store_blob, retain_blobs, release_blobs
+from gallery.storage import PRIVATE_PREFIX, is_private_name, private_name
+
+
+def move_gallery_files(gallery):
+    """Move an image's original and renditions to the storage its visibility asks for
+
+    The row is updated only if its image and processing are still the ones
+    the files were copied from; otherwise the copies are deleted again.
+    Returns whether the row was updated.
+    """
+    if not gallery.needs_moving:
+        return False
+    if gallery.is_public:
+        return _make_public(gallery)
+    return _make_private(gallery)
+
+
+def _make_private(gallery):
+    storage = gallery.image.storage
+    old = gallery.image.name
+    with storage.open(old, 'rb') as original:
+        name = storage.save(private_name(old), original)
+    renditions = _copy_renditions(gallery, f"{PRIVATE_PREFIX}gallery/renditions/{gallery.pk}")
+
+    if not _update(gallery, name, renditions):
+        _delete(storage, [name] + [rendition['path'] for rendition in renditions.values()])
+        return False
+
+    if blob_sha(old):
+        # The blob and its renditions may be shared; they go with the last reference
+        release_blobs([old])
+    else:
+        _delete(storage, [old] + [rendition['path'] for rendition in gallery.renditions.values()])
+    return True
+
+
+def _make_public(gallery):
+    storage = gallery.image.storage
+    old = gallery.image.name
+    with storage.open(old, 'rb') as original:
+        blob = store_blob(File(original, name=old), old)
+    renditions = _copy_renditions(gallery, f"gallery/renditions/{blob.sha256}")
+
+    if not _update(gallery, blob.name, renditions):
+        # The blob itself is swept with the orphans unless referenced meanwhile
+        return False
+
+    retain_blobs([blob.name])
+    _delete(storage, [old] + [rendition['path'] for rendition in gallery.renditions.values()])
+    return True
+
+
+def _copy_renditions(gallery, directory):
+    storage = gallery.image.storage
+    renditions = {}
+    for key, rendition in gallery.renditions.items():
+        path = f"{directory}/{posixpath.basename(rendition['path'])}"
+        # Public renditions are shared by the images of one blob and never change
+        if is_private_name(path) or not storage.exists(path):
+            with storage.open(rendition['path'], 'rb') as stored:
+                path = storage.save(path, stored)
+        renditions[key] = {**rendition, 'path': path}
+    return renditions
+
+
+def _update(gallery, name, renditions):
+    return Gallery.all_objects.filter(
+        pk=gallery.pk, image=gallery.image.name, processed_at=gallery.processed_at
+    ).update(image=name, renditions=renditions)
+
+
+def _delete(storage, names):
+    for name in names:
+        storage.delete(name)
@@ -1,9 +1,10 @@
 from django.contrib import admin
 
 from unfold.admin import ModelAdmin
+from unfold.contrib.filters.admin import AutocompleteSelectFilter
 from import_export.admin import ImportExportModelAdmin
 
-from utils.admin import SoftDeleteListFilter
+from utils.admin import SoftDeleteListFilter, StreamingExportMixin, IndexedSearchMixin, EstimatedCountPaginator
 from payments.resources import DiscountResource, PaymentResource
 from payments.models import Payment, DiscountCode
 
@@ -39,20 +40,27 @@ class DiscountCodeAdmin(ModelAdmin, ImportExportModelAdmin):
 
 
 @admin.register(Payment)
-class PaymentAdmin(ModelAdmin, ImportExportModelAdmin):
+class PaymentAdmin(IndexedSearchMixin, StreamingExportMixin, ModelAdmin, ImportExportModelAdmin):
     resource_class = PaymentResource
     
     list_display = (
         'id', 'user', 'event', 'base_amount', 'discount_amount', 'amount',
         'status', 'authority', 'ref_id', 'created_at', 'verified_at', 'is_deleted'
     )
+    list_select_related = ('user', 'event')
     list_filter = (
-        'status', 'event', 'user', 'discount_code',
-        SoftDeleteListFilter,
+        SoftDeleteListFilter, 'status', ('event', AutocompleteSelectFilter),
+        ('user', AutocompleteSelectFilter), ('discount_code', AutocompleteSelectFilter),
     )
+    list_filter_submit = True
     search_fields = (
-        'user__email', 'authority', 'ref_id', 'discount_code__code'
+        'user__email', 'user__student_id', 'authority', 'ref_id', 'discount_code__code'
     )
+    search_help_text = "Exact e-mail, student id, authority, ref id or discount code"
+    email_search_fields = ('user__email',)
+    exact_search_fields = ('user__student_id', 'authority', 'ref_id', 'discount_code__code')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = (
         'user', 'event', 'base_amount', 'discount_code', 'discount_amount', 'amount', 'authority',
         'status', 'ref_id', 'card_pan', 'card_hash', 'created_at', 'updated_at', 'deleted_at'
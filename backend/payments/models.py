@@ -91,7 +91,7 @@ class Payment(BaseModel):
 
     authority  = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     status     = models.IntegerField(choices=OrderStatusChoices, default=OrderStatusChoices.INIT, editable=False)
-    ref_id     = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    ref_id     = models.CharField(max_length=64, null=True, blank=True, editable=False, db_index=True)
     card_pan   = models.CharField(max_length=32, null=True, blank=True, editable=False)
     card_hash  = models.CharField(max_length=128, null=True, blank=True, editable=False)
     verified_at = models.DateTimeField(null=True, blank=True, editable=False)
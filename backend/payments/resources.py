@@ -13,7 +13,7 @@ class DiscountResource(resources.ModelResource):
     )
 
     class Meta:
-        model = Event
+        model = DiscountCode
         fields = (
             'id', 'code', 'type', 'value', 'max_discount', 'is_active',
             'starts_at', 'ends_at', 'usage_limit_total', 'usage_limit_per_user',
@@ -38,7 +38,7 @@ class PaymentResource(resources.ModelResource):
         model = Payment
         fields = (
             'id', 'event', 'user', 'base_amount', 'discount_code', 'discount_amount', 'amount',
-            'authority', 'status', 'red_id', 'card_pan', 'card_hash', 'verified_at', 'created_at',
+            'authority', 'status', 'ref_id', 'card_pan', 'card_hash', 'verified_at', 'created_at',
             'updated_at', 'is_deleted', 'deleted_at'
         )
         export_order = fields
@@ -8,7 +8,7 @@ from simplemde.widgets import SimpleMDEEditor
 
 from users.models import User
 from users.resources import UserResource
-from utils.admin import SoftDeleteListFilter
+from utils.admin import SoftDeleteListFilter, StreamingExportMixin, BackgroundImportMixin
 
 class UserAdminForm(forms.ModelForm):
     bio = forms.CharField(widget=SimpleMDEEditor(), required=False)
@@ -18,11 +18,11 @@ class UserAdminForm(forms.ModelForm):
         fields = '__all__'
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin, ModelAdmin, ImportExportModelAdmin):
+class UserAdmin(StreamingExportMixin, BackgroundImportMixin, BaseUserAdmin, ModelAdmin, ImportExportModelAdmin):
     form = UserAdminForm
     resource_class = UserResource
     list_display = ('email', 'username', 'student_id', 'is_staff', 'is_email_verified', 'is_active', 'is_deleted', 'date_joined')
-    list_filter = ('is_email_verified', 'is_active', 'is_staff', 'year_of_study', SoftDeleteListFilter)
+    list_filter = ('is_email_verified', 'is_active', 'is_staff', 'is_committee', 'year_of_study', SoftDeleteListFilter)
     search_fields = ('email', 'username', 'student_id', 'first_name', 'last_name')
     ordering = ('-date_joined',)
 
@@ -32,7 +32,7 @@ class UserAdmin(BaseUserAdmin, ModelAdmin, ImportExportModelAdmin):
             'fields': ('first_name', 'last_name', 'student_id', 'year_of_study', 'major', 'bio', 'profile_picture')
         }),
         ('Permissions', {
-                'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions',),
+                'fields': ('is_active', 'is_staff', 'is_committee', 'is_superuser', 'groups', 'user_permissions',),
         }),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
         
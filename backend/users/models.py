@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.db import models
+from django.db.models.functions import Upper
 
 import uuid
 from datetime import timedelta
@@ -17,6 +18,7 @@ class User(AbstractUser, BaseModel):
     year_of_study = models.IntegerField(null=True, blank=True)
     major = models.CharField(max_length=100, blank=True)
 
+    is_committee = models.BooleanField(default=False, help_text="Committee members run events: they check attendees in and manage tickets and rosters")
     is_email_verified = models.BooleanField(default=False)
     email_verification_token = models.UUIDField(default=uuid.uuid4, unique=True)
     email_verification_sent_at = models.DateTimeField(null=True, blank=True)
@@ -31,6 +33,10 @@ class User(AbstractUser, BaseModel):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            # Case-insensitive e-mail lookups (email__iexact)
+            models.Index(Upper('email'), name='users_email_upper_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
@@ -2,8 +2,9 @@ from import_export import resources, fields
 from import_export.widgets import BooleanWidget
 
 from users.models import User
+from utils.imports import BulkImportMixin
 
-class UserResource(resources.ModelResource):
+class UserResource(BulkImportMixin, resources.ModelResource):
     is_staff = fields.Field(
         column_name='is_staff',
         attribute='is_staff',
@@ -27,3 +28,11 @@ class UserResource(resources.ModelResource):
                   'is_staff', 'is_superuser',
                   'is_email_verified', 'bio')
         export_order = fields
+        use_bulk = True
+        batch_size = 1000
+
+    def before_save_instance(self, instance, row, **kwargs):
+        super().before_save_instance(instance, row, **kwargs)
+        # Imported accounts sign in after resetting their password
+        if instance._state.adding:
+            instance.set_unusable_password()
@@ -6,6 +6,7 @@ from django.utils import timezone
 
 from users.models import User
 from users.tasks import send_verification_email
+from utils.dispatch import enqueue_on_commit, track_delivery
 
 @receiver(post_save, sender=User)
 def send_verification_email_on_registration(sender, instance, created, **kwargs):
@@ -22,5 +23,7 @@ def send_verification_email_on_registration(sender, instance, created, **kwargs)
             # Generate verification URL (you'll need to adjust this based on your frontend)
             verification_url = f"http://localhost:3000/verify-email/{instance.email_verification_token}"
 
-            # Send verification email asynchronously
-            send_verification_email.delay(instance.id, verification_url)
+            # Send verification email asynchronously once the user row is committed
+            instance.verification_task_id = track_delivery(
+                enqueue_on_commit(send_verification_email, instance.id, verification_url), instance.id
+            )
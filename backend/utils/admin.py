@@ -1,7 +1,34 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 
+import os
+import uuid
+import pickle
+from unfold.admin import ModelAdmin
+from unfold.decorators import action
+from import_export.resources import modelresource_factory
+
+from utils.models import ExportJob, ImportJob
+from utils.dispatch import enqueue_on_commit
+from utils.exports import export_rows, csv_lines, csv_response
+from utils.imports import IMPORT_FORMATS
+from gallery.protected import build_protected_url
+
 class SoftDeleteListFilter(admin.SimpleListFilter):
+    # Starts over from every row unless 'Active' is chosen, dropping the
+    # filters applied before it: keep it first in list_filter
     title = _('Soft Delete Status')
     parameter_name = 'is_deleted'
 
@@ -17,3 +44,236 @@ class SoftDeleteListFilter(admin.SimpleListFilter):
         if self.value() == '1':
             return queryset.model.deleted_objects.all()
         return queryset.model.all_objects.all()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that takes the size of a large unfiltered table from PostgreSQL statistics
+
+    COUNT(*) reads the whole table; pg_class.reltuples, kept current by
+    autovacuum, is read at once. Filtered or searched changelists, tables
+    below ADMIN_ESTIMATED_COUNT_THRESHOLD and other databases are counted.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                        [connection.ops.quote_name(self.object_list.model._meta.db_table)]
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                    return row[0]
+        return super().count
+
+
+class IndexedSearchMixin:
+    """Changelist search with exact lookups that use an index, instead of icontains on every column
+
+    A UUID is looked up in `uuid_search_fields`, an e-mail address in
+    `email_search_fields` (case-insensitively) and any other term in
+    `exact_search_fields`.
+    """
+
+    uuid_search_fields = ()
+    email_search_fields = ()
+    exact_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        try:
+            value = uuid.UUID(term)
+        except ValueError:
+            value = None
+
+        if value is not None and self.uuid_search_fields:
+            lookups = [Q(**{field: value}) for field in self.uuid_search_fields]
+        elif '@' in term:
+            lookups = [Q(**{f"{field}__iexact": term}) for field in self.email_search_fields]
+        else:
+            lookups = [Q(**{field: term}) for field in self.exact_search_fields]
+
+        if not lookups:
+            return queryset.none(), False
+        condition = Q()
+        for lookup in lookups:
+            condition |= lookup
+        return queryset.filter(condition), False
+
+
+class StreamingExportMixin:
+    """Export actions for large tables that never hold the rows in memory
+
+    The tablib export of import-export builds the whole file in the admin
+    request. These actions use the same resource but walk the selection in
+    chunks: CSV is streamed in the response, XLSX is written by a worker and
+    listed under export jobs with a download link.
+    """
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if self.has_export_permission(request):
+            for name in ('export_csv_streaming', 'export_xlsx_background'):
+                actions[name] = self.get_action(name)
+        return actions
+
+    def export_resource_path(self):
+        return _resource_path(getattr(self, 'resource_class', None))
+
+    def get_streaming_export_resource(self):
+        resource_path = self.export_resource_path()
+        return import_string(resource_path)() if resource_path else modelresource_factory(self.model)()
+
+    def export_csv_streaming(self, request, queryset):
+        resource = self.get_streaming_export_resource()
+        filename = f"{self.model._meta.model_name}-{timezone.localdate():%Y%m%d}.csv"
+        return csv_response(csv_lines(resource.get_export_headers(), export_rows(resource, queryset)), filename)
+
+    export_csv_streaming.short_description = "Export selected as CSV (streamed)"
+
+    def export_xlsx_background(self, request, queryset):
+        from utils.tasks import export_xlsx
+
+        # The worker rebuilds the selection from its query: a filter over the
+        # whole table, or the ids of one page of checked rows
+        job = ExportJob.objects.create(
+            user=request.user,
+            model_label=self.model._meta.label,
+            resource=self.export_resource_path(),
+            query=pickle.dumps(queryset.query)
+        )
+        enqueue_on_commit(export_xlsx, job.id)
+        link = reverse('admin:utils_exportjob_changelist')
+        self.message_user(request, format_html(
+            'Exporting {} rows in the background; download the file from <a href="{}">export jobs</a>.',
+            queryset.count(), link
+        ))
+
+    export_xlsx_background.short_description = "Export selected as XLSX (background)"
+
+
+class BackgroundImportForm(forms.Form):
+    file = forms.FileField(help_text="A .csv or .xlsx file")
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if _format(file.name) not in IMPORT_FORMATS:
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return file
+
+
+class BackgroundImportMixin:
+    """Changelist action that imports a file through `resource_class` in a worker
+
+    The import-export admin imports in the request, row by row; here the
+    upload is stored and imported in chunks with bulk writes (the resource
+    uses BulkImportMixin), with progress listed under import jobs.
+    """
+
+    actions_list = ('import_in_background',)
+
+    @action(description="Import in background", url_path='import-background', permissions=['import'])
+    def import_in_background(self, request):
+        form = BackgroundImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            from utils.tasks import import_rows
+
+            upload = form.cleaned_data['file']
+            job = ImportJob(
+                user=request.user,
+                model_label=self.model._meta.label,
+                resource=_resource_path(self.resource_class),
+                format=_format(upload.name)
+            )
+            job.file.save(f"{uuid.uuid4().hex}.{job.format}", upload, save=False)
+            job.save()
+            enqueue_on_commit(import_rows, job.id)
+            self.message_user(request, f"Importing {upload.name} in the background.")
+            return redirect(reverse('admin:utils_importjob_changelist'))
+
+        return TemplateResponse(request, 'admin/utils/background_import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Import {self.model._meta.verbose_name_plural} in background",
+            'form': form,
+            'fields': [field.column_name for field in self.resource_class().get_import_fields()],
+        })
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(ModelAdmin):
+    list_display = ('__str__', 'user', 'status', 'progress_display', 'created_at', 'finished_at', 'download_link')
+    list_filter = ('status', 'model_label')
+    readonly_fields = (
+        'user', 'model_label', 'resource', 'status', 'total_rows', 'exported_rows',
+        'file', 'error', 'created_at', 'finished_at'
+    )
+    exclude = ('is_deleted', 'deleted_at')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('user')
+        return queryset if request.user.is_superuser else queryset.filter(user=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+
+    progress_display.short_description = "Progress"
+
+    def download_link(self, obj):
+        if not obj.file:
+            return "-"
+        # Exports hold personal data: served through signed, expiring URLs
+        url = build_protected_url(obj, 'file', os.path.basename(obj.file.name))
+        return format_html('<a href="{}">Download</a>', url)
+
+    download_link.short_description = "File"
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(ModelAdmin):
+    list_display = (
+        '__str__', 'user', 'status', 'progress_display', 'created_rows', 'updated_rows',
+        'failed_rows', 'created_at', 'finished_at'
+    )
+    list_filter = ('status', 'model_label')
+    readonly_fields = (
+        'user', 'model_label', 'resource', 'format', 'status', 'total_rows', 'processed_rows',
+        'created_rows', 'updated_rows', 'failed_rows', 'errors', 'error', 'created_at', 'finished_at'
+    )
+    exclude = ('file', 'is_deleted', 'deleted_at')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('user')
+        return queryset if request.user.is_superuser else queryset.filter(user=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def progress_display(self, obj):
+        return f"{obj.progress}%"
+
+    progress_display.short_description = "Progress"
+
+
+def _resource_path(resource_class):
+    return f"{resource_class.__module__}.{resource_class.__qualname__}" if resource_class else ''
+
+
+def _format(filename):
+    return os.path.splitext(filename)[1].lower().lstrip('.')
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import transaction
+
+import uuid
+import logging
+from redis import RedisError
+
+from utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Who queued a delivery, so only they can look up its status
+DELIVERY_KEY = 'delivery:{tracking_id}'
+
+
+def enqueue_on_commit(task, *args, eta=None, **kwargs):
+    """Queue a Celery task once the current transaction commits and return its task id"""
+    task_id = str(uuid.uuid4())
+    transaction.on_commit(lambda: task.apply_async(args=args, kwargs=kwargs, task_id=task_id, eta=eta))
+    return task_id
+
+
+def track_delivery(tracking_id, user_id):
+    """Record the user a queued delivery belongs to; returns the tracking id"""
+    if user_id is None:
+        return tracking_id
+    try:
+        get_redis().set(DELIVERY_KEY.format(tracking_id=tracking_id), user_id, ex=settings.DELIVERY_TRACKING_TTL)
+    except RedisError as e:
+        logger.error(f"Failed to record the owner of delivery {tracking_id}: {e}")
+    return tracking_id
+
+
+def get_delivery_owner(tracking_id):
+    """Id of the user a delivery belongs to, or None once it has expired"""
+    try:
+        owner = get_redis().get(DELIVERY_KEY.format(tracking_id=tracking_id))
+    except RedisError as e:
+        logger.error(f"Failed to read the owner of delivery {tracking_id}: {e}")
+        return None
+    return int(owner) if owner else None
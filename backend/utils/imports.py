@@ -0,0 +1,309 @@
+from django.db import connections, router
+from django.utils import timezone
+
+import csv
+import io
+import copy
+import openpyxl
+import tablib
+from collections import defaultdict
+from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
+
+# Formats a background import accepts, by file extension
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+
+class CachedForeignKeyWidget(ForeignKeyWidget):
+    """ForeignKeyWidget that resolves a chunk of rows from one query
+
+    BulkImportMixin calls preload() with the column of a chunk; until then,
+    and after the import, it looks values up one query at a time as usual.
+    """
+
+    def preload(self, values):
+        keys = {str(value).strip() for value in values if value not in (None, '')}
+        queryset = self.get_queryset(None, None).filter(**{f"{self.field}__in": keys})
+        self._cache = {str(getattr(obj, self.field)): obj for obj in queryset}
+
+    def forget(self):
+        self._cache = None
+
+    def clean(self, value, row=None, **kwargs):
+        cache = getattr(self, '_cache', None)
+        if cache is None:
+            return super().clean(value, row, **kwargs)
+        if value in (None, ''):
+            return None
+        try:
+            return cache[str(value).strip()]
+        except KeyError:
+            raise ValueError(f"{self.model._meta.verbose_name} '{value}' does not exist")
+
+
+class CachedManyToManyWidget(ManyToManyWidget):
+    """ManyToManyWidget that resolves a chunk of rows from one query
+
+    As with the stock widget, values that match nothing are left out.
+    """
+
+    def preload(self, values):
+        keys = {key for value in values for key in self._split(value)}
+        self._cache = defaultdict(list)
+        for obj in self.model.objects.filter(**{f"{self.field}__in": keys}):
+            self._cache[str(getattr(obj, self.field))].append(obj)
+
+    def forget(self):
+        self._cache = None
+
+    def clean(self, value, row=None, **kwargs):
+        cache = getattr(self, '_cache', None)
+        if cache is None:
+            return super().clean(value, row, **kwargs)
+        return [obj for key in self._split(value) for obj in cache.get(key, ())]
+
+    def _split(self, value):
+        if value in (None, ''):
+            return []
+        if isinstance(value, (int, float)):
+            return [str(int(value))]
+        return [key.strip() for key in str(value).split(self.separator) if key.strip()]
+
+
+class BulkImportMixin:
+    """Imports a chunk of rows with a handful of queries, for ModelResource
+
+    Existing rows and every cached widget's lookup table are loaded once per
+    chunk in before_import(), rows are written with bulk_create/bulk_update
+    (set `use_bulk` in Meta) and their many-to-many values with one through
+    table insert per batch. Bulk writes skip save() and signals, so blob
+    references are counted here and resources run what save() would in
+    before_save_instance() and after_bulk_save().
+    """
+
+    # Concrete fields set by before_save_instance() that are not resource fields
+    bulk_update_extra_fields = ()
+
+    def __init__(self, skip_diff=False, **kwargs):
+        super().__init__(**kwargs)
+        if skip_diff:
+            # Background imports show no diff; not copying each row is much faster
+            self._meta = copy.copy(self._meta)
+            self._meta.skip_diff = True
+        self._instances = None
+        self._columns = None
+        self._pending_m2m = {}
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        self._columns = set(dataset.headers)
+        for field in self.get_import_fields():
+            if hasattr(field.widget, 'preload') and field.column_name in dataset.headers:
+                field.widget.preload(dataset[field.column_name])
+
+        id_fields = self.get_import_id_fields()
+        if len(id_fields) == 1 and self.fields[id_fields[0]].column_name in dataset.headers:
+            field = self.fields[id_fields[0]]
+            keys = set()
+            for value in dataset[field.column_name]:
+                try:
+                    keys.add(field.widget.clean(value))
+                except ValueError:
+                    # Reported on its row
+                    continue
+            keys.discard(None)
+            manager = getattr(self._meta.model, 'all_objects', self._meta.model._default_manager)
+            self._instances = {
+                str(getattr(obj, field.attribute)): obj
+                for obj in manager.filter(**{f"{field.attribute}__in": keys})
+            }
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        for field in self.get_import_fields():
+            if hasattr(field.widget, 'forget'):
+                field.widget.forget()
+        self._instances = None
+        self._columns = None
+        self._pending_m2m = {}
+
+    def get_instance(self, instance_loader, row):
+        if self._instances is None:
+            return super().get_instance(instance_loader, row)
+        field = self.fields[self.get_import_id_fields()[0]]
+        value = field.clean(row)
+        return self._instances.get(str(value)) if value is not None else None
+
+    def get_bulk_update_fields(self):
+        # Only the columns of the file: each field makes every UPDATE longer
+        model_fields = {field.name: field for field in self._meta.model._meta.concrete_fields}
+        names = [
+            field.attribute for name, field in self.fields.items()
+            if name not in self.get_import_id_fields() and field.attribute in model_fields
+            and (self._columns is None or field.column_name in self._columns)
+        ]
+        if 'updated_at' in model_fields:
+            names.append('updated_at')
+        return list(dict.fromkeys(names + list(self.bulk_update_extra_fields)))
+
+    def before_save_instance(self, instance, row, **kwargs):
+        super().before_save_instance(instance, row, **kwargs)
+        if hasattr(instance, 'updated_at'):
+            # auto_now is not applied by bulk_update
+            instance.updated_at = timezone.now()
+
+    def save_m2m(self, instance, row, **kwargs):
+        if not self._meta.use_bulk:
+            return super().save_m2m(instance, row, **kwargs)
+        values = {
+            field.attribute: field.clean(row, **kwargs)
+            for field in self.get_import_fields()
+            if isinstance(field.widget, ManyToManyWidget) and field.column_name in row
+        }
+        if values:
+            self._pending_m2m[id(instance)] = values
+
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        instances = list(self.create_instances)
+        super().bulk_create(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        self._after_bulk_write(instances, True, using_transactions, dry_run)
+
+    def bulk_update(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        instances = list(self.update_instances)
+        if instances and (using_transactions or not dry_run):
+            try:
+                bulk_update_rows(self._meta.model, instances, self.get_bulk_update_fields(), batch_size)
+            except Exception as e:
+                self.handle_import_error(result, e, raise_errors)
+                instances = []
+            finally:
+                self.update_instances.clear()
+        self._after_bulk_write(instances, False, using_transactions, dry_run)
+
+    def after_bulk_save(self, instances, created):
+        """Called with every batch written, for what save() and signals would do"""
+
+    def _after_bulk_write(self, instances, created, using_transactions, dry_run):
+        # A failed batch is reported by import-export and its instances have no pk
+        instances = [instance for instance in instances if instance.pk is not None]
+        if not instances or (dry_run and not using_transactions):
+            return
+        self._save_pending_m2m(instances, created)
+        self._count_blob_references(instances)
+        self.after_bulk_save(instances, created)
+
+    def _save_pending_m2m(self, instances, created):
+        by_attribute = defaultdict(list)
+        for instance in instances:
+            for attribute, related in self._pending_m2m.pop(id(instance), {}).items():
+                by_attribute[attribute].append((instance, related))
+
+        for attribute, values in by_attribute.items():
+            descriptor = getattr(self._meta.model, attribute)
+            through = descriptor.through
+            source = descriptor.field.m2m_field_name()
+            target = descriptor.field.m2m_reverse_field_name()
+            if not created:
+                through.objects.filter(**{f"{source}__in": [instance.pk for instance, _ in values]}).delete()
+            through.objects.bulk_create(
+                [
+                    through(**{f"{source}_id": instance.pk, f"{target}_id": obj.pk})
+                    for instance, related in values
+                    for obj in related
+                ],
+                ignore_conflicts=True
+            )
+
+    def _count_blob_references(self, instances):
+        from gallery.blobs import BLOB_FIELDS, retain_blobs, release_blobs
+
+        retained, released = [], []
+        for instance in instances:
+            stored = getattr(instance, '_blob_names', {})
+            for field in BLOB_FIELDS.get(self._meta.model._meta.label, ()):
+                name = getattr(instance, field).name or ''
+                previous = stored.get(field, '')
+                if name != previous:
+                    retained.append(name)
+                    released.append(previous)
+                stored[field] = name
+        retain_blobs(retained)
+        release_blobs(released)
+
+
+def bulk_update_rows(model, instances, field_names, batch_size=None):
+    """bulk_update() that on PostgreSQL joins each batch to a VALUES list
+
+    Django's bulk_update() builds a CASE WHEN per field and row; compiling it
+    takes most of an import's time once batches hold a thousand rows.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor != 'postgresql':
+        return model._base_manager.bulk_update(instances, field_names, batch_size=batch_size)
+
+    meta = model._meta
+    fields = [meta.get_field(name) for name in field_names]
+    columns = [meta.pk] + fields
+    quote = connection.ops.quote_name
+    row = '(' + ', '.join(f"%s::{field.db_type(connection)}" for field in columns) + ')'
+    sql = (
+        f"UPDATE {quote(meta.db_table)} AS t SET "
+        + ', '.join(f"{quote(field.column)} = v.{quote(field.column)}" for field in fields)
+        + " FROM (VALUES {rows}) AS v("
+        + ', '.join(quote(field.column) for field in columns)
+        + f") WHERE t.{quote(meta.pk.column)} = v.{quote(meta.pk.column)}"
+    )
+
+    batch_size = batch_size or len(instances)
+    with connection.cursor() as cursor:
+        for start in range(0, len(instances), batch_size):
+            batch = instances[start:start + batch_size]
+            params = [
+                field.get_db_prep_save(getattr(instance, field.attname), connection)
+                for instance in batch
+                for field in columns
+            ]
+            cursor.execute(sql.replace('{rows}', ', '.join([row] * len(batch))), params)
+
+
+def read_chunks(file, format, size):
+    """Rows of an uploaded CSV or XLSX file as tablib Datasets of at most `size` rows
+
+    The file is read as it goes, so whatever its length only one chunk is
+    held in memory; blank lines are skipped.
+    """
+    rows = _csv_rows(file) if format == 'csv' else _xlsx_rows(file)
+    headers = [str(value).strip() if value is not None else '' for value in next(rows, [])]
+    chunk = tablib.Dataset(headers=headers)
+    for row in rows:
+        if not any(value not in (None, '') for value in row):
+            continue
+        row = (list(row) + [None] * len(headers))[:len(headers)]
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = tablib.Dataset(headers=headers)
+    if len(chunk):
+        yield chunk
+
+
+def count_rows(file, format):
+    rows = _csv_rows(file) if format == 'csv' else _xlsx_rows(file)
+    next(rows, None)
+    return sum(1 for row in rows if any(value not in (None, '') for value in row))
+
+
+def _csv_rows(file):
+    # utf-8-sig drops the BOM spreadsheet programs write
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(file):
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
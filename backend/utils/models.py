@@ -1,4 +1,6 @@
 from django.db import models
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
 from django.utils import timezone
 
 class SoftDeleteQuerySet(models.QuerySet):
@@ -55,3 +57,132 @@ class BaseModel(models.Model):
         self.is_deleted = False
         self.deleted_at = None
         self.save()
+
+
+def export_storage():
+    # Exports hold personal data: only ever served through signed URLs
+    return storages['protected']
+
+
+class ExportJob(BaseModel):
+    """An XLSX export of an admin changelist, written by a worker"""
+
+    class StatusChoices(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='export_jobs',
+        verbose_name='User'
+    )
+    model_label = models.CharField(max_length=100, verbose_name='Model')
+    resource = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Resource',
+        help_text="Dotted path of the import-export resource"
+    )
+    query = models.BinaryField(verbose_name='Query', help_text="Pickled query of the selected rows, rebuilt by the worker")
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+        verbose_name='Status'
+    )
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='Total Rows')
+    exported_rows = models.PositiveIntegerField(default=0, verbose_name='Exported Rows')
+    file = models.FileField(upload_to='exports/', storage=export_storage, blank=True, verbose_name='File')
+    error = models.TextField(blank=True, verbose_name='Error')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finished At')
+
+    class Meta:
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Export #{self.pk} of {self.model_label}"
+
+    @property
+    def progress(self):
+        """Percentage of the rows that have been written"""
+        if self.status == self.StatusChoices.COMPLETED:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, round(self.exported_rows * 100 / self.total_rows))
+
+    def protected_file(self, variant):
+        """(storage, name) of the XLSX file, for the protected media view"""
+        if variant == 'file' and self.file:
+            return self.file.storage, self.file.name
+        return None
+
+
+def data_import_storage():
+    return FileSystemStorage(location=settings.DATA_IMPORT_DIR)
+
+
+class ImportJob(BaseModel):
+    """A CSV or XLSX file imported through an admin resource by a worker, a chunk of rows at a time"""
+
+    class StatusChoices(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='import_jobs',
+        verbose_name='User'
+    )
+    model_label = models.CharField(max_length=100, verbose_name='Model')
+    resource = models.CharField(
+        max_length=255,
+        verbose_name='Resource',
+        help_text="Dotted path of the import-export resource"
+    )
+    file = models.FileField(upload_to='data/', storage=data_import_storage, blank=True, verbose_name='File')
+    format = models.CharField(max_length=10, verbose_name='Format')
+    status = models.CharField(
+        max_length=20,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+        verbose_name='Status'
+    )
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='Total Rows')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='Processed Rows')
+    created_rows = models.PositiveIntegerField(default=0, verbose_name='Created Rows')
+    updated_rows = models.PositiveIntegerField(default=0, verbose_name='Updated Rows')
+    failed_rows = models.PositiveIntegerField(default=0, verbose_name='Failed Rows')
+    errors = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Row Errors',
+        help_text="First IMPORT_MAX_ERRORS row errors"
+    )
+    error = models.TextField(blank=True, verbose_name='Error')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finished At')
+
+    class Meta:
+        verbose_name = 'Import Job'
+        verbose_name_plural = 'Import Jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import #{self.pk} of {self.model_label}"
+
+    @property
+    def progress(self):
+        """Percentage of the rows that have been processed"""
+        if self.status == self.StatusChoices.COMPLETED:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, round(self.processed_rows * 100 / self.total_rows))
@@ -0,0 +1,15 @@
+from django.conf import settings
+
+import redis
+
+_clients = {}
+
+
+def get_redis(decode_responses=True):
+    """Shared Redis client for counters and indexes that must not live in the (possibly dummy) cache
+
+    Pass decode_responses=False for binary values such as bitmaps.
+    """
+    if decode_responses not in _clients:
+        _clients[decode_responses] = redis.Redis.from_url(settings.REDIS_URL, decode_responses=decode_responses)
+    return _clients[decode_responses]
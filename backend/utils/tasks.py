@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.utils import timezone
+
+from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+import logging
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+@shared_task(soft_time_limit=25 * 60, time_limit=30 * 60)
+def export_xlsx(job_id):
+    """Write the rows of an admin export to an XLSX file, a chunk of rows at a time"""
+    import uuid
+    import pickle
+    import tempfile
+    from django.apps import apps
+    from django.core.files import File
+    from django.utils.module_loading import import_string
+    from import_export.resources import modelresource_factory
+    from .models import ExportJob
+    from .exports import export_rows, write_xlsx
+
+    job = ExportJob.objects.get(id=job_id)
+
+    def on_chunk(count):
+        ExportJob.objects.filter(id=job_id).update(exported_rows=count)
+
+    # Anything that goes wrong, the soft time limit included, fails the job
+    # instead of leaving it pending
+    try:
+        model = apps.get_model(job.model_label)
+        resource = import_string(job.resource)() if job.resource else modelresource_factory(model)()
+
+        # The changelist's query, filters included; soft-deleted rows are exported when selected
+        queryset = model._base_manager.all()
+        queryset.query = pickle.loads(job.query)
+        queryset = queryset.order_by('pk')
+
+        job.status = ExportJob.StatusChoices.RUNNING
+        job.total_rows = queryset.count()
+        job.save(update_fields=['status', 'total_rows', 'updated_at'])
+
+        rows = export_rows(resource, queryset, native=True)
+        with tempfile.TemporaryFile() as spool:
+            count = write_xlsx(spool, resource.get_export_headers(), rows, on_chunk=on_chunk)
+            spool.seek(0)
+            filename = f"{model._meta.model_name}-{timezone.localdate():%Y%m%d}-{uuid.uuid4().hex[:12]}.xlsx"
+            job.file.save(filename, File(spool), save=False)
+    except Exception as e:
+        job.status = ExportJob.StatusChoices.FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+        logger.error(f"Export {job_id} failed: {e}")
+        return f"Export {job_id} failed"
+
+    job.status = ExportJob.StatusChoices.COMPLETED
+    job.exported_rows = count
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'exported_rows', 'file', 'finished_at', 'updated_at'])
+
+    logger.info(f"Export {job_id} completed: {count} {model._meta.verbose_name_plural}")
+    return f"Export {job_id} completed: {count} rows"
+
+@shared_task
+def cleanup_export_jobs():
+    """Delete export jobs, and their files, older than EXPORT_RETENTION"""
+    from .models import ExportJob
+
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_RETENTION)
+    count = 0
+    for job in ExportJob.all_objects.filter(created_at__lt=cutoff):
+        if job.file:
+            job.file.delete(save=False)
+        job.hard_delete()
+        count += 1
+
+    logger.info(f"Deleted {count} export jobs")
+    return f"Deleted {count} export jobs"
+
+@shared_task(soft_time_limit=25 * 60, time_limit=30 * 60)
+def import_rows(job_id):
+    """Import an uploaded file through its resource, one transaction per chunk of rows
+
+    A chunk with a row error is rolled back as a whole, as the admin import
+    does; invalid rows are skipped and reported.
+    """
+    from django.utils.module_loading import import_string
+    from import_export.results import RowResult
+    from .models import ImportJob
+    from .imports import read_chunks, count_rows
+
+    job = ImportJob.objects.get(id=job_id)
+    resource = import_string(job.resource)(skip_diff=True)
+    job.status = ImportJob.StatusChoices.RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    errors = []
+    counts = {'processed_rows': 0, 'created_rows': 0, 'updated_rows': 0, 'failed_rows': 0}
+    try:
+        with job.file.open('rb') as source:
+            job.total_rows = count_rows(source, job.format)
+            ImportJob.objects.filter(id=job_id).update(total_rows=job.total_rows)
+            source.seek(0)
+
+            for dataset in read_chunks(source, job.format, settings.IMPORT_CHUNK_SIZE):
+                offset = counts['processed_rows']
+                result = resource.import_data(dataset, dry_run=False, use_transactions=True)
+                counts['processed_rows'] += len(dataset)
+
+                if result.has_errors():
+                    counts['failed_rows'] += len(dataset)
+                    errors.extend({'row': None, 'error': str(error.error)} for error in result.base_errors)
+                    errors.extend(
+                        {'row': offset + number, 'error': str(row_errors[0].error)}
+                        for number, row_errors in result.row_errors()
+                    )
+                    errors.append({'row': None, 'error': f"Rows {offset + 1}-{offset + len(dataset)} were not imported"})
+                else:
+                    counts['created_rows'] += result.totals[RowResult.IMPORT_TYPE_NEW]
+                    counts['updated_rows'] += result.totals[RowResult.IMPORT_TYPE_UPDATE]
+                    counts['failed_rows'] += result.totals[RowResult.IMPORT_TYPE_INVALID]
+                    errors.extend(
+                        {'row': offset + row.number, 'error': '; '.join(
+                            f"{field}: {' '.join(messages)}" for field, messages in row.error_dict.items()
+                        )}
+                        for row in result.invalid_rows
+                    )
+
+                ImportJob.objects.filter(id=job_id).update(errors=errors[:settings.IMPORT_MAX_ERRORS], **counts)
+    except Exception as e:
+        if isinstance(e, SoftTimeLimitExceeded):
+            # Chunks already committed stay imported
+            e = f"Time limit reached after {counts['processed_rows']} of {job.total_rows} rows"
+        ImportJob.objects.filter(id=job_id).update(
+            status=ImportJob.StatusChoices.FAILED,
+            file='',
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        logger.error(f"Import {job_id} failed: {e}")
+        return f"Import {job_id} failed"
+    finally:
+        job.file.delete(save=False)
+
+    ImportJob.objects.filter(id=job_id).update(
+        status=ImportJob.StatusChoices.COMPLETED,
+        file='',
+        finished_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+
+    logger.info(f"Import {job_id} completed: {counts['created_rows']} created, {counts['updated_rows']} updated, {counts['failed_rows']} failed")
+    return f"Import {job_id} completed: {counts['processed_rows']} rows"
@@ -0,0 +1,107 @@
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase
+from django.utils import timezone
+
+import io
+import pickle
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from communications.models import Announcement
+from communications.resources import AnnouncementResource
+from events.models import Event, Registration
+from events.resources import RegistrationResource
+from payments.models import DiscountCode, Payment
+from payments.resources import PaymentResource
+from users.models import User
+from users.resources import UserResource
+from utils.exports import export_rows, write_xlsx
+from utils.models import ExportJob
+from utils.tasks import export_xlsx
+
+
+
+class ExportTests(TestCase):
+    """The admin exports of the large tables, through the chunked path"""
+
+    def setUp(self):
+        start = timezone.now() + timedelta(days=1)
+        event = Event.objects.create(
+            title="Exported", description="-", start_time=start, end_time=start + timedelta(hours=2)
+        )
+        user = User.objects.create_user(
+            username='exported', email='exported@example.com', password='-', student_id='900300',
+            is_email_verified=True
+        )
+        Registration.objects.create(event=event, user=user, status=Registration.StatusChoices.CONFIRMED)
+        code = DiscountCode.objects.create(code='EXPORT10', value=10)
+        Payment.objects.create(
+            user=user, event=event, base_amount=1000, discount_code=code, discount_amount=100, amount=900
+        )
+        Announcement.objects.create(title="Exported", content="-", author=user)
+
+    def test_each_resource_exports(self):
+        for resource_class, model in (
+            (RegistrationResource, Registration),
+            (PaymentResource, Payment),
+            (UserResource, User),
+            (AnnouncementResource, Announcement),
+        ):
+            with self.subTest(resource=resource_class.__name__):
+                resource = resource_class()
+                header = resource.get_export_headers()
+                rows = list(export_rows(resource, model.objects.all(), native=True))
+
+                self.assertEqual(len(rows), model.objects.count())
+                self.assertTrue(all(len(row) == len(header) for row in rows))
+                self.assertEqual(write_xlsx(io.BytesIO(), header, rows), len(rows))
+
+    def test_relations_are_joined(self):
+        resource = PaymentResource()
+        # The payments, then nothing per row for the event, user and discount code
+        with self.assertNumQueries(1):
+            rows = list(export_rows(resource, Payment.objects.all()))
+        self.assertIn('Exported', rows[0])
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        # The field's storage is resolved when the model is loaded
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        patcher = mock.patch.object(ExportJob._meta.get_field('file'), 'storage', FileSystemStorage(location=directory))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(
+            username='exporter', email='exporter@example.com', password='-', student_id='900301',
+            is_staff=True, is_email_verified=True
+        )
+
+    def job(self, resource='users.resources.UserResource'):
+        return ExportJob.objects.create(
+            user=self.user, model_label='users.User', resource=resource,
+            query=pickle.dumps(User.objects.all().query)
+        )
+
+    def test_export_is_written(self):
+        job = self.job()
+
+        export_xlsx(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.StatusChoices.COMPLETED)
+        self.assertEqual(job.exported_rows, 1)
+        self.assertTrue(job.file.storage.exists(job.file.name))
+
+    def test_unreadable_job_is_marked_failed(self):
+        job = self.job('users.resources.MissingResource')
+
+        self.assertEqual(export_xlsx(job.id), f"Export {job.id} failed")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.StatusChoices.FAILED)
+        self.assertTrue(job.error)
+        self.assertIsNotNone(job.finished_at)